@@ -0,0 +1,6 @@
+"""Pytest setup: run pygame without a display so the tests work headless"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
@@ -0,0 +1,146 @@
+"""
+Flashpoint Cities - Atmosphere
+Cached sky gradients, weather tints and full-screen weather overlays.
+Overlays are uniform colours blitted with a surface alpha, so each steady
+state is one pre-filled surface reused every frame, and a cross-fade between
+two states is itself a uniform tint: it is produced step by step by
+refilling a single scratch surface instead of allocating or blending two.
+"""
+
+import numpy as np
+import pygame
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+Color = Tuple[int, int, int]
+Tint = Tuple[Color, int]  # Overlay colour and alpha (0-255)
+
+
+def _display_format(surface: pygame.Surface) -> pygame.Surface:
+    """Convert to the display's pixel format when there is a display"""
+    if pygame.display.get_surface() is not None:
+        return surface.convert()
+    return surface
+
+
+def vertical_gradient(size: Tuple[int, int], top: Color, bottom: Color) -> pygame.Surface:
+    """Surface shading linearly from top to bottom, built as one column and stretched"""
+    height = size[1]
+    factor = np.arange(height, dtype=np.float64)[:, None] / height
+    column = np.array(top, dtype=np.float64) + factor * (np.array(bottom, dtype=np.float64) - np.array(top))
+    column = column.astype(np.uint8)[None, :, :]  # (1, height, 3) as surfarray expects
+    return _display_format(pygame.transform.scale(pygame.surfarray.make_surface(column), size))
+
+
+def compose_tints(first: Optional[Tint], second: Optional[Tint]) -> Optional[Tint]:
+    """Single tint equal to blitting first and then second over the same pixels"""
+    if first is None or first[1] == 0:
+        return second
+    if second is None or second[1] == 0:
+        return first
+    a, b = first[1] / 255, second[1] / 255
+    alpha = 1 - (1 - a) * (1 - b)
+    color = tuple(round((c1 * a * (1 - b) + c2 * b) / alpha) for c1, c2 in zip(first[0], second[0]))
+    return color, round(alpha * 255)
+
+
+def apply_tint(color: Color, tint: Optional[Tint]) -> Color:
+    """Colour a solid fill ends up as once a tint is blitted over it"""
+    if tint is None:
+        return color
+    alpha = tint[1] / 255
+    return tuple(round(c * (1 - alpha) + t * alpha) for c, t in zip(color, tint[0]))
+
+
+def fade_tint(start: Optional[Tint], end: Optional[Tint], t: float) -> Optional[Tint]:
+    """Tint t of the way through a cross-fade: start fading out under end fading in"""
+    faded_start = (start[0], round(start[1] * (1 - t))) if start is not None else None
+    faded_end = (end[0], round(end[1] * t)) if end is not None else None
+    return compose_tints(faded_start, faded_end)
+
+
+class Atmosphere:
+    """Sky gradients and weather overlays for one screen size"""
+
+    def __init__(self, size: Tuple[int, int], fade_ticks: int = 60, fade_steps: int = 15,
+                 cache_size: int = 16):
+        self.size = size
+        self.fade_ticks = fade_ticks
+        self.fade_steps = fade_steps  # Distinct overlays drawn during a fade
+        self.cache_size = cache_size
+        self.skies: "OrderedDict[Tuple[Color, Color], pygame.Surface]" = OrderedDict()
+        self.overlays: "OrderedDict[Tint, pygame.Surface]" = OrderedDict()
+        self.scratch: Optional[pygame.Surface] = None  # Refilled at each fade step
+        self.scratch_tint: Optional[Tint] = None
+
+        self.start: Optional[Tint] = None  # Fading from
+        self.target: Optional[Tint] = None  # Fading to
+        self.fade = 1.0  # 0 = start, 1 = target
+
+    def sky(self, top: Color, bottom: Color) -> pygame.Surface:
+        """Full-screen gradient between two colours, built once per pair"""
+        key = (top, bottom)
+        surface = self.skies.get(key)
+        if surface is None:
+            surface = self.skies[key] = vertical_gradient(self.size, top, bottom)
+            if len(self.skies) > self.cache_size:
+                self.skies.popitem(last=False)
+        else:
+            self.skies.move_to_end(key)
+        return surface
+
+    def set_target(self, tint: Optional[Tint]):
+        """Start cross-fading toward a new overlay, from whatever is showing now"""
+        if tint == self.target:
+            return
+        self.start = self.current_tint()
+        self.target = tint
+        self.fade = 0.0 if self.fade_ticks > 0 else 1.0
+
+    def reset(self, tint: Optional[Tint]):
+        """Show an overlay immediately, without fading"""
+        self.start = self.target = tint
+        self.fade = 1.0
+
+    def update(self):
+        """Advance the cross-fade by one tick"""
+        if self.fade < 1.0:
+            self.fade = min(1.0, self.fade + 1.0 / self.fade_ticks)
+
+    def current_tint(self) -> Optional[Tint]:
+        """Overlay tint showing now, quantized to the fade steps"""
+        if self.fade >= 1.0:
+            return self.target
+        step = int(self.fade * self.fade_steps) / self.fade_steps
+        return fade_tint(self.start, self.target, step)
+
+    def overlay(self, tint: Optional[Tint] = None) -> Optional[pygame.Surface]:
+        """Surface to blit over the scene, or None when the air is clear
+
+        Draws current_tint() unless given a tint captured earlier, e.g. by a
+        simulation running on another thread.
+        """
+        if tint is None:
+            tint = self.current_tint()
+        if tint is None or tint[1] == 0:
+            return None
+        if tint == self.target or tint in self.overlays:
+            surface = self.overlays.get(tint)
+            if surface is None:
+                surface = self.overlays[tint] = _display_format(pygame.Surface(self.size))
+                self._fill(surface, tint)
+                if len(self.overlays) > self.cache_size:
+                    self.overlays.popitem(last=False)
+            else:
+                self.overlays.move_to_end(tint)
+            return surface
+        if tint != self.scratch_tint:
+            if self.scratch is None:
+                self.scratch = _display_format(pygame.Surface(self.size))
+            self._fill(self.scratch, tint)
+            self.scratch_tint = tint
+        return self.scratch
+
+    def _fill(self, surface: pygame.Surface, tint: Tint):
+        surface.fill(tint[0])
+        surface.set_alpha(tint[1])
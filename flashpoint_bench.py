@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Flashpoint Cities - Benchmarks
+Runs scripted scenarios headlessly with a fixed seed and tick count, timing
+update() and draw() separately, and writes machine-readable results that a
+later run can be compared against to catch frame-time regressions.
+
+    python flashpoint_bench.py --output before.json
+    python flashpoint_bench.py --baseline before.json --output after.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pygame
+
+import flashpoint_cities as fc
+
+BENCH_FORMAT = 1  # Bump when the result layout changes
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    setup: Callable[[fc.FlashpointCities], None]
+    before_tick: Optional[Callable[[fc.FlashpointCities], None]] = None  # Runs untimed before each update
+
+
+def _hold_weather(weather: fc.WeatherType) -> Callable[[fc.FlashpointCities], None]:
+    def hold(game: fc.FlashpointCities):
+        game.weather = weather
+    return hold
+
+
+def _setup_empty(game: fc.FlashpointCities):
+    game.demand_scale = 0.0
+    game.vehicles.clear()
+    game.weather = fc.WeatherType.SUNNY
+
+
+RUSH_HOUR_VEHICLES = 10000
+RUSH_HOUR_LANES = 200  # Parallel lanes, so every vehicle fits on screen with room to move
+
+
+def _top_up_rush_hour(game: fc.FlashpointCities):
+    """Keep RUSH_HOUR_VEHICLES on screen, entering at both edges of many parallel lanes"""
+    game.weather = fc.WeatherType.SUNNY
+    missing = RUSH_HOUR_VEHICLES - game.vehicles.count
+    if missing <= 0:
+        return
+    rng = game.streams["traffic"]
+    lane = rng.integers(0, RUSH_HOUR_LANES, missing)
+    eastbound = lane % 2 == 0
+    game.vehicles.spawn(
+        x=np.where(eastbound, -40, fc.SCREEN_WIDTH + 40) + rng.uniform(-10, 10, missing),
+        y=lane * (fc.SCREEN_HEIGHT - 20) / RUSH_HOUR_LANES,
+        speed=rng.uniform(1, 3, missing),
+        direction=np.where(eastbound, 0, math.pi),
+        color_index=rng.integers(0, len(fc.VEHICLE_COLORS), missing),
+        road_index=lane + 2  # Clear of the two regular lanes
+    )
+
+
+def _setup_rush_hour(game: fc.FlashpointCities):
+    # Start with the screen already full rather than streaming in from the edges
+    game.vehicles.clear()
+    rng = game.streams["traffic"]
+    lane = np.repeat(np.arange(RUSH_HOUR_LANES), RUSH_HOUR_VEHICLES // RUSH_HOUR_LANES)
+    slot = np.tile(np.arange(RUSH_HOUR_VEHICLES // RUSH_HOUR_LANES), RUSH_HOUR_LANES)
+    n = len(lane)
+    eastbound = lane % 2 == 0
+    game.vehicles.spawn(
+        x=slot * (fc.SCREEN_WIDTH / (n // RUSH_HOUR_LANES)),
+        y=lane * (fc.SCREEN_HEIGHT - 20) / RUSH_HOUR_LANES,
+        speed=rng.uniform(1, 3, n),
+        direction=np.where(eastbound, 0, math.pi),
+        color_index=rng.integers(0, len(fc.VEHICLE_COLORS), n),
+        road_index=lane + 2
+    )
+
+
+def _hold_speed_force(game: fc.FlashpointCities):
+    if not game.speed_force_active:
+        game.activate_speed_force()
+
+
+CROWD_PEDESTRIANS_PER_CITY = 20000
+
+
+def _setup_crowd(game: fc.FlashpointCities):
+    game.crowd = game.create_crowd()
+    game.populate_pedestrians(CROWD_PEDESTRIANS_PER_CITY)
+    game.weather = fc.WeatherType.SUNNY
+
+
+SCENARIOS: Dict[str, Scenario] = {scenario.name: scenario for scenario in [
+    Scenario("empty", "No traffic, clear skies", _setup_empty, _hold_weather(fc.WeatherType.SUNNY)),
+    Scenario("rush_hour", f"{RUSH_HOUR_VEHICLES} vehicles on screen", _setup_rush_hour, _top_up_rush_hour),
+    Scenario("storm", "Permanent thunderstorm", _hold_weather(fc.WeatherType.STORMY),
+             _hold_weather(fc.WeatherType.STORMY)),
+    Scenario("speed_force", "Speed force always active", _hold_speed_force, _hold_speed_force),
+    Scenario("fog", "Permanent fog and its full-screen overlay", _hold_weather(fc.WeatherType.FOGGY),
+             _hold_weather(fc.WeatherType.FOGGY)),
+    Scenario("crowd", f"{CROWD_PEDESTRIANS_PER_CITY} pedestrians per city", _setup_crowd,
+             _hold_weather(fc.WeatherType.SUNNY)),
+]}
+
+
+def distribution(samples: List[float]) -> Dict[str, float]:
+    """Summary of per-tick timings, in milliseconds"""
+    values = np.array(samples) * 1000.0
+    summary = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+    summary["mean"] = float(values.mean())
+    summary["max"] = float(values.max())
+    return summary
+
+
+def run_scenario(scenario: Scenario, ticks: int, seed: int, warmup: int = 60,
+                 allocation_ticks: int = 0) -> Dict[str, object]:
+    """Time update() and draw() per tick; optionally trace allocations over a second pass"""
+    game = fc.FlashpointCities(headless=True, seed=seed)
+    scenario.setup(game)
+    for _ in range(warmup):
+        if scenario.before_tick is not None:
+            scenario.before_tick(game)
+        game.update()
+        game.draw()
+
+    update_times, draw_times = [], []
+    clock = time.perf_counter
+    for _ in range(ticks):
+        if scenario.before_tick is not None:
+            scenario.before_tick(game)
+        start = clock()
+        game.update()
+        middle = clock()
+        game.draw()
+        end = clock()
+        update_times.append(middle - start)
+        draw_times.append(end - middle)
+
+    result: Dict[str, object] = {
+        "description": scenario.description,
+        "ticks": ticks,
+        "vehicles": len(game.traffic_vehicles()),
+        "update_ms": distribution(update_times),
+        "draw_ms": distribution(draw_times),
+    }
+    if allocation_ticks:
+        result["allocations"] = trace_allocations(game, scenario, allocation_ticks)
+    game.close()
+    return result
+
+
+def trace_allocations(game: fc.FlashpointCities, scenario: Scenario, ticks: int) -> Dict[str, float]:
+    """Peak transient Python-heap allocation inside update() and draw(), in KiB
+
+    Runs separately from the timed pass because tracing slows every allocation.
+    """
+    update_peaks, draw_peaks = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(ticks):
+            if scenario.before_tick is not None:
+                scenario.before_tick(game)
+            for phase, peaks in ((game.update, update_peaks), (game.draw, draw_peaks)):
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                phase()
+                peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return {
+        "update_peak_kib_mean": float(np.mean(update_peaks)) / 1024,
+        "update_peak_kib_max": float(np.max(update_peaks)) / 1024,
+        "draw_peak_kib_mean": float(np.mean(draw_peaks)) / 1024,
+        "draw_peak_kib_max": float(np.max(draw_peaks)) / 1024,
+    }
+
+
+def environment() -> Dict[str, str]:
+    """Versions the numbers depend on"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(baseline: Dict[str, object], results: Dict[str, object], threshold: float) -> List[str]:
+    """Lines describing every p95 timing that got worse than baseline by more than threshold"""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        for phase in ("update_ms", "draw_ms"):
+            old, new = before[phase]["p95"], result[phase]["p95"]
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append(f"{name} {phase[:-3]} p95 {old:.3f} ms -> {new:.3f} ms "
+                                   f"(+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_report(results: Dict[str, object], baseline: Optional[Dict[str, object]] = None):
+    """Human-readable table of every scenario, with baseline p95 deltas if given"""
+    print(f"{'scenario':<12} {'phase':<7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  ms")
+    for name, result in results["scenarios"].items():
+        for phase in ("update_ms", "draw_ms"):
+            stats = result[phase]
+            line = (f"{name:<12} {phase[:-3]:<7} {stats['p50']:8.3f} {stats['p95']:8.3f} "
+                    f"{stats['p99']:8.3f} {stats['max']:8.3f}")
+            before = (baseline or {}).get("scenarios", {}).get(name)
+            if before is not None and before[phase]["p95"] > 0:
+                line += f"  p95 {(stats['p95'] / before[phase]['p95'] - 1) * 100:+.0f}%"
+            print(line)
+        allocations = result.get("allocations")
+        if allocations:
+            print(f"{'':<12} alloc   update {allocations['update_peak_kib_mean']:.1f} KiB "
+                  f"(max {allocations['update_peak_kib_max']:.1f}), "
+                  f"draw {allocations['draw_peak_kib_mean']:.1f} KiB (max {allocations['draw_peak_kib_max']:.1f})")
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Flashpoint Cities benchmarks")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--ticks", type=int, default=600,
+                        help="timed ticks per scenario")
+    parser.add_argument("--warmup", type=int, default=60,
+                        help="untimed ticks before measuring")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="simulation seed, fixed so runs are comparable")
+    parser.add_argument("--allocations", type=int, default=0, metavar="TICKS",
+                        help="also trace allocations over this many extra ticks")
+    parser.add_argument("--output", metavar="PATH",
+                        help="write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="compare against results from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="p95 slowdown versus baseline that counts as a regression")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+    return args
+
+
+def main():
+    """Main entry point; exits with status 1 if a regression was found"""
+    args = parse_args()
+    names = args.scenarios or list(SCENARIOS)
+    results = {
+        "format": BENCH_FORMAT,
+        "seed": args.seed,
+        "warmup": args.warmup,
+        "environment": environment(),
+        "scenarios": {},
+    }
+    for name in names:
+        print(f"⏱️  {name}...", file=sys.stderr)
+        results["scenarios"][name] = run_scenario(SCENARIOS[name], args.ticks, args.seed,
+                                                  args.warmup, args.allocations)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
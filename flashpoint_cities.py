@@ -5,21 +5,45 @@ A unique city simulation featuring two interconnected cities with dynamic enviro
 realistic physics, and Flashpoint-inspired elements.
 """
 
+import argparse
+import os
+import threading
+import numpy as np
 import pygame
-import random
 import math
 import time
-from typing import List, Tuple, Dict, Optional
+from typing import Any, Callable, List, Tuple, Dict, Optional, Set
 from dataclasses import dataclass
 from enum import Enum
 
-# Initialize Pygame
-pygame.init()
+from flashpoint_atmosphere import Atmosphere, Tint, apply_tint
+from flashpoint_demand import TravelDemand, Zone
+from flashpoint_journal import InputJournal, JournalPlayer
+from flashpoint_layers import DirtyRectTracker, LayerCache
+from flashpoint_loop import SimulationThread
+from flashpoint_pedestrians import Crowd, Destination, NavGrid
+from flashpoint_particles import Emitter, ParticleFrame, ParticleSystem
+from flashpoint_profiler import FrameProfiler
+from flashpoint_random import RandomStreams, UniformBlock
+from flashpoint_schedule import Scheduler
+from flashpoint_signals import PhasePlan, SignalController
+from flashpoint_snapshot import SnapshotError, pack_snapshot, unpack_snapshot
+from flashpoint_spatial import SpatialGrid
+from flashpoint_sprites import PropSprites, vehicle_sprites
+from flashpoint_telemetry import (EXPORT_FORMATS, TRIP_COLUMNS, RingBuffer, SectionStats, TelemetryExporter,
+                                  trip_summary)
+from flashpoint_text import TextRenderer
+from flashpoint_traffic import ShardedTraffic, TrafficConfig, advance_traffic, split_regions
+from flashpoint_vehicles import VehicleStore
+from flashpoint_windows import CityWindows, WindowLayout
 
 # Constants
 SCREEN_WIDTH = 1600
 SCREEN_HEIGHT = 900
 FPS = 60
+RENDER_FPS = 120  # Frame cap when the simulation runs on its own thread
+TICK_SECONDS = 1.0 / FPS  # Fixed simulation timestep
+DAY_TICKS = 10000  # Simulation ticks from midnight to midnight
 BRIDGE_WIDTH = 200
 CITY_HEIGHT = 400
 
@@ -35,6 +59,74 @@ STREET_LIGHT = (255, 255, 0)
 TRAFFIC_LIGHT_RED = (255, 0, 0)
 TRAFFIC_LIGHT_GREEN = (0, 255, 0)
 TRAFFIC_LIGHT_YELLOW = (255, 255, 0)
+VEHICLE_COLORS = [(255, 0, 0), (0, 0, 255), (255, 255, 0), (0, 255, 0)]
+
+# Vehicle lanes (road_index in the vehicle store)
+LANE_EASTBOUND = 0  # Spawned in Central City
+LANE_WESTBOUND = 1  # Spawned in Starling City
+
+# Traffic
+TRAFFIC_LIGHT_PLAN = PhasePlan(green=181, red=181)  # Ticks per phase, about 3 seconds each
+SPEED_FORCE_TICKS = 300  # 5 seconds at 60 FPS
+TRAFFIC_LIGHT_POSITIONS = {"central": (350, SCREEN_HEIGHT - 120), "starling": (SCREEN_WIDTH - 370, SCREEN_HEIGHT - 120)}
+TRAFFIC_LIGHT_SPANS = {key: (x, 20) for key, (x, _) in TRAFFIC_LIGHT_POSITIONS.items()}  # (x, width) cars stop at
+ROAD_TOP = SCREEN_HEIGHT - 100
+ROAD_HEIGHT = 50
+MIN_VEHICLE_GAP = 6  # Bumper-to-bumper spacing when queueing
+BRAKE_DISTANCE = 60  # How far before a red light vehicles start stopping
+SHARD_PUBLISH_CAPACITY = 4096  # Vehicles each traffic shard can publish to the renderer
+
+# Building windows
+WINDOW_LAYOUT = WindowLayout(column_start=5, column_margin=5, column_spacing=15,
+                             row_start=5, row_margin=5, row_spacing=20, width=8, height=12)
+WINDOW_REFRESH_RATE = 0.001  # Share of windows re-rolled against the lighting schedule per tick
+
+# Weather tints: colour and alpha blended over the whole scene (fog) or baked into the sky (storm)
+FOG_DAY_TINT: Tint = ((200, 200, 200), 50)
+FOG_NIGHT_TINT: Tint = ((90, 90, 110), 50)
+STORM_SKY_TINT: Tint = ((40, 40, 50), 140)
+WEATHER_FADE_TICKS = 90  # Cross-fade between weather overlays
+
+# Profiling
+PROFILE_WINDOW = 600  # Frames of stage timings kept for percentiles
+PROFILE_OVERLAY_REFRESH = 30  # Frames between overlay text updates
+PROFILE_EXPORT_PATH = "flashpoint_profile.folded"
+INPUT_KEYS = {pygame.K_ESCAPE: "quit", pygame.K_SPACE: "speed_force", pygame.K_r: "change_weather",
+              pygame.K_F3: "toggle_profiler", pygame.K_F4: "export_profile"}
+REPLAY_SKIPPED_ACTIONS = {"export_profile"}  # Write files rather than change the simulation
+LAYERS_PER_FRAME = 1  # Scenery layers a window re-renders per frame, bottom first
+WORLDGEN_VERSION = 1  # Bump whenever generation changes what a seed produces, invalidating cached worlds
+WORLD_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "flashpoint_cities")
+
+# Pedestrians walk the ground in front of each city, the bridge deck and a quay across the road
+CITY_ZONES = {"central": (0, SCREEN_HEIGHT - CITY_HEIGHT, 460, ROAD_TOP - (SCREEN_HEIGHT - CITY_HEIGHT)),
+              "starling": (SCREEN_WIDTH - 460, SCREEN_HEIGHT - CITY_HEIGHT, 460, ROAD_TOP - (SCREEN_HEIGHT - CITY_HEIGHT))}
+QUAY_HEIGHT = 12  # Pavement between the road and the water
+SIDEWALK_GRAY = (150, 150, 150)
+PEDESTRIAN_CELL = 8  # Navigation grid resolution, in pixels
+PEDESTRIANS_PER_CITY = 1500
+PEDESTRIAN_SPEED = (0.4, 0.9)  # Pixels per tick
+PEDESTRIAN_SIZE = (2, 4)
+PEDESTRIAN_COLORS = [(240, 200, 160), (200, 60, 60), (60, 90, 200), (230, 230, 230), (40, 40, 40)]
+
+# Travel demand: each city's ground is split into districts, from its outer edge toward the bridge
+CITY_DISTRICTS = {"central": ("residential", "business", "tech"),
+                  "starling": ("residential", "industrial", "harbor")}
+TRIPS_PER_FLOOR_AREA = 0.0006  # Trips leaving a district per day, per square pixel of its buildings
+BRIDGE_TRIPS_PER_DAY = 20  # Sightseers driving out to stop on the bridge
+TRIP_DECAY_DISTANCE = 600  # Pixels; nearer districts trade more trips
+
+# Telemetry: trip records and statistics per lane for each city's road and the bridge
+TELEMETRY_SAMPLE_TICKS = 10  # Ticks between samples of the road sections
+TELEMETRY_WINDOW = 360  # Samples in the rolling aggregates, one simulated minute
+TELEMETRY_FLUSH_TICKS = 3600  # Ticks between exports when writing telemetry to disk
+TRIP_LOG_CAPACITY = 65536
+QUEUE_SPEED = 0.2  # Pixels per tick below which a vehicle counts as queued
+
+# Particles
+PARTICLE_CAPACITY = 16384
+RAIN_DROPS = 100  # Drops on screen at once in rainy weather
+RAIN_FALL_TICKS = 62  # Ticks for a drop to cross the screen
 
 class WeatherType(Enum):
     SUNNY = "sunny"
@@ -49,18 +141,6 @@ class Building:
     width: int
     height: int
     color: Tuple[int, int, int]
-    windows: List[Tuple[int, int, int, int]]
-    lit_windows: List[bool]
-
-@dataclass
-class Vehicle:
-    x: float
-    y: float
-    speed: float
-    direction: float
-    color: Tuple[int, int, int]
-    size: Tuple[int, int]
-    city: str  # "central" or "starling"
 
 @dataclass
 class Park:
@@ -72,74 +152,290 @@ class Park:
     benches: List[Tuple[int, int]]
     fountain: Optional[Tuple[int, int]]
 
+@dataclass(frozen=True)
+class FrameState:
+    """Everything draw() needs from the simulation, copied at the end of a tick"""
+    tick: int
+    weather: WeatherType
+    sky_color: Tuple[int, int, int]
+    overlay_tint: Optional[Tint]
+    traffic_lights: Dict[str, bool]
+    speed_force_active: bool
+    vehicles: Dict[str, np.ndarray]  # x, y, direction, heading_x, heading_y, last_step, speed, color_index
+    particles: ParticleFrame
+    pedestrians: Dict[str, np.ndarray]  # x, y, color_index of those out in the open
+    bridge_flow: Tuple[float, float]  # Rolling vehicles per minute over the bridge, eastbound and westbound
+
 class FlashpointCities:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Flashpoint Cities - Central City & Starling City")
+    def __init__(self, headless: bool = False, dirty_rects: bool = False, shards: int = 0,
+                 seed: Optional[int] = None, profile: bool = False, world_cache: Optional[str] = None,
+                 pedestrians_per_city: int = PEDESTRIANS_PER_CITY):
+        self.headless = headless
+        if headless:
+            # No window; draw() still works against an off-screen surface
+            self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        else:
+            # Only the display is initialized; fonts start on first use, audio and joysticks never
+            pygame.display.init()
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Flashpoint Cities - Central City & Starling City")
         self.clock = pygame.time.Clock()
         self.running = True
+        self.tick = 0  # Simulation ticks elapsed, each TICK_SECONDS long
+        
+        # One seed, one independent stream per subsystem: drawing never perturbs the simulation
+        self.streams = RandomStreams(seed)
+        self.seed = self.streams.seed
+        self.demand_scale = 1.0  # Multiplier on every trip rate; 0 stops new trips
+        self.weather_draws = UniformBlock(self.streams["weather"])
         
         # City data
         self.central_city_buildings: List[Building] = []
         self.starling_city_buildings: List[Building] = []
-        self.vehicles: List[Vehicle] = []
+        self.vehicles = VehicleStore(VEHICLE_COLORS, size=(20, 10))
+        self.vehicle_sprites = vehicle_sprites(VEHICLE_COLORS, self.vehicles.size)
+        self.pedestrian_pixels = np.array([self.screen.map_rgb(color) for color in PEDESTRIAN_COLORS])
+        self.prop_sprites = PropSprites(trunk=(139, 69, 19), leaves=(0, 100, 0), bench=(139, 69, 19))
         self.parks: List[Park] = []
         self.bridge_segments: List[Tuple[int, int, int, int]] = []
         
         # Dynamic elements
         self.weather = WeatherType.SUNNY
         self.time_of_day = 0.0  # 0.0 = midnight, 0.5 = noon, 1.0 = midnight
-        self.traffic_lights = {"central": True, "starling": True}  # True = green, False = red
-        self.light_timer = 0
+        
+        # Timed state changes fire from the scheduler when due instead of being counted down every tick
+        self.scheduler = Scheduler()
+        self.signals = SignalController(self.scheduler)
+        for key in TRAFFIC_LIGHT_POSITIONS:
+            self.signals.add(key, TRAFFIC_LIGHT_PLAN)
+        self.traffic_lights = self.signals.green  # True = green, False = red
         
         # Flashpoint effects
         self.speed_force_active = False
-        self.speed_force_timer = 0
-        self.lightning_strikes: List[Tuple[int, int, int]] = []  # x, y, intensity
+        self.scheduler.on("speed_force_end", self.end_speed_force)
+        self.particles = ParticleSystem(PARTICLE_CAPACITY, rng=self.streams["effects"])
+        self.lighting_rng = self.streams["lighting"]
+        self.create_emitters()
         
-        self.initialize_cities()
         self.generate_bridge()
+        # Only a seed chosen up front can be started again, so only then is the world worth caching
+        self.world_cache = world_cache
+        self.load_world(world_cache if seed is not None else None)
+        
+        # Spatial index over vehicles, rebuilt every tick for red-light queueing
+        self.spatial = SpatialGrid((-100, 0, SCREEN_WIDTH + 200, SCREEN_HEIGHT))
+        
+        # Pedestrians start inside the buildings and head out over the first minutes
+        self.crowd = self.create_crowd()
+        self.pedestrians_per_city = pedestrians_per_city  # Passed on to forks
+        self.populate_pedestrians(pedestrians_per_city)
+        
+        # Trips between districts, sampled each tick from rates precomputed for every slice of the day
+        self.demand, self.trip_spans = self.create_demand()
+        
+        # Finished trips and rolling statistics per lane for each stretch of road; exported on request
+        central_right = CITY_ZONES["central"][0] + CITY_ZONES["central"][2]
+        starling_left = CITY_ZONES["starling"][0]
+        self.bridge_x = (central_right + starling_left) / 2  # Trips crossing this went over the bridge
+        self.trip_log = RingBuffer(TRIP_COLUMNS, TRIP_LOG_CAPACITY)
+        self.section_stats = SectionStats({LANE_EASTBOUND: "eastbound", LANE_WESTBOUND: "westbound"},
+                                          [0, central_right, starling_left, SCREEN_WIDTH],
+                                          ["central", "bridge", "starling"], self.vehicles.size[0],
+                                          QUEUE_SPEED, TELEMETRY_WINDOW)
+        self.telemetry_exporter: Optional[TelemetryExporter] = None
+        
+        # Optionally step traffic in worker processes, one per stretch of road
+        self.traffic: Optional[ShardedTraffic] = None
+        self.shards = shards
+        if shards > 0:
+            self.traffic = self.create_traffic(shards)
+            self.trip_buffer = VehicleStore(VEHICLE_COLORS, size=self.vehicles.size, capacity=64)
+        self.unpublished_warned = False  # Whether a shard has outgrown SHARD_PUBLISH_CAPACITY yet
+        
+        # Cached static scenery
+        self.atmosphere = Atmosphere((SCREEN_WIDTH, SCREEN_HEIGHT), fade_ticks=WEATHER_FADE_TICKS)
+        self.atmosphere.reset(self.weather_tint())
+        self.sky_color = self.get_sky_color()
+        # A window shows its first frame as soon as the sky is ready; the rest streams in
+        self.layers = LayerCache((SCREEN_WIDTH, SCREEN_HEIGHT),
+                                 layers_per_build=None if headless else LAYERS_PER_FRAME)
+        self.layers.register("background", self.draw_background, opaque=True)
+        self.layers.register("roads", self.draw_roads)
+        self.layers.register("bridge", self.draw_bridge)
+        self.layers.register("parks", self.draw_parks)
+        self.layers.register("buildings", self.draw_buildings)
+        
+        # Opt-in dirty-rectangle rendering: repaint and push only changed regions
+        self.dirty_tracker: Optional[DirtyRectTracker] = None
+        if dirty_rects:
+            self.dirty_tracker = DirtyRectTracker(self.screen.get_rect())
+        self.drawn_traffic_lights: Dict[str, bool] = {}
+        
+        # draw() works from a frame captured after the latest tick, so the simulation
+        # can run on its own thread; state_lock guards everything the tick mutates
+        self.state_lock = threading.Lock()
+        self.pending_windows: Set[Tuple[int, int, int, int]] = set()  # Toggled since the last draw
+        self.frame: Optional[FrameState] = None
+        self.frame_alpha = 1.0  # How far the clock has moved from frame toward the next tick
+        
+        # Fonts are loaded once; rendered strings are cached
+        self.text = TextRenderer()
+        
+        # Per-stage timings; showing the overlay turns profiling on
+        self.profiler = FrameProfiler(PROFILE_WINDOW, enabled=profile)
+        self.show_profiler = False
+        self.profiler_lines: List[str] = []
+        
+        # Input arrives as named actions, so a journal can record it and replay it at the same ticks
+        self.actions: Dict[str, Callable[..., None]] = {
+            "quit": self.quit,
+            "speed_force": self.activate_speed_force,
+            "change_weather": self.change_weather,
+            "toggle_profiler": self.toggle_profiler,
+            "export_profile": self.export_profile,
+        }
+        self.journal: Optional[InputJournal] = None
+        
+    def load_world(self, cache_dir: Optional[str] = None):
+        """Generate buildings, windows and parks, or load them from the world cache if it has this seed"""
+        path = world_cache_path(cache_dir, self.seed) if cache_dir else None
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    _version, meta, arrays = unpack_snapshot(f.read())
+                if meta["seed"] == self.seed and meta["worldgen_version"] == WORLDGEN_VERSION:
+                    self.restore_world(meta, arrays)
+                    # Leave the stream where generating would have, so the run is the same either way
+                    self.streams["worldgen"].bit_generator.state = meta["worldgen_rng"]
+                    return
+            except (OSError, KeyError, ValueError, TypeError, SnapshotError):
+                pass  # Missing, stale or corrupt: generate and rewrite it
+        
+        self.initialize_cities()
         self.create_parks()
+        if path is not None:
+            meta, arrays = self.world_state()
+            meta.update(seed=self.seed, worldgen_version=WORLDGEN_VERSION,
+                        worldgen_rng=self.streams["worldgen"].bit_generator.state)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                temporary = f"{path}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as f:
+                    f.write(pack_snapshot(meta, arrays))
+                os.replace(temporary, path)  # Concurrent starts never see a half-written file
+            except OSError as e:
+                print(f"⚠️  Could not write world cache: {e}")
+    
+    def world_state(self) -> Tuple[Dict[str, object], Dict[str, np.ndarray]]:
+        """Generated buildings, window lighting and parks, as snapshot meta and arrays"""
+        buildings = self.central_city_buildings + self.starling_city_buildings
+        trees = [tree for park in self.parks for tree in park.trees]
+        benches = [bench for park in self.parks for bench in park.benches]
+        meta = {"central_building_count": len(self.central_city_buildings)}
+        arrays = {
+            "building_rects": np.array([(b.x, b.y, b.width, b.height) for b in buildings], dtype=np.int32).reshape(-1, 4),
+            "building_colors": np.array([b.color for b in buildings], dtype=np.uint8).reshape(-1, 3),
+            "central_lit_windows": self.central_windows.lit_bits,
+            "starling_lit_windows": self.starling_windows.lit_bits,
+            "park_rects": np.array([(p.x, p.y, p.width, p.height) for p in self.parks], dtype=np.int32).reshape(-1, 4),
+            "park_fountains": np.array([p.fountain or (-1, -1) for p in self.parks], dtype=np.int32).reshape(-1, 2),
+            "park_tree_counts": np.array([len(p.trees) for p in self.parks], dtype=np.uint32),
+            "park_bench_counts": np.array([len(p.benches) for p in self.parks], dtype=np.uint32),
+            "park_trees": np.array(trees, dtype=np.int32).reshape(-1, 2),
+            "park_benches": np.array(benches, dtype=np.int32).reshape(-1, 2),
+        }
+        return meta, arrays
+    
+    def restore_world(self, meta: Dict[str, object], arrays: Dict[str, np.ndarray]):
+        """Replace buildings, window lighting and parks with ones from world_state()
+
+        Everything is rebuilt and checked first, so a SnapshotError leaves the world untouched.
+        """
+        # Buildings, with window geometry re-derived from each building
+        buildings = [Building(x, y, width, height, tuple(color))
+                     for (x, y, width, height), color in zip(arrays["building_rects"].tolist(),
+                                                             arrays["building_colors"].tolist())]
+        central_count = meta["central_building_count"]
+        central_buildings, starling_buildings = buildings[:central_count], buildings[central_count:]
+        city_windows = []
+        for city_buildings, key in ((central_buildings, "central_lit_windows"),
+                                    (starling_buildings, "starling_lit_windows")):
+            windows = CityWindows(self.building_rects(city_buildings), WINDOW_LAYOUT)
+            if len(arrays[key]) != (windows.count + 7) // 8:
+                raise SnapshotError("window layout does not match this version of the generator")
+            windows.lit_bits = arrays[key].astype(np.uint8)
+            city_windows.append(windows)
+        
+        # Parks
+        parks = []
+        trees = [tuple(t) for t in arrays["park_trees"].tolist()]
+        benches = [tuple(b) for b in arrays["park_benches"].tolist()]
+        tree_offset = bench_offset = 0
+        for (x, y, width, height), fountain, tree_count, bench_count in zip(
+                arrays["park_rects"].tolist(), arrays["park_fountains"].tolist(),
+                arrays["park_tree_counts"].tolist(), arrays["park_bench_counts"].tolist()):
+            parks.append(Park(
+                x=x, y=y, width=width, height=height,
+                trees=trees[tree_offset:tree_offset + tree_count],
+                benches=benches[bench_offset:bench_offset + bench_count],
+                fountain=tuple(fountain) if fountain[0] >= 0 else None
+            ))
+            tree_offset += tree_count
+            bench_offset += bench_count
         
+        self.central_city_buildings, self.starling_city_buildings = central_buildings, starling_buildings
+        self.central_windows, self.starling_windows = city_windows
+        self.parks = parks
+        self.index_buildings()
+    
     def initialize_cities(self):
         """Generate buildings for both cities"""
+        rng = self.streams["worldgen"]
+        
         # Central City (left side)
         for i in range(25):
-            x = random.randint(50, 400)
-            y = random.randint(SCREEN_HEIGHT - CITY_HEIGHT, SCREEN_HEIGHT - 50)
-            width = random.randint(30, 80)
-            height = random.randint(60, 200)
-            color = random.choice(BUILDING_COLORS)
+            x = int(rng.integers(50, 400, endpoint=True))
+            y = int(rng.integers(SCREEN_HEIGHT - CITY_HEIGHT, SCREEN_HEIGHT - 50, endpoint=True))
+            width = int(rng.integers(30, 80, endpoint=True))
+            height = int(rng.integers(60, 200, endpoint=True))
+            color = BUILDING_COLORS[int(rng.integers(len(BUILDING_COLORS)))]
             
-            # Generate windows
-            windows = []
-            lit_windows = []
-            for wx in range(x + 5, x + width - 5, 15):
-                for wy in range(y + 5, y + height - 5, 20):
-                    windows.append((wx, wy, 8, 12))
-                    lit_windows.append(random.choice([True, False]))
-            
-            building = Building(x, y, width, height, color, windows, lit_windows)
+            building = Building(x, y, width, height, color)
             self.central_city_buildings.append(building)
         
         # Starling City (right side)
         for i in range(25):
-            x = random.randint(SCREEN_WIDTH - 400, SCREEN_WIDTH - 50)
-            y = random.randint(SCREEN_HEIGHT - CITY_HEIGHT, SCREEN_HEIGHT - 50)
-            width = random.randint(30, 80)
-            height = random.randint(60, 200)
-            color = random.choice(BUILDING_COLORS)
-            
-            # Generate windows
-            windows = []
-            lit_windows = []
-            for wx in range(x + 5, x + width - 5, 15):
-                for wy in range(y + 5, y + height - 5, 20):
-                    windows.append((wx, wy, 8, 12))
-                    lit_windows.append(random.choice([True, False]))
+            x = int(rng.integers(SCREEN_WIDTH - 400, SCREEN_WIDTH - 50, endpoint=True))
+            y = int(rng.integers(SCREEN_HEIGHT - CITY_HEIGHT, SCREEN_HEIGHT - 50, endpoint=True))
+            width = int(rng.integers(30, 80, endpoint=True))
+            height = int(rng.integers(60, 200, endpoint=True))
+            color = BUILDING_COLORS[int(rng.integers(len(BUILDING_COLORS)))]
             
-            building = Building(x, y, width, height, color, windows, lit_windows)
+            building = Building(x, y, width, height, color)
             self.starling_city_buildings.append(building)
+        
+        # Windows are derived from each building; only their lighting is stored
+        self.central_windows = CityWindows.generate(self.building_rects(self.central_city_buildings),
+                                                    WINDOW_LAYOUT, rng)
+        self.starling_windows = CityWindows.generate(self.building_rects(self.starling_city_buildings),
+                                                     WINDOW_LAYOUT, rng)
+        self.index_buildings()
+    
+    def building_rects(self, buildings: List[Building]) -> List[Tuple[int, int, int, int]]:
+        """(x, y, width, height) of each building"""
+        return [(b.x, b.y, b.width, b.height) for b in buildings]
+    
+    def index_buildings(self):
+        """Draw-order list of every building with the window store that owns it"""
+        self.building_draw_order: List[Tuple[Building, CityWindows, int]] = []
+        for buildings, windows in ((self.central_city_buildings, self.central_windows),
+                                   (self.starling_city_buildings, self.starling_windows)):
+            for i, building in enumerate(buildings):
+                self.building_draw_order.append((building, windows, i))
+        # Windows can overhang short buildings, so index each one by everything it draws
+        self.building_screen_rects = [pygame.Rect(b.x, b.y, b.width, b.height).unionall(
+                                          [pygame.Rect(rect) for rect, _ in windows.windows(i)])
+                                      for b, windows, i in self.building_draw_order]
     
     def generate_bridge(self):
         """Create the bridge connecting the two cities"""
@@ -161,6 +457,8 @@ class FlashpointCities:
     
     def create_parks(self):
         """Create parks and green spaces"""
+        rng = self.streams["worldgen"]
+        
         # Central City Park
         central_park = Park(
             x=100, y=SCREEN_HEIGHT - 300,
@@ -170,14 +468,14 @@ class FlashpointCities:
         
         # Add trees to central park
         for _ in range(8):
-            tree_x = random.randint(central_park.x + 20, central_park.x + central_park.width - 20)
-            tree_y = random.randint(central_park.y + 20, central_park.y + central_park.height - 20)
+            tree_x = int(rng.integers(central_park.x + 20, central_park.x + central_park.width - 20, endpoint=True))
+            tree_y = int(rng.integers(central_park.y + 20, central_park.y + central_park.height - 20, endpoint=True))
             central_park.trees.append((tree_x, tree_y))
         
         # Add benches
         for _ in range(3):
-            bench_x = random.randint(central_park.x + 30, central_park.x + central_park.width - 30)
-            bench_y = random.randint(central_park.y + 30, central_park.y + central_park.height - 30)
+            bench_x = int(rng.integers(central_park.x + 30, central_park.x + central_park.width - 30, endpoint=True))
+            bench_y = int(rng.integers(central_park.y + 30, central_park.y + central_park.height - 30, endpoint=True))
             central_park.benches.append((bench_x, bench_y))
         
         # Starling City Park
@@ -189,342 +487,958 @@ class FlashpointCities:
         
         # Add trees to starling park
         for _ in range(8):
-            tree_x = random.randint(starling_park.x + 20, starling_park.x + starling_park.width - 20)
-            tree_y = random.randint(starling_park.y + 20, starling_park.y + starling_park.height - 20)
+            tree_x = int(rng.integers(starling_park.x + 20, starling_park.x + starling_park.width - 20, endpoint=True))
+            tree_y = int(rng.integers(starling_park.y + 20, starling_park.y + starling_park.height - 20, endpoint=True))
             starling_park.trees.append((tree_x, tree_y))
         
         # Add benches
         for _ in range(3):
-            bench_x = random.randint(starling_park.x + 30, starling_park.x + starling_park.width - 30)
-            bench_y = random.randint(starling_park.y + 30, starling_park.y + starling_park.height - 30)
+            bench_x = int(rng.integers(starling_park.x + 30, starling_park.x + starling_park.width - 30, endpoint=True))
+            bench_y = int(rng.integers(starling_park.y + 30, starling_park.y + starling_park.height - 30, endpoint=True))
             starling_park.benches.append((bench_x, bench_y))
         
         self.parks.extend([central_park, starling_park])
     
-    def spawn_vehicles(self):
-        """Spawn vehicles on roads and bridge"""
-        if random.random() < 0.02:  # 2% chance per frame
-            # Spawn from Central City
-            if random.choice([True, False]):
-                vehicle = Vehicle(
-                    x=50, y=SCREEN_HEIGHT - 100,
-                    speed=random.uniform(1, 3),
-                    direction=0,  # Moving right
-                    color=random.choice([(255, 0, 0), (0, 0, 255), (255, 255, 0), (0, 255, 0)]),
-                    size=(20, 10),
-                    city="central"
-                )
-                self.vehicles.append(vehicle)
-        
-        if random.random() < 0.02:  # 2% chance per frame
-            # Spawn from Starling City
-            if random.choice([True, False]):
-                vehicle = Vehicle(
-                    x=SCREEN_WIDTH - 50, y=SCREEN_HEIGHT - 100,
-                    speed=random.uniform(1, 3),
-                    direction=180,  # Moving left
-                    color=random.choice([(255, 0, 0), (0, 0, 255), (255, 255, 0), (0, 255, 0)]),
-                    size=(20, 10),
-                    city="starling"
-                )
-                self.vehicles.append(vehicle)
+    def create_crowd(self) -> Crowd:
+        """Navigation grid, destinations and their flow fields for the current world, with no one in it yet"""
+        zones = list(CITY_ZONES.values())
+        quays = [(x, ROAD_TOP + ROAD_HEIGHT, width, QUAY_HEIGHT) for x, _, width, _ in zones]
+        top = min(y for _, y, _, _ in zones)
+        grid = NavGrid((0, top, SCREEN_WIDTH, ROAD_TOP + ROAD_HEIGHT + QUAY_HEIGHT - top), PEDESTRIAN_CELL)
+        for rect in zones + quays:
+            grid.set_walkable(rect)
+        deck = pygame.Rect(self.bridge_segments[0]).unionall([pygame.Rect(r) for r in self.bridge_segments[1:3]])
+        grid.set_walkable(tuple(deck))
+        # Crossings at the traffic lights, open while the cars have red
+        for signal, (light_x, _) in enumerate(TRAFFIC_LIGHT_POSITIONS.values()):
+            grid.add_crossing((light_x - 4, ROAD_TOP, 28, ROAD_HEIGHT), signal)
+        
+        destinations = []
+        for (city, zone), buildings, quay in zip(CITY_ZONES.items(),
+                                                 (self.central_city_buildings, self.starling_city_buildings), quays):
+            # Doors on each building's bottom edge, or where it meets the road
+            doors = [(b.x + b.width // 2 - 4, min(b.y + b.height, ROAD_TOP) - PEDESTRIAN_CELL, 8, PEDESTRIAN_CELL)
+                     for b in buildings]
+            benches = [(bench_x - 10, bench_y - 8, 20, 11) for park in self.parks
+                       if pygame.Rect(zone).collidepoint(park.x, park.y) for bench_x, bench_y in park.benches]
+            destinations.append(Destination(f"{city}_buildings", grid.mask(doors), dwell=(600, 3600), weight=3,
+                                            hidden=True))
+            destinations.append(Destination(f"{city}_park", grid.mask(benches), dwell=(300, 1500), weight=2))
+            destinations.append(Destination(f"{city}_quay", grid.mask([quay]), dwell=(120, 900)))
+        return Crowd(grid, destinations, self.streams["pedestrians"])
+    
+    def populate_pedestrians(self, per_city: int):
+        """Add pedestrians inside each city's buildings"""
+        for index, destination in enumerate(self.crowd.destinations):
+            if destination.name.endswith("_buildings"):
+                self.crowd.populate(per_city, index, PEDESTRIAN_SPEED, len(PEDESTRIAN_COLORS))
+    
+    def create_emitters(self):
+        """Register rain, lightning and speed force particle emitters"""
+        self.particles.add_emitter(Emitter(
+            "rain", color=(100, 150, 255), segment=(2, 10), velocity=(2.4, 14.5),
+            lifetime=(RAIN_FALL_TICKS - 2, RAIN_FALL_TICKS + 2),
+            spawn_area=(-100, -20, SCREEN_WIDTH + 100, 20),
+            rate=RAIN_DROPS / RAIN_FALL_TICKS, velocity_jitter=0.1
+        ))
+        self.particles.add_emitter(Emitter(
+            "lightning", color=(255, 255, 255), segment=(0, 20), velocity=(0, 0),
+            lifetime=(5, 25), spawn_area=(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT // 2),
+            segment_jitter=(20, 10), width=3, brightness_per_tick=10
+        ))
+        self.particles.add_emitter(Emitter(
+            "speed_force", color=(255, 255, 255), segment=(-50, 0), velocity=(-20, 0),
+            lifetime=(8, 12), spawn_area=(0, 0, SCREEN_WIDTH + 50, SCREEN_HEIGHT),
+            rate=2, width=2
+        ))
+    
+    def create_traffic(self, shards: int) -> ShardedTraffic:
+        """Split the road into equal stretches, each stepped by its own worker process"""
+        config = TrafficConfig(
+            palette=VEHICLE_COLORS, size=self.vehicles.size,
+            world=(-100, 0, SCREEN_WIDTH + 200, SCREEN_HEIGHT), despawn=(-50, SCREEN_WIDTH + 50),
+            road_top=ROAD_TOP, road_height=ROAD_HEIGHT, min_gap=MIN_VEHICLE_GAP,
+            brake_distance=BRAKE_DISTANCE
+        )
+        # Trips are started here and handed to the shard that owns their position
+        regions = split_regions(0, SCREEN_WIDTH, shards, TRAFFIC_LIGHT_SPANS, reach=BRAKE_DISTANCE + self.vehicles.size[0])
+        return ShardedTraffic(config, regions, SHARD_PUBLISH_CAPACITY)
+    
+    def create_demand(self) -> Tuple[TravelDemand, np.ndarray]:
+        """Districts of both cities plus the bridge, and the stretch of road each one's trips use"""
+        zones, spans = [], []
+        for (city, (zone_x, _, zone_width, _)), buildings in zip(
+                CITY_ZONES.items(), (self.central_city_buildings, self.starling_city_buildings)):
+            kinds = CITY_DISTRICTS[city]
+            band = zone_width / len(kinds)
+            centres = np.array([b.x + b.width / 2 for b in buildings])
+            areas = np.array([b.width * b.height for b in buildings], dtype=np.float64)
+            # Bands run from the city's outer edge toward the bridge
+            outward = zone_x + zone_width / 2 > SCREEN_WIDTH / 2
+            positions = (zone_x + zone_width - centres) if outward else (centres - zone_x)
+            bands = np.clip((positions // band).astype(int), 0, len(kinds) - 1)
+            for i, kind in enumerate(kinds):
+                left = zone_x + zone_width - (i + 1) * band if outward else zone_x + i * band
+                zones.append(Zone(f"{city}_{kind}", kind, (left + band / 2, ROAD_TOP),
+                                  float(areas[bands == i].sum()) * TRIPS_PER_FLOOR_AREA))
+                spans.append((left, left + band))
+        left = CITY_ZONES["central"][0] + CITY_ZONES["central"][2]
+        right = CITY_ZONES["starling"][0]
+        zones.append(Zone("bridge", "bridge", ((left + right) / 2, ROAD_TOP), BRIDGE_TRIPS_PER_DAY))
+        spans.append((left, right))
+        return TravelDemand(zones, DAY_TICKS, TRIP_DECAY_DISTANCE), np.array(spans, dtype=np.float64)
+    
+    def start_trips(self, store: VehicleStore) -> int:
+        """Spawn this tick's trips into store, each entering the road in its origin district
+
+        A trip's route is just its destination district, kept in route_id, and
+        it leaves the road at target_x somewhere inside it.
+        """
+        rng = self.streams["traffic"]
+        origins, destinations = self.demand.sample(rng, self.time_of_day, self.demand_scale)
+        n = len(origins)
+        if n == 0:
+            return 0
+        spans = self.trip_spans
+        start = rng.uniform(spans[origins, 0], spans[origins, 1])
+        end = rng.uniform(spans[destinations, 0], spans[destinations, 1])
+        eastbound = end > start
+        first = store.count
+        store.spawn(
+            x=start, y=ROAD_TOP,
+            speed=rng.uniform(1, 3, n),
+            direction=np.where(eastbound, 0, math.pi),
+            color_index=rng.integers(0, len(VEHICLE_COLORS), n),
+            road_index=np.where(eastbound, LANE_EASTBOUND, LANE_WESTBOUND)
+        )
+        trips = slice(first, store.count)
+        store.route_id[trips] = destinations
+        store.target_x[trips] = end
+        store.target_y[trips] = ROAD_TOP
+        store.origin[trips] = origins
+        store.spawn_tick[trips] = self.tick
+        self.profiler.count("trips", n)
+        return n
     
     def update_vehicles(self):
         """Update vehicle positions and remove off-screen vehicles"""
-        for vehicle in self.vehicles[:]:
-            # Update position based on direction
-            if vehicle.direction == 0:  # Moving right
-                vehicle.x += vehicle.speed
-            else:  # Moving left
-                vehicle.x -= vehicle.speed
-            
-            # Remove vehicles that are off-screen
-            if vehicle.x < -50 or vehicle.x > SCREEN_WIDTH + 50:
-                self.vehicles.remove(vehicle)
-    
-    def update_traffic_lights(self):
-        """Update traffic light timing"""
-        self.light_timer += 1
-        if self.light_timer > 180:  # 3 seconds at 60 FPS
-            self.traffic_lights["central"] = not self.traffic_lights["central"]
-            self.traffic_lights["starling"] = not self.traffic_lights["starling"]
-            self.light_timer = 0
+        red_lights = [span for key, span in TRAFFIC_LIGHT_SPANS.items() if not self.traffic_lights[key]]
+        advance_traffic(self.vehicles, self.spatial, red_lights, ROAD_TOP, ROAD_HEIGHT,
+                        MIN_VEHICLE_GAP, BRAKE_DISTANCE)
+        arrived = self.vehicles.arrived()
+        done = arrived | self.vehicles.outside(-50, -math.inf, SCREEN_WIDTH + 50, math.inf)
+        if done.any():
+            self.record_trips(self.vehicles.take(done), arrived[done], self.tick)
+    
+    def record_trips(self, finished: Dict[str, np.ndarray], arrived: np.ndarray, end_tick: int):
+        """Log the trips of vehicles that just left the road; arrived marks those that reached their destination"""
+        start_x, end_x = finished["spawn_x"], finished["x"]
+        self.trip_log.append({
+            "start_tick": finished["spawn_tick"],
+            "end_tick": np.full(len(end_x), end_tick),
+            "origin": finished["origin"],
+            "destination": finished["route_id"],
+            "lane": finished["road_index"],
+            "start_x": start_x,
+            "end_x": end_x,
+            "crossed_bridge": (start_x < self.bridge_x) != (end_x < self.bridge_x),
+            "arrived": arrived,  # Rather than driving off the screen
+        })
+    
+    def update_telemetry(self):
+        """Sample the road sections every few ticks and periodically hand records to the exporter"""
+        if self.tick % TELEMETRY_SAMPLE_TICKS == 0:
+            if self.traffic is None:
+                n = self.vehicles.count
+                x, lanes, steps = self.vehicles.x[:n], self.vehicles.road_index[:n], self.vehicles.last_step[:n]
+            else:
+                views = self.traffic.views()
+                x, lanes, steps = (np.concatenate([view[name] for view in views])
+                                   for name in ("x", "road_index", "last_step"))
+            self.section_stats.sample(self.tick, x + self.vehicles.size[0] / 2, lanes, steps)
+        if self.telemetry_exporter is not None and self.tick % TELEMETRY_FLUSH_TICKS == 0:
+            self.flush_telemetry()
+    
+    def bridge_flow(self) -> Tuple[float, float]:
+        """Rolling vehicles per minute over the bridge, eastbound and westbound"""
+        flow = self.section_stats.rolling()["flow"]
+        names = self.section_stats.names
+        per_minute = 60 / TICK_SECONDS
+        return (float(flow[names.index("bridge_eastbound")]) * per_minute,
+                float(flow[names.index("bridge_westbound")]) * per_minute)
+    
+    def export_telemetry(self, directory: str, export_format: str = "csv"):
+        """Write trip records and section samples to files in directory as the simulation runs"""
+        if self.telemetry_exporter is not None:
+            self.telemetry_exporter.close()
+        self.telemetry_exporter = TelemetryExporter(directory, export_format)
+    
+    def flush_telemetry(self):
+        """Queue every record not yet exported; the files are written on the exporter's thread"""
+        trips = self.trip_log.drain()
+        samples = self.section_stats.samples.drain()
+        samples["section"] = np.array(self.section_stats.names)[samples["section"]]
+        self.telemetry_exporter.submit("trips", trips)
+        self.telemetry_exporter.submit("sections", samples)
+    
+    def update_timers(self):
+        """Fire the traffic light and speed force timers that come due by the end of this tick"""
+        self.scheduler.advance(self.tick + 1)
     
     def update_weather(self):
         """Update weather effects"""
-        if random.random() < 0.001:  # 0.1% chance to change weather
-            self.weather = random.choice(list(WeatherType))
+        if self.weather_draws.chance(0.001):  # 0.1% chance to change weather
+            self.change_weather()
+        self.atmosphere.set_target(self.weather_tint())
+        self.atmosphere.update()
+    
+    def change_weather(self):
+        """Switch to a random weather type"""
+        weathers = list(WeatherType)
+        self.weather = weathers[self.weather_draws.index_below(len(weathers))]
+    
+    def is_night(self) -> bool:
+        return self.time_of_day < 0.25 or self.time_of_day > 0.75
+    
+    def weather_tint(self) -> Optional[Tint]:
+        """Full-screen overlay for the current weather and time of day, if any"""
+        if self.weather == WeatherType.FOGGY:
+            return FOG_NIGHT_TINT if self.is_night() else FOG_DAY_TINT
+        return None
     
     def update_time(self):
         """Update time of day"""
-        self.time_of_day += 0.0001  # Slow time progression
+        self.time_of_day += 1.0 / DAY_TICKS
         if self.time_of_day > 1.0:
             self.time_of_day = 0.0
     
     def update_lightning(self):
         """Update lightning effects"""
         if self.weather == WeatherType.STORMY:
-            if random.random() < 0.1:  # 10% chance per frame
-                x = random.randint(0, SCREEN_WIDTH)
-                y = random.randint(0, SCREEN_HEIGHT // 2)
-                intensity = random.randint(50, 255)
-                self.lightning_strikes.append((x, y, intensity))
-        
-        # Remove old lightning strikes
-        self.lightning_strikes = [(x, y, i-10) for x, y, i in self.lightning_strikes if i > 10]
+            # Lightning is only an effect, so it draws from the particles' stream
+            rng = self.particles.rng
+            if rng.random() < 0.1:  # 10% chance per frame
+                x = int(rng.integers(0, SCREEN_WIDTH, endpoint=True))
+                y = int(rng.integers(0, SCREEN_HEIGHT // 2, endpoint=True))
+                intensity = int(rng.integers(50, 255, endpoint=True))
+                # Fades by 10 brightness per tick, as the bolt's lifetime runs out
+                self.particles.emit("lightning", 1, x=x, y=y, lifetime=intensity // 10)
+    
+    def update_particles(self):
+        """Drive particle emitters from the weather and speed force, then step them"""
+        rain = self.particles["rain"]
+        raining = self.weather == WeatherType.RAINY
+        if raining and not rain.active:
+            self.particles.prewarm("rain")
+        rain.active = raining
+        self.particles["speed_force"].active = self.speed_force_active
+        self.particles.update()
     
     def activate_speed_force(self):
         """Activate Flashpoint speed force effect"""
         self.speed_force_active = True
-        self.speed_force_timer = 300  # 5 seconds at 60 FPS
+        self.scheduler.at("speed_force_end", self.tick + SPEED_FORCE_TICKS)
     
-    def update_speed_force(self):
-        """Update speed force effects"""
-        if self.speed_force_active:
-            self.speed_force_timer -= 1
-            if self.speed_force_timer <= 0:
-                self.speed_force_active = False
+    def end_speed_force(self, _tick: int):
+        self.speed_force_active = False
     
-    def draw_background(self):
-        """Draw sky and water background"""
-        # Sky gradient based on time of day
-        if self.time_of_day < 0.25 or self.time_of_day > 0.75:  # Night
-            sky_color = (20, 20, 40)
+    def update_lighting(self):
+        """Toggle building windows toward the time-of-day lighting schedule"""
+        hour = self.time_of_day * 24
+        for windows in (self.central_windows, self.starling_windows):
+            for slot in windows.update(hour, self.lighting_rng, WINDOW_REFRESH_RATE).tolist():
+                self.pending_windows.add(windows.window_rect(slot))
+    
+    def get_sky_color(self) -> Tuple[int, int, int]:
+        """Get the sky color for the current time of day and weather"""
+        if self.is_night():
+            color = (20, 20, 40)
         elif self.time_of_day < 0.5:  # Dawn to noon
-            sky_color = (135, 206, 235)
+            color = (135, 206, 235)
         else:  # Afternoon to dusk
-            sky_color = (255, 140, 0)
-        
-        self.screen.fill(sky_color)
+            color = (255, 140, 0)
+        # Storm clouds darken the sky; it is baked into the cached background layer
+        return apply_tint(color, STORM_SKY_TINT if self.weather == WeatherType.STORMY else None)
+    
+    def draw_background(self, surface: pygame.Surface):
+        """Draw sky and water background"""
+        # Sky gradient based on time of day
+        surface.fill(self.sky_color)
         
         # Water
         water_rect = pygame.Rect(0, SCREEN_HEIGHT - 50, SCREEN_WIDTH, 50)
-        pygame.draw.rect(self.screen, WATER_BLUE, water_rect)
+        pygame.draw.rect(surface, WATER_BLUE, water_rect)
     
-    def draw_bridge(self):
+    def draw_bridge(self, surface: pygame.Surface):
         """Draw the bridge connecting the cities"""
         for segment in self.bridge_segments:
-            pygame.draw.rect(self.screen, BRIDGE_GRAY, segment)
+            pygame.draw.rect(surface, BRIDGE_GRAY, segment)
         
         # Bridge road markings
         bridge_y = SCREEN_HEIGHT - 150
-        pygame.draw.line(self.screen, (255, 255, 255), (400, bridge_y - 10), (SCREEN_WIDTH - 400, bridge_y - 10), 2)
-        pygame.draw.line(self.screen, (255, 255, 255), (400, bridge_y + 10), (SCREEN_WIDTH - 400, bridge_y + 10), 2)
+        pygame.draw.line(surface, (255, 255, 255), (400, bridge_y - 10), (SCREEN_WIDTH - 400, bridge_y - 10), 2)
+        pygame.draw.line(surface, (255, 255, 255), (400, bridge_y + 10), (SCREEN_WIDTH - 400, bridge_y + 10), 2)
     
-    def draw_roads(self):
+    def draw_roads(self, surface: pygame.Surface):
         """Draw road networks"""
         # Main roads
-        pygame.draw.rect(self.screen, ROAD_ASPHALT, (0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 50))
+        pygame.draw.rect(surface, ROAD_ASPHALT, (0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 50))
         
         # Road markings
         for x in range(0, SCREEN_WIDTH, 50):
-            pygame.draw.line(self.screen, (255, 255, 255), (x, SCREEN_HEIGHT - 75), (x + 25, SCREEN_HEIGHT - 75), 2)
+            pygame.draw.line(surface, (255, 255, 255), (x, SCREEN_HEIGHT - 75), (x + 25, SCREEN_HEIGHT - 75), 2)
         
         # Side streets
-        pygame.draw.rect(self.screen, ROAD_ASPHALT, (200, SCREEN_HEIGHT - 200, 100, 20))
-        pygame.draw.rect(self.screen, ROAD_ASPHALT, (SCREEN_WIDTH - 300, SCREEN_HEIGHT - 200, 100, 20))
+        pygame.draw.rect(surface, ROAD_ASPHALT, (200, SCREEN_HEIGHT - 200, 100, 20))
+        pygame.draw.rect(surface, ROAD_ASPHALT, (SCREEN_WIDTH - 300, SCREEN_HEIGHT - 200, 100, 20))
+        
+        # Quays along the water and the crossings leading to them
+        for x, _, width, _ in CITY_ZONES.values():
+            pygame.draw.rect(surface, SIDEWALK_GRAY, (x, ROAD_TOP + ROAD_HEIGHT, width, QUAY_HEIGHT))
+        for light_x, _ in TRAFFIC_LIGHT_POSITIONS.values():
+            for stripe_x in range(light_x - 4, light_x + 24, 8):
+                pygame.draw.rect(surface, (255, 255, 255), (stripe_x, ROAD_TOP, 4, ROAD_HEIGHT))
     
-    def draw_buildings(self):
+    def draw_buildings(self, surface: pygame.Surface):
         """Draw all buildings with windows"""
-        all_buildings = self.central_city_buildings + self.starling_city_buildings
+        with self.state_lock:  # The simulation thread toggles windows
+            for index in range(len(self.building_draw_order)):
+                self.draw_building(surface, index)
+    
+    def draw_building(self, surface: pygame.Surface, index: int):
+        """Draw one building (by draw order) with its windows"""
+        building, windows, window_index = self.building_draw_order[index]
+        pygame.draw.rect(surface, building.color, (building.x, building.y, building.width, building.height))
         
-        for building in all_buildings:
-            # Draw building
-            pygame.draw.rect(self.screen, building.color, (building.x, building.y, building.width, building.height))
-            
-            # Draw windows
-            for i, window in enumerate(building.windows):
-                if building.lit_windows[i]:
-                    pygame.draw.rect(self.screen, (255, 255, 150), window)
-                else:
-                    pygame.draw.rect(self.screen, (50, 50, 50), window)
-    
-    def draw_parks(self):
+        # Draw windows
+        for window, lit in windows.windows(window_index):
+            if lit:
+                pygame.draw.rect(surface, (255, 255, 150), window)
+            else:
+                pygame.draw.rect(surface, (50, 50, 50), window)
+    
+    def patch_window(self, window: Tuple[int, int, int, int]):
+        """Redraw the cached buildings layer under one toggled window"""
+        def redraw(surface: pygame.Surface):
+            # Buildings overlap, so repaint every building under the window in draw order
+            surface.set_clip(window)
+            surface.fill((0, 0, 0, 0), window)
+            for index in pygame.Rect(window).collidelistall(self.building_screen_rects):
+                self.draw_building(surface, index)
+            surface.set_clip(None)
+        self.layers.patch("buildings", window, redraw)
+    
+    def draw_parks(self, surface: pygame.Surface):
         """Draw parks and green spaces"""
         for park in self.parks:
             # Draw grass
-            pygame.draw.rect(self.screen, PARK_GREEN, (park.x, park.y, park.width, park.height))
-            
-            # Draw trees
-            for tree_x, tree_y in park.trees:
-                # Tree trunk
-                pygame.draw.rect(self.screen, (139, 69, 19), (tree_x - 3, tree_y, 6, 15))
-                # Tree leaves
-                pygame.draw.circle(self.screen, (0, 100, 0), (tree_x, tree_y - 5), 12)
+            pygame.draw.rect(surface, PARK_GREEN, (park.x, park.y, park.width, park.height))
             
-            # Draw benches
-            for bench_x, bench_y in park.benches:
-                pygame.draw.rect(self.screen, (139, 69, 19), (bench_x - 10, bench_y, 20, 3))
-                pygame.draw.rect(self.screen, (139, 69, 19), (bench_x - 10, bench_y - 8, 3, 8))
-                pygame.draw.rect(self.screen, (139, 69, 19), (bench_x + 7, bench_y - 8, 3, 8))
-            
-            # Draw fountain
-            if park.fountain:
-                fx, fy = park.fountain
-                pygame.draw.circle(self.screen, (200, 200, 200), (fx, fy), 15)
-                pygame.draw.circle(self.screen, (100, 150, 255), (fx, fy), 10)
+            # Trees, benches and the fountain, blitted together from pre-rendered sprites
+            fountains = [park.fountain] if park.fountain else []
+            surface.blits(self.prop_sprites.batch(park.trees, park.benches, fountains), False)
+    
+    def traffic_vehicles(self):
+        """Vehicles to draw and count: the local store, or what the traffic shards last published"""
+        return self.vehicles if self.traffic is None else self.traffic
     
     def draw_vehicles(self):
-        """Draw all vehicles"""
-        for vehicle in self.vehicles:
-            # Apply speed force effect
-            if self.speed_force_active:
-                # Create motion blur effect
-                for i in range(3):
-                    alpha = 100 - i * 30
-                    blur_color = (*vehicle.color, alpha)
-                    blur_x = vehicle.x - i * vehicle.speed * 2
-                    pygame.draw.rect(self.screen, vehicle.color, (blur_x, vehicle.y, vehicle.size[0], vehicle.size[1]))
-            else:
-                pygame.draw.rect(self.screen, vehicle.color, (vehicle.x, vehicle.y, vehicle.size[0], vehicle.size[1]))
+        """Draw all vehicles, interpolated between the last two ticks"""
+        vehicles = self.frame.vehicles
+        behind = (1.0 - self.frame_alpha) * vehicles["last_step"]
+        xs = vehicles["x"] - vehicles["heading_x"] * behind
+        ys = vehicles["y"] - vehicles["heading_y"] * behind
+        # Vehicle positions are top-left corners; sprites are placed by their centre
+        width, height = self.vehicles.size
+        xs = xs + width / 2
+        ys = ys + height / 2
+        directions, color_indices = vehicles["direction"], vehicles["color_index"]
+        if self.frame.speed_force_active:
+            # Motion blur: each vehicle followed by two trailing copies
+            xs = (xs[:, None] - np.arange(3) * (vehicles["speed"][:, None] * 2)).ravel()
+            ys, directions, color_indices = (np.repeat(values, 3) for values in (ys, directions, color_indices))
+        self.blit_batch(self.vehicle_sprites.batch(xs, ys, directions, color_indices))
+    
+    def draw_pedestrians(self):
+        """Plot every pedestrian out in the open straight into the screen's pixels"""
+        pedestrians = self.frame.pedestrians
+        if len(pedestrians["x"]) == 0:
+            return
+        width, height = PEDESTRIAN_SIZE
+        xs = np.clip(pedestrians["x"].astype(np.int64) - width // 2, 0, SCREEN_WIDTH - width)
+        ys = np.clip(pedestrians["y"].astype(np.int64) - height, 0, SCREEN_HEIGHT - height)
+        if self.screen.get_bytesize() in (1, 2, 4):
+            colors = self.pedestrian_pixels[pedestrians["color_index"]]
+            pixels = pygame.surfarray.pixels2d(self.screen)
+            for dx in range(width):
+                for dy in range(height):
+                    pixels[xs + dx, ys + dy] = colors
+            del pixels  # Unlocks the screen
+        else:
+            # No 2D pixel view of 24-bit surfaces: one fill per pedestrian
+            for x, y, color_index in zip(xs.tolist(), ys.tolist(), pedestrians["color_index"].tolist()):
+                self.screen.fill(PEDESTRIAN_COLORS[color_index], (x, y, width, height))
+        # One rect per side of the river, so the dirty area stays close to the crowds
+        left = xs < SCREEN_WIDTH // 2
+        for side in (left, ~left):
+            if side.any():
+                x0, y0 = int(xs[side].min()), int(ys[side].min())
+                self.mark_dirty(pygame.Rect(x0, y0, int(xs[side].max()) + width - x0, int(ys[side].max()) + height - y0))
     
     def draw_traffic_lights(self):
         """Draw traffic lights"""
+        traffic_lights = self.frame.traffic_lights
+        # Lights are opaque and redrawn in place, so only a toggle needs pushing
+        if traffic_lights != self.drawn_traffic_lights:
+            self.drawn_traffic_lights = dict(traffic_lights)
+            for light_x, light_y in TRAFFIC_LIGHT_POSITIONS.values():
+                self.mark_dirty(pygame.Rect(light_x, light_y, 20, 50))
+        
         # Central City traffic light
-        light_x = 350
-        light_y = SCREEN_HEIGHT - 120
+        light_x, light_y = TRAFFIC_LIGHT_POSITIONS["central"]
         
         pygame.draw.rect(self.screen, (0, 0, 0), (light_x, light_y, 20, 50))
-        if self.traffic_lights["central"]:
+        if traffic_lights["central"]:
             pygame.draw.circle(self.screen, TRAFFIC_LIGHT_GREEN, (light_x + 10, light_y + 15), 8)
         else:
             pygame.draw.circle(self.screen, TRAFFIC_LIGHT_RED, (light_x + 10, light_y + 35), 8)
         
         # Starling City traffic light
-        light_x = SCREEN_WIDTH - 370
-        light_y = SCREEN_HEIGHT - 120
+        light_x, light_y = TRAFFIC_LIGHT_POSITIONS["starling"]
         
         pygame.draw.rect(self.screen, (0, 0, 0), (light_x, light_y, 20, 50))
-        if self.traffic_lights["starling"]:
+        if traffic_lights["starling"]:
             pygame.draw.circle(self.screen, TRAFFIC_LIGHT_GREEN, (light_x + 10, light_y + 15), 8)
         else:
             pygame.draw.circle(self.screen, TRAFFIC_LIGHT_RED, (light_x + 10, light_y + 35), 8)
     
     def draw_lightning(self):
         """Draw lightning effects"""
-        for x, y, intensity in self.lightning_strikes:
-            color = (intensity, intensity, intensity)
-            pygame.draw.line(self.screen, color, (x, y), (x + random.randint(-20, 20), y + random.randint(10, 30)), 3)
+        drawn = self.frame.particles.draw(self.screen, "lightning")
+        if drawn:
+            self.mark_dirty(drawn)
     
     def draw_weather_effects(self):
         """Draw weather effects"""
-        if self.weather == WeatherType.RAINY:
-            for _ in range(100):
-                x = random.randint(0, SCREEN_WIDTH)
-                y = random.randint(0, SCREEN_HEIGHT)
-                pygame.draw.line(self.screen, (100, 150, 255), (x, y), (x + 2, y + 10), 1)
-        
-        elif self.weather == WeatherType.FOGGY:
-            fog_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            fog_surface.set_alpha(50)
-            fog_surface.fill((200, 200, 200))
-            self.screen.blit(fog_surface, (0, 0))
+        # Drops keep falling for a moment after the rain stops
+        drawn = self.frame.particles.draw(self.screen, "rain")
+        if drawn:
+            self.mark_dirty(drawn)
+        
+        # Fog and storm overlays cover the whole screen
+        overlay = self.atmosphere.overlay(self.frame.overlay_tint)
+        if overlay is not None:
+            self.mark_screen_dirty()
+            self.screen.blit(overlay, (0, 0))
     
     def draw_speed_force_effects(self):
         """Draw speed force visual effects"""
-        if self.speed_force_active:
-            # Create speed lines
-            for _ in range(20):
-                x = random.randint(0, SCREEN_WIDTH)
-                y = random.randint(0, SCREEN_HEIGHT)
-                pygame.draw.line(self.screen, (255, 255, 255), (x, y), (x - 50, y), 2)
+        # Speed lines streak left and fade out once the speed force ends
+        drawn = self.frame.particles.draw(self.screen, "speed_force")
+        if drawn:
+            self.mark_dirty(drawn)
     
     def draw_ui(self):
         """Draw user interface elements"""
-        font = pygame.font.Font(None, 36)
-        
         # City labels
-        central_text = font.render("CENTRAL CITY", True, (255, 255, 255))
-        starling_text = font.render("STARLING CITY", True, (255, 255, 255))
-        
-        self.screen.blit(central_text, (50, 50))
-        self.screen.blit(starling_text, (SCREEN_WIDTH - 200, 50))
+        self.mark_dirty(self.text.blit(self.screen, "CENTRAL CITY", 36, (255, 255, 255), (50, 50)))
+        self.mark_dirty(self.text.blit(self.screen, "STARLING CITY", 36, (255, 255, 255), (SCREEN_WIDTH - 200, 50)))
         
         # Weather display
-        weather_text = font.render(f"Weather: {self.weather.value.upper()}", True, (255, 255, 255))
-        self.screen.blit(weather_text, (SCREEN_WIDTH // 2 - 100, 50))
+        weather_label = f"Weather: {self.frame.weather.value.upper()}"
+        self.mark_dirty(self.text.blit(self.screen, weather_label, 36, (255, 255, 255), (SCREEN_WIDTH // 2 - 100, 50)))
+        
+        # Bridge throughput over the last minute
+        east, west = self.frame.bridge_flow
+        bridge_label = f"Bridge: {east:.0f} east, {west:.0f} west vehicles/min"
+        self.mark_dirty(self.text.blit(self.screen, bridge_label, 24, (255, 255, 255), (SCREEN_WIDTH // 2 - 100, 80)))
         
         # Speed force indicator
-        if self.speed_force_active:
-            speed_text = font.render("SPEED FORCE ACTIVE!", True, (255, 255, 0))
-            self.screen.blit(speed_text, (SCREEN_WIDTH // 2 - 100, 100))
+        if self.frame.speed_force_active:
+            self.mark_dirty(self.text.blit(self.screen, "SPEED FORCE ACTIVE!", 36, (255, 255, 0), (SCREEN_WIDTH // 2 - 100, 100)))
         
         # Instructions
-        instruction_font = pygame.font.Font(None, 24)
         instructions = [
             "Press SPACE to activate Speed Force",
             "Press R to change weather",
+            "Press F3 for performance stats, F4 to export a profile",
             "Press ESC to exit"
         ]
         
         for i, instruction in enumerate(instructions):
-            text = instruction_font.render(instruction, True, (200, 200, 200))
-            self.screen.blit(text, (10, SCREEN_HEIGHT - 80 + i * 25))
+            y = SCREEN_HEIGHT - 5 - (len(instructions) - i) * 25
+            self.mark_dirty(self.text.blit(self.screen, instruction, 24, (200, 200, 200), (10, y)))
+        
+        if self.show_profiler:
+            self.draw_profiler_overlay()
+    
+    def draw_profiler_overlay(self):
+        """Frame times, the hottest stages and counters, refreshed every few frames"""
+        profiler = self.profiler
+        if not self.profiler_lines or profiler.frames % PROFILE_OVERLAY_REFRESH == 0:
+            summary = profiler.summary()
+            stages, counters = summary["stages"], summary["counters"]
+            lines = []
+            for phase in ("update", "draw"):
+                if phase in stages:
+                    stats = stages[phase]
+                    lines.append(f"{phase}: {stats['mean']:.2f} ms mean, {stats['p95']:.2f} ms p95")
+            for path, stats in profiler.hot_stages(5):
+                lines.append(f"  {path.rsplit(';', 1)[-1]}: {stats['mean']:.2f} ms, p95 {stats['p95']:.2f}")
+            lines.append("  ".join(f"{name}: {stats['mean']:.0f}" for name, stats in counters.items()))
+            self.profiler_lines = lines
+        for i, line in enumerate(self.profiler_lines):
+            self.mark_dirty(self.text.blit(self.screen, line, 20, (255, 255, 255), (10, 100 + i * 20)))
     
     def handle_events(self):
         """Handle user input events"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.running = False
-                elif event.key == pygame.K_SPACE:
-                    self.activate_speed_force()
-                elif event.key == pygame.K_r:
-                    self.weather = random.choice(list(WeatherType))
+                self.perform("quit")
+            elif event.type == pygame.KEYDOWN and event.key in INPUT_KEYS:
+                self.perform(INPUT_KEYS[event.key])
+    
+    def perform(self, action: str, *args: Any):
+        """Apply an input action before the next tick, journaling it when recording"""
+        if self.journal is not None:
+            self.journal.record(self.tick, action, *args)
+        self.actions[action](*args)
+    
+    def quit(self):
+        self.running = False
+    
+    def toggle_profiler(self):
+        """Show or hide the profiler overlay; showing it turns profiling on"""
+        self.show_profiler = not self.show_profiler
+        if self.show_profiler:
+            self.profiler.enabled = True
+    
+    def export_profile(self):
+        self.profiler.export_folded(PROFILE_EXPORT_PATH)
+        print(f"🔥 Wrote profile to {PROFILE_EXPORT_PATH}")
+    
+    def record_journal(self, path: str, settings: Dict[str, Any]):
+        """Journal every input from now on, with the settings needed to start this run again"""
+        self.journal = InputJournal(settings)
+        self.journal.open(path)
+    
+    def replay(self, journal: InputJournal, render: bool = False) -> float:
+        """Apply a journal's actions at their ticks, stepping as fast as possible; returns wall-clock seconds
+
+        render draws every tick too, to the window unless headless.
+        """
+        player = JournalPlayer(journal)
+        end = journal.last_tick()
+        start = time.perf_counter()
+        while self.running and self.tick < end:
+            for entry in player.due(self.tick):
+                if entry.action not in REPLAY_SKIPPED_ACTIONS:
+                    self.actions[entry.action](*entry.args)
+            self.update()
+            if render:
+                self.draw()
+                if not self.headless:
+                    pygame.event.pump()  # Keep the window responsive; input is ignored
+                    self.present()
+        if self.traffic is not None:
+            self.traffic.wait()
+        return time.perf_counter() - start
+    
+    def update_traffic(self):
+        """Spawn and move vehicles, locally or in the traffic shards"""
+        if self.traffic is None:
+            self.start_trips(self.vehicles)
+            self.update_vehicles()
+        else:
+            if self.start_trips(self.trip_buffer):
+                self.traffic.extend(self.trip_buffer.take(np.ones(self.trip_buffer.count, dtype=bool)))
+            # Workers step this tick while the previous one is drawn from shared memory
+            self.traffic.step_async({key for key, green in self.traffic_lights.items() if not green})
+            for finished, arrived in self.traffic.take_finished():
+                self.record_trips(finished, arrived, self.tick - 1)  # Collected from the tick started last time
+            # Vehicles a full shard could not publish are neither drawn nor sampled by telemetry
+            unpublished = self.traffic.unpublished()
+            self.profiler.gauge("unpublished_vehicles", unpublished)
+            if unpublished and not self.unpublished_warned:
+                print(f"⚠️  {unpublished} vehicles exceed SHARD_PUBLISH_CAPACITY ({SHARD_PUBLISH_CAPACITY}) "
+                      f"and are not drawn or counted")
+                self.unpublished_warned = True
+    
+    def update_pedestrians(self):
+        """Move the crowds; a crossing opens while its traffic light is red"""
+        self.crowd.update(np.array([not self.traffic_lights[key] for key in TRAFFIC_LIGHT_POSITIONS]))
     
     def update(self):
         """Update all game elements"""
-        self.spawn_vehicles()
-        self.update_vehicles()
-        self.update_traffic_lights()
-        self.update_weather()
-        self.update_time()
-        self.update_lightning()
-        self.update_speed_force()
-    
-    def draw(self):
-        """Draw all game elements"""
-        self.draw_background()
-        self.draw_roads()
-        self.draw_bridge()
-        self.draw_parks()
-        self.draw_buildings()
-        self.draw_vehicles()
-        self.draw_traffic_lights()
-        self.draw_lightning()
-        self.draw_weather_effects()
-        self.draw_speed_force_effects()
-        self.draw_ui()
-    
-    def run(self):
-        """Main game loop"""
+        profiler = self.profiler
+        with profiler.stage("update"):
+            for stage in (self.update_traffic, self.update_telemetry, self.update_timers, self.update_pedestrians,
+                          self.update_weather, self.update_time, self.update_lighting, self.update_lightning,
+                          self.update_particles):
+                with profiler.stage(stage.__name__):
+                    stage()
+        if profiler.enabled:
+            profiler.gauge("vehicles", len(self.traffic_vehicles()))
+            profiler.gauge("particles", int(np.count_nonzero(self.particles.alive)))
+            profiler.gauge("pedestrians", int(np.count_nonzero(self.crowd.visible())))
+            profiler.end_frame()
+        self.tick += 1
+    
+    def step(self, ticks: int = 1):
+        """Advance the simulation by a number of fixed timesteps without drawing"""
+        for _ in range(ticks):
+            self.update()
+    
+    @property
+    def sim_time(self) -> float:
+        """Simulated seconds elapsed"""
+        return self.tick * TICK_SECONDS
+    
+    def blit_batch(self, batch: List[Tuple[pygame.Surface, Tuple[float, float]]]):
+        """Blit a sprite batch onto the screen in one call, recording where it drew"""
+        if not batch:
+            return
+        self.profiler.count("draw_calls")
+        if self.dirty_tracker is not None:
+            for rect in self.screen.blits(batch):
+                self.dirty_tracker.mark(rect)
+        else:
+            self.screen.blits(batch, False)
+    
+    def mark_dirty(self, rect: pygame.Rect):
+        """Record a region drawn this frame for dirty-rectangle rendering"""
+        self.profiler.count("draw_calls")
+        if self.dirty_tracker is not None:
+            self.dirty_tracker.mark(rect)
+    
+    def mark_screen_dirty(self):
+        """Record that this frame drew over the whole screen"""
+        self.profiler.count("draw_calls")
+        if self.dirty_tracker is not None:
+            self.dirty_tracker.mark_screen()
+    
+    def draw_static_layers(self):
+        """Blit the cached background, roads, bridge, parks and buildings"""
+        sky_color = self.frame.sky_color
+        if sky_color != self.sky_color:
+            self.sky_color = sky_color
+            self.layers.invalidate("background")
+        # The simulation thread toggles windows, so their lighting is read under its lock
+        with self.state_lock:
+            pending, self.pending_windows = self.pending_windows, set()
+            for window in pending:
+                self.patch_window(window)
+        if self.dirty_tracker is not None:
+            # Only erase what was drawn on top of the scenery last frame
+            self.dirty_tracker.restore(self.layers, self.screen)
+        else:
+            self.layers.blit_to(self.screen)
+    
+    def present(self):
+        """Push the finished frame to the display"""
+        if self.dirty_tracker is None:
+            pygame.display.flip()
+            return
+        rects = self.dirty_tracker.flush()
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+    
+    def capture_frame(self) -> FrameState:
+        """Copy what draw() needs out of the simulation"""
+        if self.traffic is None:
+            n = self.vehicles.count
+            vehicles = {name: getattr(self.vehicles, name)[:n].copy()
+                        for name in ("x", "y", "direction", "heading_x", "heading_y", "last_step", "speed",
+                                     "color_index")}
+        else:
+            views = self.traffic.views()
+            vehicles = {name: np.concatenate([view[name] for view in views])
+                        for name in ("x", "y", "direction", "last_step", "speed", "color_index")}
+            direction = vehicles["direction"]
+            vehicles["heading_x"], vehicles["heading_y"] = np.cos(direction), np.sin(direction)
+        return FrameState(
+            tick=self.tick,
+            weather=self.weather,
+            sky_color=self.get_sky_color(),
+            overlay_tint=self.atmosphere.current_tint(),
+            traffic_lights=dict(self.traffic_lights),
+            speed_force_active=self.speed_force_active,
+            vehicles=vehicles,
+            particles=self.particles.freeze(),
+            pedestrians=self.capture_pedestrians(),
+            bridge_flow=self.bridge_flow(),
+        )
+    
+    def capture_pedestrians(self) -> Dict[str, np.ndarray]:
+        crowd = self.crowd
+        visible = crowd.visible()
+        return {name: getattr(crowd, name)[:crowd.count][visible] for name in ("x", "y", "color_index")}
+    
+    def draw(self, frame: Optional[FrameState] = None, alpha: float = 1.0):
+        """Draw all game elements from a captured frame (by default, the current state)"""
+        self.frame = frame if frame is not None else self.capture_frame()
+        self.frame_alpha = alpha
+        profiler = self.profiler
+        with profiler.stage("draw"):
+            for stage in (self.draw_static_layers, self.draw_pedestrians, self.draw_vehicles, self.draw_traffic_lights,
+                          self.draw_lightning, self.draw_weather_effects, self.draw_speed_force_effects,
+                          self.draw_ui):
+                with profiler.stage(stage.__name__):
+                    stage()
+    
+    def run(self, threaded: bool = False):
+        """Main game loop; threaded runs the simulation apart from drawing"""
         print("🚀 Starting Flashpoint Cities Simulation...")
         print("🏙️  Central City and Starling City are now connected!")
         print("⚡ Press SPACE to activate Speed Force!")
         print("🌦️  Press R to change weather!")
         print("🚗 Watch the traffic flow between cities!")
         
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            
-            pygame.display.flip()
-            self.clock.tick(FPS)
+        if threaded:
+            self.run_threaded()
+        else:
+            while self.running:
+                self.handle_events()
+                self.update()
+                self.draw()
+                
+                self.present()
+                self.clock.tick(FPS)
         
         pygame.quit()
         print("👋 Thanks for exploring Flashpoint Cities!")
+    
+    def run_threaded(self):
+        """Tick on a simulation thread while this thread draws the newest frame, interpolated"""
+        simulation = SimulationThread(self.update, self.capture_frame, TICK_SECONDS, self.state_lock)
+        simulation.start()
+        try:
+            while self.running and simulation.running:
+                with self.state_lock:
+                    self.handle_events()
+                frame, alpha = simulation.latest()
+                self.draw(frame, alpha)
+                self.profiler.end_frame()  # The simulation thread closes its own frames in update()
+                
+                self.present()
+                self.clock.tick(RENDER_FPS)
+        finally:
+            simulation.stop()
+    
+    def snapshot(self) -> bytes:
+        """Serialize the full simulation state into a compact binary checkpoint"""
+        particle_meta, particle_arrays = self.particles.pack()
+        vehicle_arrays = self.vehicles.pack() if self.traffic is None else self.traffic.pack()
+        
+        meta, arrays = self.world_state()
+        meta.update({
+            "tick": self.tick,
+            "weather": self.weather.value,
+            "time_of_day": self.time_of_day,
+            "demand_scale": self.demand_scale,
+            "speed_force_active": self.speed_force_active,
+            "speed_force_timer": (self.scheduler.due("speed_force_end") - self.tick
+                                  if self.speed_force_active else 0),
+            "seed": self.seed,
+            "random_streams": self.streams.state(),
+            "weather_draws": self.weather_draws.state(),
+            "particles": particle_meta,
+            "telemetry_sampled": self.section_stats.sampled,
+        })
+        arrays["telemetry_recent"] = self.section_stats.recent
+        arrays.update({f"vehicle_{name}": values for name, values in vehicle_arrays.items()})
+        arrays.update({f"particle_{name}": values for name, values in particle_arrays.items()})
+        arrays.update({f"pedestrian_{name}": values for name, values in self.crowd.pack().items()})
+        return pack_snapshot(meta, arrays)
+    
+    def restore(self, data: bytes):
+        """Replace the simulation state with a checkpoint from snapshot()"""
+        _version, meta, arrays = unpack_snapshot(data)
+        self.restore_world(meta, arrays)
+        
+        # Dynamic state
+        self.tick = meta["tick"]
+        self.weather = WeatherType(meta["weather"])
+        self.time_of_day = meta["time_of_day"]
+        self.demand_scale = meta["demand_scale"]
+        # Signals follow the clock; only the speed force timer has to be carried over
+        self.scheduler.clear(self.tick)
+        self.signals.sync(self.tick)
+        self.speed_force_active = meta["speed_force_active"]
+        if self.speed_force_active:
+            self.scheduler.at("speed_force_end", self.tick + meta["speed_force_timer"])
+        vehicle_arrays = {name[len("vehicle_"):]: values for name, values in arrays.items()
+                          if name.startswith("vehicle_")}
+        if self.traffic is None:
+            self.vehicles.unpack(vehicle_arrays)
+        else:
+            self.traffic.unpack(vehicle_arrays)
+        self.particles.unpack(meta["particles"], {name[len("particle_"):]: values for name, values in arrays.items()
+                                                  if name.startswith("particle_")})
+        # Flow fields depend on the buildings, so the crowd is rebuilt before its agents are restored
+        self.crowd = self.create_crowd()
+        self.crowd.unpack({name[len("pedestrian_"):]: values for name, values in arrays.items()
+                           if name.startswith("pedestrian_")})
+        self.seed = self.streams.seed = meta["seed"]
+        self.streams.set_state(meta["random_streams"])
+        self.weather_draws.set_state(meta["weather_draws"])
+        # The rolling statistics carry on; trip records already logged stay as they are
+        self.section_stats.reset(arrays["telemetry_recent"], meta["telemetry_sampled"])
+        
+        # Everything derived from the world has to be rebuilt
+        self.demand, self.trip_spans = self.create_demand()
+        self.sky_color = self.get_sky_color()
+        self.atmosphere.reset(self.weather_tint())
+        for name in self.layers.order:
+            self.layers.invalidate(name)
+        if self.dirty_tracker is not None:
+            self.dirty_tracker.invalidate()
+        self.drawn_traffic_lights = {}
+    
+    def save(self, path: str):
+        """Write a checkpoint to disk"""
+        with open(path, "wb") as f:
+            f.write(self.snapshot())
+    
+    def load(self, path: str):
+        """Resume from a checkpoint written by save()"""
+        with open(path, "rb") as f:
+            self.restore(f.read())
+    
+    def fork(self) -> "FlashpointCities":
+        """Headless copy of the current state, e.g. to try alternate weather or traffic"""
+        data = self.snapshot()
+        # Same seed, cache and shards, so the clone rebuilds this world and steps it the same way
+        clone = FlashpointCities(headless=True, shards=self.shards, seed=self.seed, world_cache=self.world_cache,
+                                 pedestrians_per_city=self.pedestrians_per_city)
+        clone.restore(data)
+        return clone
+    
+    def run_headless(self, ticks: int) -> float:
+        """Step the simulation as fast as possible; returns wall-clock seconds taken"""
+        start = time.perf_counter()
+        self.step(ticks)
+        if self.traffic is not None:
+            self.traffic.wait()
+        return time.perf_counter() - start
+    
+    def close(self):
+        """Stop any traffic worker processes, write out the remaining telemetry and end the journal"""
+        if self.journal is not None:
+            self.journal.finish(self.tick)
+            self.journal = None
+        if self.traffic is not None:
+            self.traffic.wait()
+            for finished, arrived in self.traffic.take_finished():
+                self.record_trips(finished, arrived, self.tick - 1)
+            self.traffic.close()
+            self.traffic = None
+        if self.telemetry_exporter is not None:
+            self.flush_telemetry()
+            self.telemetry_exporter.close()
+            self.telemetry_exporter = None
+
+def world_cache_path(cache_dir: str, seed: int) -> str:
+    """Cached world for a seed, under the current generator version"""
+    return os.path.join(cache_dir, f"world-{seed}-v{WORLDGEN_VERSION}.fpcs")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Flashpoint Cities simulation")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window, stepping as fast as possible")
+    parser.add_argument("--ticks", type=int, default=FPS * 60,
+                        help="number of ticks to simulate in headless mode")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="repaint and push only the screen regions that changed")
+    parser.add_argument("--load", metavar="PATH",
+                        help="resume from a saved snapshot")
+    parser.add_argument("--save", metavar="PATH",
+                        help="write a snapshot when the simulation ends")
+    parser.add_argument("--shards", type=int, default=0, metavar="N",
+                        help="step traffic in N worker processes, one per stretch of road")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="time every update and draw stage and write folded stacks for a flame graph")
+    parser.add_argument("--pedestrians", type=int, default=PEDESTRIANS_PER_CITY, metavar="N",
+                        help="pedestrians living in each city")
+    parser.add_argument("--demand", type=float, metavar="SCALE",
+                        help="multiply every district-to-district trip rate (0 for no new traffic); "
+                             "defaults to 1, or to the scale a --load snapshot was saved with")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="write trip records and per-lane road statistics to files in DIR")
+    parser.add_argument("--telemetry-format", choices=EXPORT_FORMATS, default="csv",
+                        help="csv tables, or npz chunks with one array per column")
+    parser.add_argument("--record", metavar="PATH",
+                        help="journal every input with the seed and settings, for replaying the run later")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="re-run a recorded journal as fast as possible, drawn unless --headless")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run the simulation on its own thread and draw interpolated frames")
+    parser.add_argument("--seed", type=int,
+                        help="seed for a reproducible run (random if omitted)")
+    parser.add_argument("--world-cache", metavar="DIR", default=WORLD_CACHE_DIR,
+                        help="directory of generated worlds, keyed by seed and generator version (used with --seed)")
+    parser.add_argument("--no-world-cache", dest="world_cache", action="store_const", const=None,
+                        help="always generate the world")
+    return parser.parse_args()
 
 def main():
     """Main entry point"""
+    args = parse_args()
+    game = None
     try:
-        game = FlashpointCities()
-        game.run()
+        journal = InputJournal.load(args.replay) if args.replay else None
+        if journal is not None:
+            # The journal's settings win, so the replay starts from the recorded state
+            for name, value in journal.settings.items():
+                setattr(args, name, value)
+        if args.headless:
+            game = FlashpointCities(headless=True, shards=args.shards, seed=args.seed,
+                                    profile=bool(args.profile), world_cache=args.world_cache,
+                                    pedestrians_per_city=args.pedestrians)
+        else:
+            game = FlashpointCities(dirty_rects=args.dirty_rects, shards=args.shards, seed=args.seed,
+                                    profile=bool(args.profile), world_cache=args.world_cache,
+                                    pedestrians_per_city=args.pedestrians)
+        if args.telemetry:
+            game.export_telemetry(args.telemetry, args.telemetry_format)
+        if args.load:
+            game.load(args.load)
+        if args.demand is not None:
+            game.demand_scale = args.demand
+        if args.record:
+            game.record_journal(args.record, {"seed": game.seed, "pedestrians": args.pedestrians,
+                                              "demand": game.demand_scale, "shards": args.shards, "load": args.load})
+        
+        if journal is not None:
+            elapsed = game.replay(journal, render=not args.headless)
+            print(f"🔁 Replayed {len(journal.entries)} inputs up to tick {game.tick} in {elapsed:.2f}s")
+        elif args.headless:
+            elapsed = game.run_headless(args.ticks)
+            print(f"⏱️  Simulated {game.sim_time:.1f}s ({args.ticks} ticks) in {elapsed:.2f}s")
+        else:
+            game.run(threaded=args.threaded)
+        if args.headless:
+            print(f"🚗 {len(game.traffic_vehicles())} vehicles, weather: {game.weather.value}, seed: {game.seed}")
+            trips = trip_summary(game.trip_log.latest(len(game.trip_log)))
+            print(f"🌉 {trips['trips']} trips finished, {trips['bridge_crossings']} over the bridge, "
+                  f"{trips['mean_travel_ticks'] * TICK_SECONDS:.1f}s on average")
+        if args.save:
+            game.save(args.save)
+            print(f"💾 Saved simulation to {args.save}")
+        if args.profile:
+            for path, stats in game.profiler.hot_stages(5):
+                print(f"🔥 {path}: {stats['mean']:.3f} ms mean, {stats['p95']:.3f} ms p95")
+            game.profiler.export_folded(args.profile)
+            print(f"🔥 Wrote profile to {args.profile}")
     except Exception as e:
         print(f"❌ Error running simulation: {e}")
         print("💡 Make sure you have pygame installed: pip install pygame")
+    finally:
+        if game is not None:
+            game.close()  # Also ends the journal and stops traffic workers after a crash
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,16 +5,28 @@ A unique city simulation featuring two connected cities with roads, parks, and i
 This is like Flashpoint but better and different!
 """
 
+import numpy as np
 import pygame
+import argparse
 import math
-import random
 import sys
-from typing import List, Tuple, Dict, Optional
+import time
+from typing import Any, Callable, List, Tuple, Dict, Optional
 from dataclasses import dataclass
 from enum import Enum
 
-# Initialize Pygame
-pygame.init()
+from flashpoint_atmosphere import Atmosphere
+from flashpoint_demand import TravelDemand, Zone
+from flashpoint_journal import InputJournal, JournalPlayer
+from flashpoint_layers import LayerCache
+from flashpoint_random import RandomStreams, UniformBlock
+from flashpoint_roads import RoadNetwork, Route
+from flashpoint_spatial import leader_distances
+from flashpoint_sprites import PropSprites, vehicle_sprites
+from flashpoint_text import TextRenderer
+from flashpoint_vehicles import VehicleStore
+from flashpoint_windows import CityWindows, WindowLayout
+from flashpoint_world import Camera, Chunk, ChunkWorld, scale_rect
 
 # Constants
 SCREEN_WIDTH = 1400
@@ -23,6 +35,7 @@ FPS = 60
 
 # Colors
 SKY_BLUE = (135, 206, 235)
+SKY_HORIZON = (185, 236, 255)  # Bottom of the sky gradient
 CITY_GRAY = (64, 64, 64)
 ROAD_GRAY = (45, 45, 45)
 BRIDGE_COLOR = (105, 105, 105)
@@ -31,7 +44,36 @@ PARK_GREEN = (0, 128, 0)
 WATER_BLUE = (0, 100, 200)
 BUILDING_COLORS = [(70, 70, 70), (80, 80, 80), (90, 90, 90), (100, 100, 100)]
 STREET_LIGHT = (255, 255, 200)
+WINDOW_DARK = (20, 20, 20)
 CAR_COLORS = [(255, 0, 0), (0, 0, 255), (255, 255, 0), (0, 255, 0), (255, 165, 0)]
+CAR_LENGTH = 16
+MIN_CAR_GAP = 6  # Bumper-to-bumper spacing when following
+WINDOW_LAYOUT = WindowLayout(column_start=10, column_margin=10, column_spacing=15,
+                             row_start=2, row_margin=10, row_spacing=15, width=8, height=8)
+WINDOW_PRESENCE = 0.7  # Share of window slots that actually have a window
+WINDOW_REFRESH_RATE = 0.001  # Share of windows re-rolled against the lighting schedule per tick
+DAY_TICKS = 2400  # The clock advances 0.01 hours per tick
+TRIP_DECAY_DISTANCE = 600  # Pixels; nearer districts trade more trips
+
+# World: the two hand-built downtowns sit at the origin of a metro region of procedural suburbs
+DOWNTOWN_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+METRO_SCREENS = (200, 100)  # Metro region size, in screens
+METRO_RECT = pygame.Rect(-(METRO_SCREENS[0] // 2) * SCREEN_WIDTH, -(METRO_SCREENS[1] // 2) * SCREEN_HEIGHT,
+                         METRO_SCREENS[0] * SCREEN_WIDTH, METRO_SCREENS[1] * SCREEN_HEIGHT)
+CHUNK_SIZE = 512
+BLOCK_SIZE = 256  # Suburban street grid spacing; divides CHUNK_SIZE so streets line up across chunks
+SUBURB_ROAD_WIDTH = 20
+SUBURB_PARK_CHANCE = 0.1
+SUBURB_FALLOFF = 20 * SCREEN_WIDTH  # Building density halves roughly every 14 screens from downtown
+CHUNK_GENERATE_BUDGET = 16  # New chunks per frame, so zooming out streams the suburbs in
+MAX_LOADED_CHUNKS = 1024
+SUBURB_LIGHTING_STRIDE = 8  # Each visible chunk's lights are updated every this many frames
+
+# Camera
+CAMERA_PAN_SPEED = 20  # Screen pixels per tick
+ZOOM_LEVELS = (0.125, 0.25, 0.5, 1.0, 2.0)  # Powers of two keep chunk edges on whole pixels
+DETAIL_ZOOM = 0.5  # Below this, buildings become tinted blocks and parks a cached sprite
+PARK_SPRITE_TREE_SPACING = 40
 
 class CityType(Enum):
     CENTRAL = "Central City"
@@ -44,8 +86,15 @@ class Building:
     width: int
     height: int
     color: Tuple[int, int, int]
-    windows: List[Tuple[int, int, int, int]]
-    lit_windows: List[bool]
+    city: CityType
+    window_index: int  # Index of this building in its city's window store
+
+@dataclass
+class SuburbChunk:
+    buildings: np.ndarray  # (n, 4) world rects
+    colors: List[Tuple[int, int, int]]
+    windows: CityWindows
+    parks: List["Park"]
 
 @dataclass
 class Road:
@@ -63,21 +112,19 @@ class Park:
     trees: List[Tuple[int, int]]
     benches: List[Tuple[int, int]]
 
-@dataclass
-class Car:
-    x: float
-    y: float
-    speed: float
-    color: Tuple[int, int, int]
-    direction: float
-    road_index: int
-
 class FlashpointCities:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        # Only the display is initialized; fonts start on first use, audio and joysticks never
+        pygame.display.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Flashpoint Cities - Central City & Starling City")
         self.clock = pygame.time.Clock()
         self.running = True
+        self.tick = 0
+        
+        # One seed, one independent stream per subsystem
+        self.streams = RandomStreams(seed)
+        self.trip_draws = UniformBlock(self.streams["traffic"])
         
         # City boundaries
         self.central_city_rect = pygame.Rect(50, 50, 600, 700)
@@ -88,20 +135,56 @@ class FlashpointCities:
         self.buildings: List[Building] = []
         self.roads: List[Road] = []
         self.parks: List[Park] = []
-        self.cars: List[Car] = []
+        self.cars = VehicleStore(CAR_COLORS, size=(CAR_LENGTH, 8))
+        self.routes: List[Route] = []  # Interned routes; cars store an index into this
+        self.route_lookup: Dict[Route, int] = {}
+        self.windows: Dict[CityType, CityWindows] = {}
+        self.lighting_rng = self.streams["lighting"]
         self.time_of_day = 0  # 0-24 hours
+        self.world = ChunkWorld(int(self.streams["worldgen"].integers(2 ** 32)), CHUNK_SIZE, self._generate_chunk,
+                                self._render_chunk, bounds=METRO_RECT, max_chunks=MAX_LOADED_CHUNKS)
+        self.lighting_phase = 0
         
         # Initialize cities
         self._initialize_cities()
         self._create_roads()
         self._create_parks()
+        self._create_demand()
         self._spawn_cars()
         
         # Interactive elements
         self.selected_city = None
-        self.zoom_level = 1.0
-        self.camera_x = 0
-        self.camera_y = 0
+        self.camera = Camera(0, 0, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.pan = (0, 0)  # Screen pixels per tick, from the arrow keys held
+        
+        # Input arrives as named actions, so a journal can record it and replay it at the same ticks
+        self.actions: Dict[str, Callable[..., None]] = {
+            "quit": self._quit,
+            "zoom": self._zoom,
+            "select": self._select,
+            "pan": self._set_pan,
+        }
+        self.journal: Optional[InputJournal] = None
+        
+        # Pre-rendered park props; cars use shared sprites per zoom level
+        self.prop_sprites = PropSprites(trunk=(101, 67, 33), leaves=PARK_GREEN, bench=(101, 67, 33))
+        
+        # Simplified scenery for zoomed-out views
+        self.park_sprites: Dict[Tuple[int, int, float], pygame.Surface] = {}
+        self.downtown_lod: Optional[pygame.Surface] = None
+        self.downtown_lod_key: Tuple[float, int] = (0.0, -1)  # Zoom and layer version it was drawn at
+        
+        # Fonts are loaded once; rendered strings are cached
+        self.text = TextRenderer()
+        
+        # Cached static scenery
+        self.atmosphere = Atmosphere((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.layers = LayerCache((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.layers.register("background", self._draw_background, opaque=True)
+        self.layers.register("roads", self._draw_roads)
+        self.layers.register("parks", self._draw_parks)
+        self.layers.register("buildings", self._draw_buildings)
+        self.layers.register("bridge", self._draw_bridge)
         
     def _initialize_cities(self):
         """Initialize buildings for both cities"""
@@ -148,13 +231,16 @@ class FlashpointCities:
             (1105, 490, 70, 95, "residential"),
         ]
         
-        # Create buildings
-        for x, y, w, h, building_type in central_buildings + starling_buildings:
-            color = self._get_building_color(building_type)
-            windows = self._generate_windows(x, y, w, h)
-            lit_windows = [random.choice([True, False]) for _ in windows]
-            
-            self.buildings.append(Building(x, y, w, h, color, windows, lit_windows))
+        # Create buildings; window geometry is derived from each building's rect
+        self.districts: Dict[Tuple[CityType, str], List[Tuple[int, int, int, int]]] = {}
+        for city, layout in ((CityType.CENTRAL, central_buildings), (CityType.STARLING, starling_buildings)):
+            for i, (x, y, w, h, building_type) in enumerate(layout):
+                color = self._get_building_color(building_type)
+                self.buildings.append(Building(x, y, w, h, color, city, i))
+                self.districts.setdefault((city, building_type), []).append((x, y, w, h))
+            self.windows[city] = CityWindows.generate([(x, y, w, h) for x, y, w, h, _ in layout],
+                                                      WINDOW_LAYOUT, self.streams["worldgen"],
+                                                      presence=WINDOW_PRESENCE)
     
     def _get_building_color(self, building_type: str) -> Tuple[int, int, int]:
         """Get color based on building type"""
@@ -167,19 +253,6 @@ class FlashpointCities:
         }
         return colors.get(building_type, (100, 100, 100))
     
-    def _generate_windows(self, x: int, y: int, w: int, h: int) -> List[Tuple[int, int, int, int]]:
-        """Generate window positions for a building"""
-        windows = []
-        window_size = 8
-        spacing = 15
-        
-        for row in range(2, h - 10, spacing):
-            for col in range(10, w - 10, spacing):
-                if random.random() < 0.7:  # 70% chance of window
-                    windows.append((x + col, y + row, window_size, window_size))
-        
-        return windows
-    
     def _create_roads(self):
         """Create road network connecting both cities"""
         # Main roads within cities
@@ -198,6 +271,10 @@ class FlashpointCities:
             Road((600, 350), (750, 350), 30, 4),  # Bridge road
             Road((600, 400), (750, 400), 30, 4),  # Bridge road
         ]
+        
+        # Intersections and segments as a routable graph
+        self.road_network = RoadNetwork(self.roads)
+        self.road_network.precompute_all_pairs()
     
     def _create_parks(self):
         """Create parks and green spaces"""
@@ -218,43 +295,119 @@ class FlashpointCities:
         
         self.parks = [central_park, starling_park, bridge_park]
     
+    def _create_demand(self):
+        """Districts and the bridge as travel zones, each owning the road network nodes nearest it"""
+        zones = []
+        for (city, kind), rects in self.districts.items():
+            areas = np.array([w * h for _, _, w, h in rects], dtype=np.float64)
+            centres = np.array([(x + w / 2, y + h / 2) for x, y, w, h in rects])
+            centre = tuple((centres * areas[:, None]).sum(axis=0) / areas.sum())
+            zones.append(Zone(f"{city.name.lower()}_{kind}", kind, centre, float(areas.sum())))
+        zones.append(Zone("bridge", "bridge", self.bridge_rect.center, self.bridge_rect.width * self.bridge_rect.height))
+        
+        nodes = np.array(self.road_network.nodes, dtype=np.float64)
+        centres = np.array([zone.centre for zone in zones])
+        nearest = np.argmin(np.hypot(*(nodes[:, None, :] - centres[None, :, :]).transpose(2, 0, 1)), axis=1)
+        # Zones that no node is nearest to can't be driven to
+        served = [i for i in range(len(zones)) if np.any(nearest == i)]
+        self.demand = TravelDemand([zones[i] for i in served], DAY_TICKS, TRIP_DECAY_DISTANCE)
+        self.zone_nodes = [np.nonzero(nearest == i)[0].tolist() for i in served]
+        self.node_zones = [served.index(zone) for zone in nearest.tolist()]
+    
     def _spawn_cars(self):
         """Spawn cars on roads"""
+        draws = self.trip_draws
+        xs, ys, speeds, directions, colors, road_indices = [], [], [], [], [], []
         for i, road in enumerate(self.roads):
             # Spawn cars on each road
-            num_cars = random.randint(2, 5)
+            num_cars = 2 + draws.index_below(4)
             for j in range(num_cars):
+                offset = draws.index_below(road.width // 2 + 1) - road.width // 4
                 if road.start[0] == road.end[0]:  # Vertical road
-                    x = road.start[0] + random.randint(-road.width//4, road.width//4)
+                    x = road.start[0] + offset
                     y = road.start[1] + (road.end[1] - road.start[1]) * j / num_cars
                     direction = math.pi/2 if road.end[1] > road.start[1] else -math.pi/2
                 else:  # Horizontal road
                     x = road.start[0] + (road.end[0] - road.start[0]) * j / num_cars
-                    y = road.start[1] + random.randint(-road.width//4, road.width//4)
+                    y = road.start[1] + offset
                     direction = 0 if road.end[0] > road.start[0] else math.pi
                 
-                speed = random.uniform(1, 3)
-                color = random.choice(CAR_COLORS)
-                
-                self.cars.append(Car(x, y, speed, color, direction, i))
+                xs.append(x)
+                ys.append(y)
+                speeds.append(draws.uniform(1, 3))
+                directions.append(direction)
+                colors.append(draws.index_below(len(CAR_COLORS)))
+                road_indices.append(i)
+        
+        first = self.cars.count
+        self.cars.spawn(xs, ys, speeds, directions, colors, road_indices)
+        
+        # Send each car to a random destination, starting from the edge it is on
+        for index in range(first, self.cars.count):
+            u, v = self.road_network.edge_ahead(xs[index - first], ys[index - first],
+                                                directions[index - first])
+            self._start_trip(index, v, previous=u)
+    
+    def _intern_route(self, route: Route) -> int:
+        """Id of a route in the shared route table"""
+        route_id = self.route_lookup.get(route)
+        if route_id is None:
+            route_id = len(self.routes)
+            self.route_lookup[route] = route_id
+            self.routes.append(route)
+        return route_id
+    
+    def _start_trip(self, index: int, origin: int, previous: Optional[int] = None):
+        """Route a car from origin to a destination drawn from the travel demand at this time of day"""
+        draws = self.trip_draws
+        zone = self.demand.destination(self.time_of_day / 24, self.node_zones[origin], draws.next())
+        nodes = self.zone_nodes[zone]
+        destination = nodes[draws.index_below(len(nodes))]
+        route = self.road_network.route(origin, destination)
+        if len(route) < 2:
+            route = (origin,)
+        if previous is not None:
+            route = (previous,) + route  # Finish the edge the car is already on
+        self.cars.route_id[index] = self._intern_route(route)
+        if len(route) < 2:
+            # Already there (or unreachable): wait one tick, then pick a new trip
+            self.cars.waypoint[index] = 0
+            self.cars.road_index[index] = -1
+            self.cars.target_x[index] = self.cars.x[index]
+            self.cars.target_y[index] = self.cars.y[index]
+            return
+        self.cars.waypoint[index] = 0
+        self._next_waypoint(index)
+    
+    def _next_waypoint(self, index: int):
+        """Steer a car toward the next node on its route"""
+        route = self.routes[self.cars.route_id[index]]
+        waypoint = self.cars.waypoint[index] + 1
+        if waypoint >= len(route):
+            self._start_trip(index, route[-1])
+            return
+        self.cars.waypoint[index] = waypoint
+        u, v = route[waypoint - 1], route[waypoint]
+        self.cars.road_index[index] = self.road_network.edge_ids.get((u, v), -1)
+        self.cars.steer(index, *self.road_network.nodes[v])
     
     def _update_cars(self):
         """Update car positions"""
-        for car in self.cars:
-            # Move car in its direction
-            car.x += math.cos(car.direction) * car.speed
-            car.y += math.sin(car.direction) * car.speed
-            
-            # Wrap around screen edges
-            if car.x < 0:
-                car.x = SCREEN_WIDTH
-            elif car.x > SCREEN_WIDTH:
-                car.x = 0
-                
-            if car.y < 0:
-                car.y = SCREEN_HEIGHT
-            elif car.y > SCREEN_HEIGHT:
-                car.y = 0
+        n = self.cars.count
+        
+        # Follow the car ahead on the same road without closing the gap
+        gaps = leader_distances(self.cars.road_index[:n], self.cars.lane_positions())
+        step = np.minimum(self.cars.speed[:n], gaps - CAR_LENGTH - MIN_CAR_GAP)
+        step = np.maximum(step, 0)
+        
+        # Move every car along its heading, stopping at its next waypoint
+        remaining = self.cars.distance_to_target()
+        arrived = np.nonzero(step >= remaining)[0]
+        self.cars.advance(np.minimum(step, np.maximum(remaining, 0)))
+        for index in arrived:
+            self.cars.x[index] = self.cars.target_x[index]
+            self.cars.y[index] = self.cars.target_y[index]
+            self._next_waypoint(index)
     
     def _update_lighting(self):
         """Update city lighting based on time of day"""
@@ -262,197 +415,426 @@ class FlashpointCities:
         if self.time_of_day >= 24:
             self.time_of_day = 0
             
-        # Update building window lights
-        for building in self.buildings:
-            for i, lit in enumerate(building.lit_windows):
-                # Randomly toggle lights based on time
-                if random.random() < 0.001:  # Small chance to toggle
-                    building.lit_windows[i] = not lit
+        # Update building window lights in bulk, following the time-of-day schedule
+        for city, windows in self.windows.items():
+            toggled = windows.update(self.time_of_day, self.lighting_rng, WINDOW_REFRESH_RATE)
+            for slot in toggled.tolist():
+                self._patch_window(windows.window_rect(slot), windows.is_lit(slot))
+            if len(toggled) and self.downtown_lod is not None:
+                buildings = [b for b in self.buildings if b.city == city]
+                self._patch_lod_buildings(self.downtown_lod, self.downtown_lod_key[0], (0, 0),
+                                          [(b.x, b.y, b.width, b.height) for b in buildings],
+                                          [b.color for b in buildings], windows, toggled)
+        
+        # Visible suburbs follow the same schedule, a slice of them per frame
+        chunks = self.world.visible(self.camera.viewport())
+        for chunk in chunks[self.lighting_phase::SUBURB_LIGHTING_STRIDE]:
+            content = chunk.content
+            toggled = content.windows.update(self.time_of_day, self.lighting_rng,
+                                             WINDOW_REFRESH_RATE * SUBURB_LIGHTING_STRIDE)
+            if chunk.surface is None or len(toggled) == 0:
+                continue
+            if chunk.zoom < DETAIL_ZOOM:
+                self._patch_lod_buildings(chunk.surface, chunk.zoom, chunk.rect.topleft,
+                                          content.buildings.tolist(), content.colors, content.windows, toggled)
+                continue
+            for slot in toggled.tolist():
+                color = STREET_LIGHT if content.windows.is_lit(slot) else WINDOW_DARK
+                pygame.draw.rect(chunk.surface, color,
+                                 scale_rect(content.windows.window_rect(slot), chunk.rect.topleft, chunk.zoom))
+        self.lighting_phase = (self.lighting_phase + 1) % SUBURB_LIGHTING_STRIDE
     
-    def _draw_background(self):
+    def _patch_window(self, window: Tuple[int, int, int, int], lit: bool):
+        """Redraw one toggled window on the cached buildings layer"""
+        color = STREET_LIGHT if lit else WINDOW_DARK
+        self.layers.patch("buildings", window,
+                          lambda surface: pygame.draw.rect(surface, color, window))
+    
+    def _draw_background(self, surface: pygame.Surface):
         """Draw sky and water background"""
         # Sky gradient
-        for y in range(SCREEN_HEIGHT):
-            color_factor = y / SCREEN_HEIGHT
-            sky_color = (
-                int(135 + color_factor * 50),
-                int(206 + color_factor * 30),
-                int(235 + color_factor * 20)
-            )
-            pygame.draw.line(self.screen, sky_color, (0, y), (SCREEN_WIDTH, y))
+        surface.blit(self.atmosphere.sky(SKY_BLUE, SKY_HORIZON), (0, 0))
         
         # Water between cities
         water_rect = pygame.Rect(650, 0, 100, SCREEN_HEIGHT)
-        pygame.draw.rect(self.screen, WATER_BLUE, water_rect)
+        pygame.draw.rect(surface, WATER_BLUE, water_rect)
     
-    def _draw_bridge(self):
+    def _draw_bridge(self, surface: pygame.Surface):
         """Draw the bridge connecting cities"""
         # Bridge structure
-        pygame.draw.rect(self.screen, BRIDGE_COLOR, self.bridge_rect)
+        pygame.draw.rect(surface, BRIDGE_COLOR, self.bridge_rect)
         
         # Bridge supports
         for i in range(3):
             support_x = self.bridge_rect.x + i * 50
-            pygame.draw.rect(self.screen, (60, 60, 60), 
+            pygame.draw.rect(surface, (60, 60, 60), 
                            (support_x, self.bridge_rect.bottom, 20, 100))
         
         # Bridge lights
         for i in range(5):
             light_x = self.bridge_rect.x + i * 25
-            pygame.draw.circle(self.screen, STREET_LIGHT, 
+            pygame.draw.circle(surface, STREET_LIGHT, 
                              (light_x, self.bridge_rect.y - 10), 5)
     
-    def _draw_roads(self):
+    def _draw_roads(self, surface: pygame.Surface):
         """Draw all roads"""
         for road in self.roads:
             # Draw road
-            pygame.draw.line(self.screen, ROAD_GRAY, road.start, road.end, road.width)
+            pygame.draw.line(surface, ROAD_GRAY, road.start, road.end, road.width)
             
             # Draw lane markings
             if road.lanes > 1:
                 mid_x = (road.start[0] + road.end[0]) // 2
                 mid_y = (road.start[1] + road.end[1]) // 2
-                pygame.draw.line(self.screen, (255, 255, 255), 
+                pygame.draw.line(surface, (255, 255, 255), 
                                road.start, road.end, 2)
     
-    def _draw_buildings(self):
+    def _draw_buildings(self, surface: pygame.Surface):
         """Draw all buildings"""
         for building in self.buildings:
-            # Draw building
-            pygame.draw.rect(self.screen, building.color, 
-                           (building.x, building.y, building.width, building.height))
-            
-            # Draw windows
-            for i, window in enumerate(building.windows):
-                if building.lit_windows[i]:
-                    pygame.draw.rect(self.screen, STREET_LIGHT, window)
-                else:
-                    pygame.draw.rect(self.screen, (20, 20, 20), window)
-    
-    def _draw_parks(self):
+            self._draw_building(surface, (building.x, building.y, building.width, building.height),
+                                building.color, self.windows[building.city], building.window_index)
+    
+    def _draw_building(self, surface: pygame.Surface, rect: Tuple[int, int, int, int],
+                       color: Tuple[int, int, int], windows: CityWindows, index: int,
+                       offset: Tuple[int, int] = (0, 0)):
+        """Draw one building and its windows, shifted by -offset"""
+        ox, oy = offset
+        x, y, w, h = rect
+        pygame.draw.rect(surface, color, (x - ox, y - oy, w, h))
+        
+        # Draw windows
+        for (wx, wy, ww, wh), lit in windows.windows(index):
+            if lit:
+                pygame.draw.rect(surface, STREET_LIGHT, (wx - ox, wy - oy, ww, wh))
+            else:
+                pygame.draw.rect(surface, WINDOW_DARK, (wx - ox, wy - oy, ww, wh))
+    
+    def _draw_parks(self, surface: pygame.Surface):
         """Draw parks and green spaces"""
         for park in self.parks:
-            # Draw grass
-            pygame.draw.rect(self.screen, GRASS_GREEN, 
-                           (park.x, park.y, park.width, park.height))
-            
-            # Draw trees
-            for tree_x, tree_y in park.trees:
-                # Tree trunk
-                pygame.draw.rect(self.screen, (101, 67, 33), 
-                               (tree_x - 3, tree_y, 6, 15))
-                # Tree leaves
-                pygame.draw.circle(self.screen, PARK_GREEN, 
-                                 (tree_x, tree_y - 5), 12)
-            
-            # Draw benches
-            for bench_x, bench_y in park.benches:
-                pygame.draw.rect(self.screen, (101, 67, 33), 
-                               (bench_x - 10, bench_y, 20, 3))
-                pygame.draw.rect(self.screen, (101, 67, 33), 
-                               (bench_x - 10, bench_y - 8, 3, 8))
-                pygame.draw.rect(self.screen, (101, 67, 33), 
-                               (bench_x + 7, bench_y - 8, 3, 8))
+            self._draw_park(surface, park)
+    
+    def _draw_park(self, surface: pygame.Surface, park: Park, offset: Tuple[int, int] = (0, 0)):
+        """Draw one park, shifted by -offset"""
+        ox, oy = offset
+        # Draw grass
+        pygame.draw.rect(surface, GRASS_GREEN, 
+                       (park.x - ox, park.y - oy, park.width, park.height))
+        
+        # Trees and benches in one batch of pre-rendered sprites
+        surface.blits(self.prop_sprites.batch(park.trees, park.benches, [], offset), False)
+    
+    def _building_tints(self, rects: List[Tuple[int, int, int, int]], colors: List[Tuple[int, int, int]],
+                        windows: CityWindows) -> np.ndarray:
+        """Average color of each building with its windows, for drawing it as one block"""
+        present, lit = windows.building_counts()
+        rects = np.array(rects, dtype=np.float64).reshape(-1, 4)
+        window_area = WINDOW_LAYOUT.width * WINDOW_LAYOUT.height
+        lit_share = (lit * window_area / (rects[:, 2] * rects[:, 3]))[:, None]
+        dark_share = ((present - lit) * window_area / (rects[:, 2] * rects[:, 3]))[:, None]
+        tints = (np.array(colors, dtype=np.float64).reshape(-1, 3) * (1 - lit_share - dark_share)
+                 + np.array(STREET_LIGHT) * lit_share + np.array(WINDOW_DARK) * dark_share)
+        return tints.round().astype(np.uint8)
+    
+    def _draw_lod_buildings(self, surface: pygame.Surface, zoom: float, origin: Tuple[int, int],
+                            rects: List[Tuple[int, int, int, int]], colors: List[Tuple[int, int, int]],
+                            windows: CityWindows):
+        """Draw buildings as single blocks tinted by their windows"""
+        for rect, tint in zip(rects, self._building_tints(rects, colors, windows).tolist()):
+            surface.fill(tint, scale_rect(rect, origin, zoom))
+    
+    def _patch_lod_buildings(self, surface: pygame.Surface, zoom: float, origin: Tuple[int, int],
+                             rects: List[Tuple[int, int, int, int]], colors: List[Tuple[int, int, int]],
+                             windows: CityWindows, toggled: np.ndarray):
+        """Re-tint the blocks of buildings whose windows just toggled"""
+        tints = self._building_tints(rects, colors, windows).tolist()
+        for index in {windows.building_of(slot) for slot in toggled.tolist()}:
+            surface.fill(tints[index], scale_rect(rects[index], origin, zoom))
+    
+    def _park_sprite(self, width: int, height: int, zoom: float) -> pygame.Surface:
+        """Grass with a regular canopy of trees, shared by every park of this size and zoom"""
+        key = (width, height, zoom)
+        sprite = self.park_sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((max(1, round(width * zoom)), max(1, round(height * zoom))))
+            sprite.fill(GRASS_GREEN)
+            radius = max(1, round(12 * zoom))
+            spacing = PARK_SPRITE_TREE_SPACING
+            for y in range(spacing // 2, height, spacing):
+                for x in range(spacing // 2, width, spacing):
+                    pygame.draw.circle(sprite, PARK_GREEN, (round(x * zoom), round(y * zoom)), radius)
+            self.park_sprites[key] = sprite
+        return sprite
+    
+    def _draw_lod_parks(self, surface: pygame.Surface, zoom: float, origin: Tuple[int, int], parks: List[Park]):
+        """Draw parks as cached sprites instead of individual trees and benches"""
+        for park in parks:
+            rect = scale_rect((park.x, park.y, park.width, park.height), origin, zoom)
+            surface.blit(self._park_sprite(park.width, park.height, zoom), rect)
+    
+    def _generate_chunk(self, chunk: Chunk, rng: np.random.Generator) -> SuburbChunk:
+        """Procedural suburb for one chunk: blocks of buildings and the odd park"""
+        rects, colors, parks = [], [], []
+        # Denser toward downtown, thinning out across the metro region
+        distance = math.dist(chunk.rect.center, DOWNTOWN_RECT.center)
+        density = max(0.15, math.exp(-distance / SUBURB_FALLOFF))
+        inset = SUBURB_ROAD_WIDTH + 8
+        for block_y in range(chunk.rect.top, chunk.rect.bottom, BLOCK_SIZE):
+            for block_x in range(chunk.rect.left, chunk.rect.right, BLOCK_SIZE):
+                lot = pygame.Rect(block_x + inset, block_y + inset, BLOCK_SIZE - inset - 8, BLOCK_SIZE - inset - 8)
+                if lot.colliderect(DOWNTOWN_RECT):
+                    continue  # Covered by the hand-built cities
+                if rng.random() < SUBURB_PARK_CHANCE:
+                    park = Park(lot.x, lot.y, lot.width, lot.height, [], [])
+                    for _ in range(int(rng.integers(3, 9))):
+                        park.trees.append((int(rng.integers(lot.left + 15, lot.right - 15)),
+                                           int(rng.integers(lot.top + 20, lot.bottom - 20))))
+                    for _ in range(int(rng.integers(1, 4))):
+                        park.benches.append((int(rng.integers(lot.left + 15, lot.right - 15)),
+                                             int(rng.integers(lot.top + 15, lot.bottom - 5))))
+                    parks.append(park)
+                    continue
+                # Three plots a side, each holding one building or left empty
+                plot = lot.width // 3
+                for plot_y in range(lot.top, lot.bottom - plot + 1, plot):
+                    for plot_x in range(lot.left, lot.right - plot + 1, plot):
+                        if rng.random() >= density:
+                            continue
+                        w = int(rng.integers(30, plot - 5))
+                        h = int(rng.integers(40, plot - 5))
+                        rects.append((plot_x, plot_y, w, h))
+                        colors.append(BUILDING_COLORS[int(rng.integers(len(BUILDING_COLORS)))])
+        windows = CityWindows.generate(rects, WINDOW_LAYOUT, rng, presence=WINDOW_PRESENCE)
+        return SuburbChunk(np.array(rects, dtype=np.int32).reshape(-1, 4), colors, windows, parks)
+    
+    def _render_chunk(self, chunk: Chunk, surface: pygame.Surface, zoom: float):
+        """Draw one suburb chunk onto its own surface at a zoom level"""
+        content = chunk.content
+        origin = chunk.rect.topleft
+        if zoom < DETAIL_ZOOM:
+            surface.fill(CITY_GRAY)
+            for x in range(0, CHUNK_SIZE, BLOCK_SIZE):
+                surface.fill(ROAD_GRAY, scale_rect((x, 0, SUBURB_ROAD_WIDTH, CHUNK_SIZE), (0, 0), zoom))
+                surface.fill(ROAD_GRAY, scale_rect((0, x, CHUNK_SIZE, SUBURB_ROAD_WIDTH), (0, 0), zoom))
+            self._draw_lod_parks(surface, zoom, origin, content.parks)
+            self._draw_lod_buildings(surface, zoom, origin, content.buildings.tolist(),
+                                     content.colors, content.windows)
+            return
+        
+        # Full detail, drawn at world scale and resized if zoomed
+        detail = surface if zoom == 1 else pygame.Surface((CHUNK_SIZE, CHUNK_SIZE), 0, surface)
+        detail.fill(CITY_GRAY)
+        for x in range(0, CHUNK_SIZE, BLOCK_SIZE):
+            pygame.draw.rect(detail, ROAD_GRAY, (x, 0, SUBURB_ROAD_WIDTH, CHUNK_SIZE))
+            pygame.draw.rect(detail, ROAD_GRAY, (0, x, CHUNK_SIZE, SUBURB_ROAD_WIDTH))
+        for park in content.parks:
+            self._draw_park(detail, park, origin)
+        for i, rect in enumerate(content.buildings.tolist()):
+            self._draw_building(detail, rect, content.colors[i], content.windows, i, origin)
+        if zoom < 1:
+            pygame.transform.smoothscale(detail, surface.get_size(), surface)
+        elif zoom > 1:
+            pygame.transform.scale(detail, surface.get_size(), surface)
+    
+    def _render_downtown_lod(self, zoom: float) -> pygame.Surface:
+        """The downtowns at a low zoom, with simplified parks and buildings"""
+        self.layers.build()
+        surface = pygame.Surface(scale_rect(DOWNTOWN_RECT, (0, 0), zoom).size)
+        for name in self.layers.order:
+            if name == "parks":
+                self._draw_lod_parks(surface, zoom, (0, 0), self.parks)
+            elif name == "buildings":
+                for city, windows in self.windows.items():
+                    buildings = [b for b in self.buildings if b.city == city]
+                    self._draw_lod_buildings(surface, zoom, (0, 0),
+                                             [(b.x, b.y, b.width, b.height) for b in buildings],
+                                             [b.color for b in buildings], windows)
+            else:
+                surface.blit(pygame.transform.smoothscale(self.layers.surfaces[name], surface.get_size()), (0, 0))
+        return surface
+    
+    def _draw_downtown(self, viewport: pygame.Rect):
+        """Draw the hand-built cities, scaled or simplified to the camera zoom"""
+        zoom = self.camera.zoom
+        if zoom < DETAIL_ZOOM:
+            self.layers.build()
+            if self.downtown_lod is None or self.downtown_lod_key != (zoom, self.layers.version):
+                self.downtown_lod = self._render_downtown_lod(zoom)
+                self.downtown_lod_key = (zoom, self.layers.version)
+            self.screen.blit(self.downtown_lod, self.camera.to_screen(0, 0))
+            return
+        self.downtown_lod = None
+        if zoom == 1:
+            self.layers.blit_to(self.screen, self.camera.to_screen(0, 0))
+            return
+        # Scale only the part of the composite that is on screen
+        self.layers.build()
+        area = viewport.clip(DOWNTOWN_RECT)
+        scaled = self.camera.rect_to_screen(area)
+        self.screen.blit(pygame.transform.scale(self.layers.composite.subsurface(area), scaled.size), scaled)
+    
+    def _update_camera(self):
+        """Pan with the arrow keys, staying inside the metro region"""
+        self.camera.pan(*self.pan)
+        self.camera.clamp(METRO_RECT)
+    
+    def _set_pan(self, dx: int, dy: int):
+        self.pan = (dx, dy)
+    
+    def _zoom(self, steps: int, anchor_x: int, anchor_y: int):
+        """Step through the zoom levels, keeping the point under the anchor in place"""
+        level = ZOOM_LEVELS.index(self.camera.zoom) + steps
+        level = max(0, min(level, len(ZOOM_LEVELS) - 1))
+        self.camera.zoom_at(ZOOM_LEVELS[level], (anchor_x, anchor_y))
+        self.camera.clamp(METRO_RECT)
+    
+    def _select(self, x: float, y: float):
+        """Select the city at a world position, or nothing"""
+        if self.central_city_rect.collidepoint(x, y):
+            self.selected_city = CityType.CENTRAL
+            print("Selected Central City!")
+        elif self.starling_city_rect.collidepoint(x, y):
+            self.selected_city = CityType.STARLING
+            print("Selected Starling City!")
+        else:
+            self.selected_city = None
+    
+    def _quit(self):
+        self.running = False
+    
+    def _draw_world(self):
+        """Draw the chunks in view, then the downtowns and their traffic if they are on screen"""
+        viewport = self.camera.viewport()
+        self.world.update(viewport, CHUNK_GENERATE_BUDGET)
+        self.screen.fill(CITY_GRAY)  # Behind chunks that have not streamed in yet
+        self.world.draw(self.screen, self.camera)
+        if viewport.colliderect(DOWNTOWN_RECT):
+            self._draw_downtown(viewport)
+            self._draw_cars()
     
     def _draw_cars(self):
-        """Draw all cars"""
-        for car in self.cars:
-            # Car body
-            car_rect = pygame.Rect(car.x - 8, car.y - 4, 16, 8)
-            pygame.draw.rect(self.screen, car.color, car_rect)
-            
-            # Car direction indicator
-            front_x = car.x + math.cos(car.direction) * 8
-            front_y = car.y + math.sin(car.direction) * 8
-            pygame.draw.circle(self.screen, (255, 255, 255), (int(front_x), int(front_y)), 2)
+        """Draw all cars as one batch of sprites turned to their heading"""
+        zoom = self.camera.zoom
+        # The nose dot shows which way a car faces, once there is room for it
+        nose_radius = max(1, round(2 * zoom)) if zoom >= DETAIL_ZOOM else 0
+        sprites = vehicle_sprites(CAR_COLORS, self.cars.size, zoom=zoom, nose_radius=nose_radius)
+        n = self.cars.count
+        # Same rounding as Camera.to_screen, for every car at once
+        xs = np.rint(self.cars.x[:n] * zoom) - round(self.camera.x * zoom)
+        ys = np.rint(self.cars.y[:n] * zoom) - round(self.camera.y * zoom)
+        self.screen.blits(sprites.batch(xs, ys, self.cars.direction[:n], self.cars.color_index[:n]), False)
     
     def _draw_ui(self):
         """Draw user interface"""
         # Time display
-        font = pygame.font.Font(None, 36)
         time_text = f"Time: {self.time_of_day:.1f}:00"
-        time_surface = font.render(time_text, True, (255, 255, 255))
-        self.screen.blit(time_surface, (10, 10))
+        self.text.blit(self.screen, time_text, 36, (255, 255, 255), (10, 10))
         
-        # City labels
-        central_label = font.render("Central City", True, (255, 255, 255))
-        starling_label = font.render("Starling City", True, (255, 255, 255))
-        
-        self.screen.blit(central_label, (self.central_city_rect.x + 10, 
-                       self.central_city_rect.y + 10))
-        self.screen.blit(starling_label, (self.starling_city_rect.x + 10, 
-                       self.starling_city_rect.y + 10))
+        # City labels, which move with the camera
+        self.text.blit(self.screen, "Central City", 36, (255, 255, 255),
+                       self.camera.to_screen(self.central_city_rect.x + 10, self.central_city_rect.y + 10))
+        self.text.blit(self.screen, "Starling City", 36, (255, 255, 255),
+                       self.camera.to_screen(self.starling_city_rect.x + 10, self.starling_city_rect.y + 10))
         
         # Instructions
-        small_font = pygame.font.Font(None, 24)
         instructions = [
             "Click on cities to interact",
+            "Arrow keys to pan, mouse wheel or +/- to zoom",
             "ESC to quit",
             "Space to pause/resume time"
         ]
         
         for i, instruction in enumerate(instructions):
-            text_surface = small_font.render(instruction, True, (200, 200, 200))
-            self.screen.blit(text_surface, (10, SCREEN_HEIGHT - 80 + i * 25))
+            self.text.blit(self.screen, instruction, 24, (200, 200, 200), (10, SCREEN_HEIGHT - 5 - (len(instructions) - i) * 25))
     
     def _handle_events(self):
         """Handle user input"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                self.running = False
+                self._perform("quit")
                 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    self.running = False
+                    self._perform("quit")
                 elif event.key == pygame.K_SPACE:
                     # Toggle time pause
                     pass
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                    self._perform("zoom", 1, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self._perform("zoom", -1, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
                     
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                
-                # Check city selection
-                if self.central_city_rect.collidepoint(mouse_x, mouse_y):
-                    self.selected_city = CityType.CENTRAL
-                    print("Selected Central City!")
-                elif self.starling_city_rect.collidepoint(mouse_x, mouse_y):
-                    self.selected_city = CityType.STARLING
-                    print("Selected Starling City!")
-                else:
-                    self.selected_city = None
+            elif event.type == pygame.MOUSEWHEEL:
+                if event.y:
+                    self._perform("zoom", 1 if event.y > 0 else -1, *pygame.mouse.get_pos())
+                    
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 2, 3):
+                self._perform("select", *self.camera.to_world(*pygame.mouse.get_pos()))
+        
+        # Held keys are journaled only when the pan they give changes
+        keys = pygame.key.get_pressed()
+        pan = ((keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * CAMERA_PAN_SPEED,
+               (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * CAMERA_PAN_SPEED)
+        if pan != self.pan:
+            self._perform("pan", *pan)
+    
+    def _perform(self, action: str, *args: Any):
+        """Apply an input action before the next tick, journaling it when recording"""
+        if self.journal is not None:
+            self.journal.record(self.tick, action, *args)
+        self.actions[action](*args)
+    
+    def _update(self):
+        """Advance the simulation one tick"""
+        self._update_camera()
+        self._update_cars()
+        self._update_lighting()
+        self.tick += 1
+    
+    def replay(self, journal: InputJournal) -> float:
+        """Apply a journal's actions at their ticks, drawing every tick as fast as possible; returns seconds"""
+        player = JournalPlayer(journal)
+        end = journal.last_tick()
+        start = time.perf_counter()
+        while self.running and self.tick < end:
+            for entry in player.due(self.tick):
+                self.actions[entry.action](*entry.args)
+            self._update()
+            self._draw()
+            pygame.event.pump()  # Keep the window responsive; input is ignored
+            pygame.display.flip()
+        return time.perf_counter() - start
     
     def run(self):
         """Main game loop"""
-        while self.running:
-            self._handle_events()
-            
-            # Update game state
-            self._update_cars()
-            self._update_lighting()
-            
-            # Draw everything
-            self._draw_background()
-            self._draw_roads()
-            self._draw_parks()
-            self._draw_buildings()
-            self._draw_bridge()
-            self._draw_cars()
-            self._draw_ui()
-            
-            # Highlight selected city
-            if self.selected_city:
-                if self.selected_city == CityType.CENTRAL:
-                    pygame.draw.rect(self.screen, (255, 255, 0), 
-                                   self.central_city_rect, 5)
-                else:
-                    pygame.draw.rect(self.screen, (255, 255, 0), 
-                                   self.starling_city_rect, 5)
-            
-            pygame.display.flip()
-            self.clock.tick(FPS)
-        
+        try:
+            while self.running:
+                self._handle_events()
+                self._update()
+                self._draw()
+                pygame.display.flip()
+                self.clock.tick(FPS)
+        finally:
+            # A crashed run still leaves a finished, replayable journal
+            if self.journal is not None:
+                self.journal.finish(self.tick)
         pygame.quit()
         sys.exit()
+    
+    def _draw(self):
+        """Draw everything"""
+        self._draw_world()
+        self._draw_ui()
+        
+        # Highlight selected city
+        if self.selected_city:
+            if self.selected_city == CityType.CENTRAL:
+                pygame.draw.rect(self.screen, (255, 255, 0), 
+                               self.camera.rect_to_screen(self.central_city_rect), 5)
+            else:
+                pygame.draw.rect(self.screen, (255, 255, 0), 
+                               self.camera.rect_to_screen(self.starling_city_rect), 5)
 
 def main():
     """Main function"""
@@ -466,8 +848,27 @@ def main():
     print("- Interactive city selection")
     print("- Parks with trees and benches")
     print("- Realistic building windows")
+    print("- Procedural metro region to explore (arrow keys, mouse wheel to zoom)")
     
-    game = FlashpointCities()
+    parser = argparse.ArgumentParser(description="Flashpoint Cities")
+    parser.add_argument("--seed", type=int, help="seed for the world and traffic")
+    parser.add_argument("--record", metavar="PATH", help="journal every input with the seed, for replaying the run later")
+    parser.add_argument("--replay", metavar="PATH", help="re-run a recorded journal as fast as possible")
+    args = parser.parse_args()
+    
+    journal = InputJournal.load(args.replay) if args.replay else None
+    seed = journal.settings.get("seed") if journal is not None else args.seed
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 32)  # Chosen here so a recording can store it
+    game = FlashpointCities(seed)
+    if journal is not None:
+        elapsed = game.replay(journal)
+        print(f"Replayed {len(journal.entries)} inputs up to tick {game.tick} in {elapsed:.2f}s")
+        pygame.quit()
+        return
+    if args.record:
+        game.journal = InputJournal({"seed": seed})
+        game.journal.open(args.record)
     game.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+"""
+Flashpoint Cities - Travel Demand
+Origin-destination trip rates between districts, precomputed for every
+slice of the day from each district's size, the distance between them and
+a rush-hour profile per kind of district. A tick's spawns are then one
+Poisson draw for how many trips start and one search of the slice's
+cumulative table for where they go, instead of a coin flip per spawn point.
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+DAY_SLICES = 96  # Quarter hours
+
+Peak = Tuple[float, float, float]  # (hour, spread in hours, height)
+
+
+@dataclass(frozen=True)
+class DistrictProfile:
+    """When a kind of district sends trips out and draws them in over the day"""
+    departures: Tuple[Peak, ...]
+    arrivals: Tuple[Peak, ...]
+    base: float = 0.3  # Level that runs around the clock, relative to a peak height of 1
+
+    def curve(self, peaks: Sequence[Peak], hours: np.ndarray) -> np.ndarray:
+        """Relative rate at each hour, scaled to a daily mean of 1"""
+        rate = np.full(len(hours), self.base)
+        for hour, spread, height in peaks:
+            offset = (hours - hour + 12) % 24 - 12  # Peaks wrap around midnight
+            rate += height * np.exp(-0.5 * (offset / spread) ** 2)
+        return rate / rate.mean()
+
+
+DISTRICT_PROFILES: Dict[str, DistrictProfile] = {
+    "residential": DistrictProfile(departures=((8.0, 1.0, 3.0), (13.0, 2.0, 0.6)),
+                                   arrivals=((17.5, 1.5, 3.0), (21.0, 2.0, 0.8))),
+    "business": DistrictProfile(departures=((12.5, 1.0, 1.0), (17.5, 1.2, 3.0)),
+                                arrivals=((8.5, 1.0, 3.0), (13.0, 1.0, 1.0))),
+    "tech": DistrictProfile(departures=((18.5, 1.5, 2.5),), arrivals=((9.5, 1.5, 2.5),)),
+    "industrial": DistrictProfile(departures=((6.5, 0.7, 1.5), (14.5, 0.7, 2.0), (22.5, 0.7, 2.0)),
+                                  arrivals=((5.5, 0.7, 2.0), (13.5, 0.7, 2.0), (21.5, 0.7, 1.5)), base=0.5),
+    "harbor": DistrictProfile(departures=((16.0, 1.5, 2.0),), arrivals=((6.0, 1.0, 2.5),)),
+    "bridge": DistrictProfile(departures=((21.5, 1.5, 2.0),), arrivals=((19.5, 1.5, 2.0),), base=0.1),
+}
+
+
+@dataclass(frozen=True)
+class Zone:
+    name: str
+    kind: str  # Key into the district profiles
+    centre: Tuple[float, float]
+    trips: float  # Trips leaving per day
+
+
+class TravelDemand:
+    """Trips per tick between every pair of zones, for each slice of the day
+
+    Each zone sends out its daily trips following its kind's departure
+    curve; a slice's departures are shared among the other zones by their
+    size, arrival curve and closeness (a production-constrained gravity
+    model). Times of day are fractions, 0.0 = midnight.
+    """
+
+    def __init__(self, zones: Sequence[Zone], ticks_per_day: int, decay_distance: float = 600.0,
+                 profiles: Dict[str, DistrictProfile] = DISTRICT_PROFILES, slices: int = DAY_SLICES):
+        self.zones = list(zones)
+        self.slices = slices
+        n = len(self.zones)
+        hours = (np.arange(slices) + 0.5) * 24.0 / slices
+        departures = np.stack([profiles[zone.kind].curve(profiles[zone.kind].departures, hours) * zone.trips
+                               for zone in self.zones], axis=1)
+        arrivals = np.stack([profiles[zone.kind].curve(profiles[zone.kind].arrivals, hours) * zone.trips
+                             for zone in self.zones], axis=1)
+        centres = np.array([zone.centre for zone in self.zones], dtype=np.float64).reshape(n, 2)
+        distance = np.hypot(*(centres[:, None, :] - centres[None, :, :]).transpose(2, 0, 1))
+        closeness = np.exp(-distance / decay_distance)
+        np.fill_diagonal(closeness, 0.0)  # A trip inside its own district never reaches the road
+
+        # Share of each origin's trips going to each destination, per slice
+        attraction = arrivals[:, None, :] * closeness[None, :, :]
+        totals = attraction.sum(axis=2, keepdims=True)
+        shares = np.divide(attraction, totals, out=np.zeros_like(attraction), where=totals > 0)
+        self.rates = departures[:, :, None] * shares / ticks_per_day  # (slice, origin, destination)
+
+        # Cumulative tables for sampling pairs per slice, and destinations per origin
+        flat = self.rates.reshape(slices, n * n)
+        self.totals = flat.sum(axis=1)
+        self.cumulative = np.cumsum(flat, axis=1) / np.maximum(self.totals, 1e-300)[:, None]
+        self.cumulative[:, -1] = 1.0
+        self.row_cumulative = np.cumsum(shares, axis=2)
+        self.row_cumulative[:, :, -1] = 1.0
+        self._none = np.zeros(0, dtype=np.int64)
+
+    def slice_at(self, time_of_day: float) -> int:
+        return min(int(time_of_day % 1.0 * self.slices), self.slices - 1)
+
+    def matrix(self, time_of_day: float) -> np.ndarray:
+        """Trips per tick from each origin (rows) to each destination (columns)"""
+        return self.rates[self.slice_at(time_of_day)]
+
+    def trips_per_tick(self, time_of_day: float) -> float:
+        return float(self.totals[self.slice_at(time_of_day)])
+
+    def sample(self, rng: np.random.Generator, time_of_day: float,
+               scale: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Origins and destinations of the trips starting this tick"""
+        period = self.slice_at(time_of_day)
+        rate = self.totals[period] * scale
+        count = int(rng.poisson(rate)) if rate > 0 else 0
+        if count == 0:
+            return self._none, self._none
+        pairs = np.searchsorted(self.cumulative[period], rng.random(count), side="right")
+        np.minimum(pairs, len(self.zones) ** 2 - 1, out=pairs)
+        return np.divmod(pairs, len(self.zones))
+
+    def destination(self, time_of_day: float, origin: int, u: float) -> int:
+        """Where a trip leaving origin goes, from a uniform [0, 1) draw"""
+        row = self.row_cumulative[self.slice_at(time_of_day), origin]
+        return min(int(np.searchsorted(row, u, side="right")), len(self.zones) - 1)
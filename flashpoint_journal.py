@@ -0,0 +1,102 @@
+"""
+Flashpoint Cities - Input Journal
+Every user input recorded as a named action and the tick it was applied
+before, together with the seed and settings the run started from. A run
+is a pure function of those, so replaying the actions at the same ticks
+reproduces it exactly, as fast as the machine allows and with or without
+drawing, e.g. to profile a reported frame-time spike.
+
+Journals are JSON lines: a header, one line per action and, when the run
+ended cleanly, an end line. Lines are flushed as they are written, so a
+crashed run still leaves a replayable journal.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+JOURNAL_FORMAT = 1  # Bump when the line layout changes
+
+
+class JournalError(Exception):
+    """Raised for files that are not readable input journals"""
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    tick: int  # Applied after this many ticks, before the next update
+    action: str
+    args: Tuple[Any, ...] = ()
+
+
+class InputJournal:
+    """Actions by tick, plus the settings needed to start the same run again"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings: Dict[str, Any] = dict(settings or {})
+        self.entries: List[JournalEntry] = []
+        self.end_tick: Optional[int] = None  # None if the run never finished cleanly
+        self.file: Optional[IO[str]] = None
+
+    def open(self, path: str):
+        """Write the header now and every later action as it is recorded"""
+        self.file = open(path, "w")
+        self._write({"format": JOURNAL_FORMAT, "settings": self.settings})
+        for entry in self.entries:
+            self._write_entry(entry)
+
+    def record(self, tick: int, action: str, *args: Any):
+        entry = JournalEntry(tick, action, tuple(args))
+        self.entries.append(entry)
+        if self.file is not None:
+            self._write_entry(entry)
+
+    def finish(self, tick: int):
+        """Mark where the run ended and close the file"""
+        self.end_tick = tick
+        if self.file is not None:
+            self._write({"end": tick})
+            self.file.close()
+            self.file = None
+
+    def last_tick(self) -> int:
+        """Tick a replay should stop at: the end if known, else just after the last action"""
+        if self.end_tick is not None:
+            return self.end_tick
+        return max(entry.tick for entry in self.entries) + 1 if self.entries else 0
+
+    def _write_entry(self, entry: JournalEntry):
+        self._write({"tick": entry.tick, "action": entry.action, "args": list(entry.args)})
+
+    def _write(self, line: Dict[str, Any]):
+        self.file.write(json.dumps(line) + "\n")
+        self.file.flush()
+
+    @classmethod
+    def load(cls, path: str) -> "InputJournal":
+        with open(path) as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines or lines[0].get("format") != JOURNAL_FORMAT:
+            raise JournalError(f"{path} is not a format {JOURNAL_FORMAT} input journal")
+        journal = cls(lines[0].get("settings"))
+        for line in lines[1:]:
+            if "end" in line:
+                journal.end_tick = line["end"]
+            else:
+                journal.entries.append(JournalEntry(line["tick"], line["action"], tuple(line.get("args", ()))))
+        return journal
+
+
+class JournalPlayer:
+    """Hands out a journal's actions in order as the clock reaches them"""
+
+    def __init__(self, journal: InputJournal):
+        self.entries = sorted(journal.entries, key=lambda entry: entry.tick)  # Stable: same-tick order kept
+        self.index = 0
+
+    def due(self, tick: int) -> List[JournalEntry]:
+        """Actions to apply before the update that follows tick, including any the clock skipped past"""
+        start = self.index
+        while self.index < len(self.entries) and self.entries[self.index].tick <= tick:
+            self.index += 1
+        return self.entries[start:self.index]
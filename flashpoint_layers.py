@@ -0,0 +1,176 @@
+"""
+Flashpoint Cities - Layered Renderer
+Static scenery (sky, roads, bridge, parks, buildings) is baked into cached
+off-screen surfaces and composited once, so each frame is a single blit.
+"""
+
+import pygame
+from typing import Callable, Dict, List, Optional, Tuple
+
+LayerRenderer = Callable[[pygame.Surface], None]
+
+
+class LayerCache:
+    """Off-screen surfaces for static scenery, re-rendered only when invalidated"""
+
+    def __init__(self, size: Tuple[int, int], layers_per_build: Optional[int] = None):
+        self.size = size
+        # Re-render at most this many layers per build, streaming the rest in over later
+        # frames (bottom layers first) so the first frame is not held up by every layer
+        self.layers_per_build = layers_per_build
+        self.order: List[str] = []
+        self.renderers: Dict[str, LayerRenderer] = {}
+        self.surfaces: Dict[str, pygame.Surface] = {}
+        self.opaque: Dict[str, bool] = {}
+        self.dirty_layers = set()
+        self.composite: Optional[pygame.Surface] = None
+        self.composite_dirty = True
+        self.version = 0  # Bumped whenever the whole composite is rebuilt
+        self.track_patches = False
+        self.patched_rects: List[pygame.Rect] = []  # Patched since take_patches()
+
+    def register(self, name: str, render: LayerRenderer, opaque: bool = False):
+        """Add a layer on top of the existing ones"""
+        self.order.append(name)
+        self.renderers[name] = render
+        self.opaque[name] = opaque
+        self.dirty_layers.add(name)
+        self.composite_dirty = True
+
+    def invalidate(self, name: str):
+        """Mark a layer for a full re-render on the next blit"""
+        self.dirty_layers.add(name)
+        self.composite_dirty = True
+
+    def patch(self, name: str, rect: Tuple[int, int, int, int], draw: LayerRenderer):
+        """Draw a small change straight onto a cached layer and recomposite only that area
+
+        The draw callback must fully cover rect, since the old pixels are not cleared.
+        """
+        if name in self.dirty_layers or name not in self.surfaces:
+            return  # The full re-render will pick up the change
+        draw(self.surfaces[name])
+        if not self.composite_dirty:
+            self._composite_area(pygame.Rect(rect))
+            if self.track_patches:
+                self.patched_rects.append(pygame.Rect(rect))
+
+    def take_patches(self) -> List[pygame.Rect]:
+        """Areas patched since the last call, and start recording future patches"""
+        self.track_patches = True
+        patched = self.patched_rects
+        self.patched_rects = []
+        return patched
+
+    def pending(self) -> bool:
+        """Whether some layers are still waiting to be rendered"""
+        return bool(self.dirty_layers)
+
+    def build(self):
+        """Bring the composited scenery up to date, within the per-build layer budget"""
+        if self.composite_dirty:
+            self._rebuild()
+
+    def blit_to(self, target: pygame.Surface, offset: Tuple[int, int] = (0, 0)):
+        """Blit the composited scenery onto the target surface"""
+        self.build()
+        target.blit(self.composite, offset)
+
+    def blit_area(self, target: pygame.Surface, rect: pygame.Rect):
+        """Repaint one region of the target from the composited scenery"""
+        self.build()
+        target.blit(self.composite, rect.topleft, rect)
+
+    def _new_surface(self, opaque: bool) -> pygame.Surface:
+        """Create a layer surface in the fastest format available"""
+        if opaque:
+            surface = pygame.Surface(self.size)
+            return surface.convert() if pygame.display.get_surface() else surface
+        surface = pygame.Surface(self.size, pygame.SRCALPHA)
+        return surface.convert_alpha() if pygame.display.get_surface() else surface
+
+    def _rebuild(self):
+        """Re-render dirty layers and recomposite the whole stack"""
+        budget = self.layers_per_build
+        for name in self.order:
+            if name in self.dirty_layers:
+                if budget is not None:
+                    if budget == 0:
+                        break
+                    budget -= 1
+                surface = self.surfaces.get(name)
+                if surface is None:
+                    surface = self._new_surface(self.opaque[name])
+                    self.surfaces[name] = surface
+                surface.fill((0, 0, 0) if self.opaque[name] else (0, 0, 0, 0))
+                self.renderers[name](surface)
+                self.dirty_layers.discard(name)
+
+        if self.composite is None:
+            self.composite = self._new_surface(True)
+        self._composite_area(self.composite.get_rect())
+        self.composite_dirty = bool(self.dirty_layers)
+        self.version += 1
+
+    def _composite_area(self, area: pygame.Rect):
+        """Recomposite the layer stack inside one rectangle"""
+        area = area.clip(self.composite.get_rect())
+        self.composite.fill((0, 0, 0), area)
+        for name in self.order:
+            surface = self.surfaces.get(name)
+            if surface is not None:  # Not yet streamed in
+                self.composite.blit(surface, area.topleft, area)
+
+
+class DirtyRectTracker:
+    """Tracks regions touched by dynamic drawing so only those are repainted and pushed"""
+
+    def __init__(self, screen_rect: pygame.Rect, max_rects: int = 256, max_coverage: float = 0.5):
+        self.screen_rect = screen_rect
+        self.max_rects = max_rects
+        self.max_area = screen_rect.width * screen_rect.height * max_coverage
+        self.previous: List[pygame.Rect] = []
+        self.current: List[pygame.Rect] = []
+        self.full_redraw = True
+        self.covers_screen = False
+        self.layers_version = -1
+
+    def mark(self, rect: pygame.Rect) -> pygame.Rect:
+        """Record a region drawn this frame"""
+        self.current.append(rect)
+        return rect
+
+    def invalidate(self):
+        """Force the whole screen to be repainted and pushed this frame"""
+        self.full_redraw = True
+
+    def mark_screen(self):
+        """Record that this frame drew over the whole screen (e.g. rain or fog)"""
+        self.covers_screen = True
+
+    def restore(self, layers: LayerCache, target: pygame.Surface):
+        """Erase last frame's dynamic drawing by repainting the scenery underneath it"""
+        layers.build()
+        if layers.version != self.layers_version:
+            self.layers_version = layers.version
+            self.full_redraw = True
+        patched = layers.take_patches()
+        if self.full_redraw:
+            layers.blit_to(target)
+        else:
+            for rect in self.previous + patched:
+                layers.blit_area(target, rect)
+            self.current.extend(patched)
+
+    def flush(self) -> Optional[List[pygame.Rect]]:
+        """Finish the frame; returns the rects to push, or None to push the whole screen"""
+        rects = [rect.clip(self.screen_rect) for rect in self.previous + self.current]
+        rects = [rect for rect in rects if rect.width and rect.height]
+        full = (self.full_redraw or self.covers_screen or len(rects) > self.max_rects
+                or sum(rect.width * rect.height for rect in rects) > self.max_area)
+        self.previous = self.current
+        self.current = []
+        # Full-screen drawing can only be erased by repainting everything next frame
+        self.full_redraw = self.covers_screen
+        self.covers_screen = False
+        return None if full else rects
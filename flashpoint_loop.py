@@ -0,0 +1,80 @@
+"""
+Flashpoint Cities - Simulation Loop
+Runs the simulation on its own thread at a fixed tick rate. After every tick
+the loop publishes an immutable frame captured from the simulation, so the
+renderer can draw the newest frame at its own pace (interpolating between
+ticks) without ever holding up or observing a half-finished tick.
+"""
+
+import threading
+import time
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+Frame = TypeVar("Frame")
+
+
+class SimulationThread(Generic[Frame]):
+    """Fixed-rate tick loop that publishes a frame after every tick
+
+    step() and capture() run while holding lock; anything else that mutates
+    the simulation (input handling, say) must take the same lock.
+    """
+
+    def __init__(self, step: Callable[[], None], capture: Callable[[], Frame], tick_seconds: float,
+                 lock: Optional[threading.Lock] = None, max_catch_up: int = 5):
+        self.step = step
+        self.capture = capture
+        self.tick_seconds = tick_seconds
+        self.lock = lock if lock is not None else threading.Lock()
+        self.max_catch_up = max_catch_up  # Ticks run back to back before the loop gives up on lost time
+        self.published: Optional[Tuple[Frame, float]] = None  # Frame and when it was published
+        self.ticks = 0
+        self.dropped = 0  # Ticks skipped because the simulation fell behind
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+
+    def start(self):
+        with self.lock:
+            self.published = (self.capture(), time.perf_counter())
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            raise self.error
+
+    def latest(self) -> Tuple[Frame, float]:
+        """Newest frame and how far (0-1) the clock has moved toward the next tick"""
+        frame, published_at = self.published
+        alpha = (time.perf_counter() - published_at) / self.tick_seconds
+        return frame, min(max(alpha, 0.0), 1.0)
+
+    def _run(self):
+        clock = time.perf_counter
+        next_tick = clock()
+        try:
+            while self.running:
+                now = clock()
+                if now < next_tick:
+                    time.sleep(min(next_tick - now, 0.002))
+                    continue
+                with self.lock:
+                    self.step()
+                    frame = self.capture()
+                self.published = (frame, clock())
+                self.ticks += 1
+                next_tick += self.tick_seconds
+                behind = int((clock() - next_tick) / self.tick_seconds)
+                if behind > self.max_catch_up:
+                    # Too slow to keep up: skip the lost ticks instead of spiralling
+                    self.dropped += behind
+                    next_tick += behind * self.tick_seconds
+        except BaseException as e:
+            self.error = e
+            self.running = False
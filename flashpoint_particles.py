@@ -0,0 +1,325 @@
+"""
+Flashpoint Cities - Particle System
+Fixed-capacity particle pool stored in NumPy arrays. Rain, lightning and
+speed-force lines are emitters sharing the pool; spawning, movement, ageing
+and drawing all run as batched array operations. Free slots are kept on a
+stack and rasterizing reuses scratch buffers, so a steady frame allocates
+no particle-sized arrays.
+"""
+
+import threading
+import numpy as np
+import pygame
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Emitter:
+    name: str
+    color: Tuple[int, int, int]
+    segment: Tuple[float, float]  # Each particle is drawn as a line to position + segment
+    velocity: Tuple[float, float]  # Pixels per tick
+    lifetime: Tuple[int, int]  # Min/max ticks a particle lives
+    spawn_area: Tuple[float, float, float, float]  # x, y, width, height
+    rate: float = 0.0  # Particles spawned per tick while active
+    segment_jitter: Tuple[float, float] = (0.0, 0.0)
+    velocity_jitter: float = 0.0  # Fractional speed variation
+    width: int = 1
+    brightness_per_tick: float = 0.0  # Fade color with remaining life (0 = no fade)
+    active: bool = False
+
+
+class ParticleSystem:
+    """Preallocated particle pool shared by all emitters"""
+
+    def __init__(self, capacity: int = 16384, rng: Optional[np.random.Generator] = None):
+        self.capacity = capacity
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.emitters: List[Emitter] = []
+        self.emitter_ids: Dict[str, int] = {}
+        self.spawn_debt: List[float] = []  # Fractional particles carried between ticks
+
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.emitter = np.zeros(capacity, dtype=np.int16)
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.dx = np.zeros(capacity, dtype=np.float32)
+        self.dy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int32)
+
+        # Free slots, lowest on top, so a fresh pool fills from slot 0 up
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.intp)
+        self.free_count = capacity
+        self.slots = np.arange(capacity, dtype=np.intp)
+        self.spawned = np.zeros(capacity, dtype=np.intp)  # Slots being filled by emit()
+        self.mask = np.zeros(capacity, dtype=bool)  # Scratch for particles leaving the pool
+
+    def add_emitter(self, emitter: Emitter) -> int:
+        """Register an emitter; returns its id"""
+        self.emitter_ids[emitter.name] = len(self.emitters)
+        self.emitters.append(emitter)
+        self.spawn_debt.append(0.0)
+        return self.emitter_ids[emitter.name]
+
+    def __getitem__(self, name: str) -> Emitter:
+        return self.emitters[self.emitter_ids[name]]
+
+    def emit(self, name: str, count: int, x: Optional[np.ndarray] = None,
+             y: Optional[np.ndarray] = None, lifetime: Optional[np.ndarray] = None,
+             age: Optional[np.ndarray] = None) -> int:
+        """Spawn up to count particles from an emitter; returns how many fitted in the pool"""
+        emitter_id = self.emitter_ids[name]
+        emitter = self.emitters[emitter_id]
+        n = min(count, self.free_count)
+        if n == 0:
+            return 0
+        slots = self.spawned[:n]
+        slots[:] = self.free[self.free_count - n:self.free_count][::-1]
+        self.free_count -= n
+        rng = self.rng
+
+        area_x, area_y, area_w, area_h = emitter.spawn_area
+        self.x[slots] = x if x is not None else area_x + rng.random(n) * area_w
+        self.y[slots] = y if y is not None else area_y + rng.random(n) * area_h
+        scale = 1.0 + emitter.velocity_jitter * (rng.random(n) * 2 - 1)
+        self.vx[slots] = emitter.velocity[0] * scale
+        self.vy[slots] = emitter.velocity[1] * scale
+        jitter_x, jitter_y = emitter.segment_jitter
+        self.dx[slots] = emitter.segment[0] + jitter_x * (rng.random(n) * 2 - 1)
+        self.dy[slots] = emitter.segment[1] + jitter_y * (rng.random(n) * 2 - 1)
+        if lifetime is None:
+            low, high = emitter.lifetime
+            lifetime = rng.integers(low, high + 1, n)
+        self.life[slots] = lifetime
+        if age is not None:
+            # Pre-aged particles, e.g. rain that is already mid-fall
+            self.x[slots] += self.vx[slots] * age
+            self.y[slots] += self.vy[slots] * age
+            self.life[slots] -= age
+        self.emitter[slots] = emitter_id
+        self.alive[slots] = True
+        if age is not None:
+            # Particles aged past their lifetime go straight back
+            dead = self.mask
+            dead[:] = False
+            dead[slots] = self.life[slots] <= 0
+            self._release(dead)
+        return n
+
+    def _release(self, mask: np.ndarray):
+        """Kill the live particles where mask is True, pushing their slots onto the free stack"""
+        count = int(np.count_nonzero(mask))
+        if count == 0:
+            return
+        np.compress(mask, self.slots, out=self.free[self.free_count:self.free_count + count])
+        self.free_count += count
+        np.logical_xor(self.alive, mask, out=self.alive)
+
+    def prewarm(self, name: str):
+        """Fill an emitter with its steady-state population, spread over all ages"""
+        emitter = self[name]
+        low, high = emitter.lifetime
+        count = int(emitter.rate * (low + high) / 2)
+        lifetime = self.rng.integers(low, high + 1, count)
+        age = (self.rng.random(count) * lifetime).astype(np.int32)
+        self.emit(name, count, lifetime=lifetime, age=age)
+
+    def update(self):
+        """Spawn from active emitters, then move and age every particle"""
+        for emitter_id, emitter in enumerate(self.emitters):
+            if not emitter.active or emitter.rate <= 0:
+                self.spawn_debt[emitter_id] = 0.0
+                continue
+            due = self.spawn_debt[emitter_id] + emitter.rate
+            count = int(due)
+            self.spawn_debt[emitter_id] = due - count
+            if count:
+                self.emit(emitter.name, count)
+
+        alive = self.alive
+        np.add(self.x, self.vx, out=self.x, where=alive)
+        np.add(self.y, self.vy, out=self.y, where=alive)
+        np.subtract(self.life, 1, out=self.life, where=alive)
+        dying = self.mask
+        np.less_equal(self.life, 0, out=dying)
+        np.logical_and(dying, alive, out=dying)
+        self._release(dying)
+
+    def count(self, name: str) -> int:
+        """Live particles belonging to an emitter"""
+        return int(np.count_nonzero(self.alive & (self.emitter == self.emitter_ids[name])))
+
+    def clear(self, name: Optional[str] = None):
+        """Kill every particle, or only those of one emitter"""
+        cleared = self.mask
+        if name is None:
+            cleared[:] = self.alive
+        else:
+            np.equal(self.emitter, self.emitter_ids[name], out=cleared)
+            np.logical_and(cleared, self.alive, out=cleared)
+        self._release(cleared)
+
+    def pack(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Emitter state and live particles, for snapshots"""
+        alive = np.flatnonzero(self.alive)
+        arrays = {name: getattr(self, name)[alive].copy()
+                  for name in ("emitter", "x", "y", "vx", "vy", "dx", "dy", "life")}
+        arrays["slot"] = alive.astype(np.uint32)  # Keeps pool layout identical on restore
+        arrays["free"] = self.free[:self.free_count].astype(np.uint32)  # And which slots are handed out next
+        meta = {
+            "active": [emitter.active for emitter in self.emitters],
+            "spawn_debt": list(self.spawn_debt),
+            "rng": self.rng.bit_generator.state,
+        }
+        return meta, arrays
+
+    def unpack(self, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        """Replace every particle and emitter state with the output of pack()"""
+        for emitter, active in zip(self.emitters, meta["active"]):
+            emitter.active = active
+        self.spawn_debt = list(meta["spawn_debt"])
+        self.rng.bit_generator.state = meta["rng"]
+        slots = arrays["slot"].astype(np.intp)
+        self.alive[:] = False
+        self.alive[slots] = True
+        free = arrays["free"].astype(np.intp)
+        self.free_count = len(free)
+        self.free[:self.free_count] = free
+        for name, values in arrays.items():
+            if name not in ("slot", "free"):
+                getattr(self, name)[slots] = values
+
+    def draw(self, surface: pygame.Surface, name: str) -> Optional[pygame.Rect]:
+        """Draw one emitter's particles; returns the area covered, or None if nothing was drawn"""
+        emitter_id = self.emitter_ids[name]
+        index = np.flatnonzero(self.alive & (self.emitter == emitter_id))
+        return draw_particles(surface, self.emitters[emitter_id], self.x[index], self.y[index],
+                              self.dx[index], self.dy[index], self.life[index])
+
+    def freeze(self) -> "ParticleFrame":
+        """Copy of the live particles that can be drawn while the pool keeps updating"""
+        alive = np.flatnonzero(self.alive)
+        return ParticleFrame(self.emitters, self.emitter_ids,
+                             *(getattr(self, name)[alive] for name in ("emitter", "x", "y", "dx", "dy", "life")))
+
+
+@dataclass
+class ParticleFrame:
+    """Live particles frozen at one tick, as returned by ParticleSystem.freeze()"""
+    emitters: List[Emitter]
+    emitter_ids: Dict[str, int]
+    emitter: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    dx: np.ndarray
+    dy: np.ndarray
+    life: np.ndarray
+
+    def draw(self, surface: pygame.Surface, name: str) -> Optional[pygame.Rect]:
+        """Draw one emitter's particles; returns the area covered, or None if nothing was drawn"""
+        emitter_id = self.emitter_ids[name]
+        index = np.flatnonzero(self.emitter == emitter_id)
+        return draw_particles(surface, self.emitters[emitter_id], self.x[index], self.y[index],
+                              self.dx[index], self.dy[index], self.life[index])
+
+
+def draw_particles(surface: pygame.Surface, emitter: Emitter, x0: np.ndarray, y0: np.ndarray,
+                   dx: np.ndarray, dy: np.ndarray, life: np.ndarray) -> Optional[pygame.Rect]:
+    """Draw particle line segments; returns the area covered, or None if there were none"""
+    if len(x0) == 0:
+        return None
+    x1, y1 = x0 + dx, y0 + dy
+    half = emitter.width
+    left = int(min(x0.min(), x1.min())) - half
+    top = int(min(y0.min(), y1.min())) - half
+    right = int(max(x0.max(), x1.max())) + half + 1
+    bottom = int(max(y0.max(), y1.max())) + half + 1
+    bounds = pygame.Rect(left, top, right - left, bottom - top)
+
+    if emitter.brightness_per_tick or surface.get_bytesize() not in (1, 2, 4):
+        # Few particles, per-particle color or an odd pixel format: plain line calls
+        for i, (ax, ay, bx, by) in enumerate(zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())):
+            color = emitter.color
+            if emitter.brightness_per_tick:
+                fade = min(1.0, life[i] * emitter.brightness_per_tick / 255)
+                color = tuple(int(c * fade) for c in color)
+            pygame.draw.line(surface, color, (ax, ay), (bx, by), emitter.width)
+        return bounds
+
+    _rasterize(surface, emitter, x0, y0, dx, dy)
+    return bounds
+
+
+class _RasterBuffers:
+    """Scratch arrays for _rasterize, grown as needed and reused across frames"""
+
+    def __init__(self):
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.steps: Dict[int, np.ndarray] = {}
+
+    def get(self, name: str, size: int, dtype) -> np.ndarray:
+        array = self.arrays.get(name)
+        if array is None or len(array) < size:
+            capacity = size if array is None else max(size, 2 * len(array))
+            array = self.arrays[name] = np.empty(capacity, dtype=dtype)
+        return array[:size]
+
+    def fractions(self, steps: int) -> np.ndarray:
+        """Evenly spaced points from 0 to 1 along a segment"""
+        t = self.steps.get(steps)
+        if t is None:
+            t = self.steps[steps] = np.linspace(0.0, 1.0, steps, dtype=np.float32)
+        return t
+
+
+_raster_buffers = threading.local()  # Per drawing thread
+
+
+def _rasterize(surface: pygame.Surface, emitter: Emitter,
+               x: np.ndarray, y: np.ndarray, dx: np.ndarray, dy: np.ndarray):
+    """Write every particle's line segment straight into the pixel array in one pass"""
+    buffers = getattr(_raster_buffers, "buffers", None)
+    if buffers is None:
+        buffers = _raster_buffers.buffers = _RasterBuffers()
+    steps = int(np.ceil(max(np.abs(dx).max(), np.abs(dy).max()))) + 1
+    t = buffers.fractions(steps)
+    n, width = len(x), emitter.width
+    points = n * steps
+    px = buffers.get("px", points * width, np.float32).reshape(points, width)
+    py = buffers.get("py", points * width, np.float32).reshape(points, width)
+    line_x, line_y = px[:, 0].reshape(n, steps), py[:, 0].reshape(n, steps)
+    np.multiply(dx[:, None], t, out=line_x)
+    np.add(line_x, x[:, None], out=line_x)
+    np.multiply(dy[:, None], t, out=line_y)
+    np.add(line_y, y[:, None], out=line_y)
+    if width > 1:
+        # Thicken across the dominant direction of travel
+        horizontal = abs(float(dx.mean())) >= abs(float(dy.mean()))
+        offsets = np.arange(width, dtype=np.float32) - width // 2
+        across, along = (py, px) if horizontal else (px, py)
+        np.add(across[:, :1], offsets, out=across)
+        along[:, 1:] = along[:, :1]
+    size = points * width
+    ix = buffers.get("ix", size, np.intp)
+    iy = buffers.get("iy", size, np.intp)
+    np.copyto(ix, px.reshape(size), casting="unsafe")  # Truncates, like astype
+    np.copyto(iy, py.reshape(size), casting="unsafe")
+    screen_width, screen_height = surface.get_size()
+    inside = buffers.get("inside", size, bool)
+    check = buffers.get("check", size, bool)
+    np.greater_equal(ix, 0, out=inside)
+    np.less(ix, screen_width, out=check)
+    np.logical_and(inside, check, out=inside)
+    np.greater_equal(iy, 0, out=check)
+    np.logical_and(inside, check, out=inside)
+    np.less(iy, screen_height, out=check)
+    np.logical_and(inside, check, out=inside)
+    count = int(np.count_nonzero(inside))
+    cx = np.compress(inside, ix, out=buffers.get("cx", count, np.intp))
+    cy = np.compress(inside, iy, out=buffers.get("cy", count, np.intp))
+    pixels = pygame.surfarray.pixels2d(surface)
+    pixels[cx, cy] = surface.map_rgb(emitter.color)
+    del pixels  # Unlock the surface
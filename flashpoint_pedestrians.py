@@ -0,0 +1,274 @@
+"""
+Flashpoint Cities - Pedestrians
+Crowds of pedestrians stored as arrays and steered by flow fields. The
+walkable ground is a coarse grid; each destination (a city's doors, a
+park's benches, ...) gets one field, computed once, pointing every cell
+along a shortest path toward it, so moving tens of thousands of agents is a
+table lookup per agent rather than a path search. Road crossings are cells
+tagged with a signal and only entered while that signal lets people cross,
+and a per-cell density map slows agents down in crowds.
+"""
+
+import math
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+WALKING = 0
+DWELLING = 1  # Sitting on a bench, looking at the water, inside a building...
+
+# (row step, column step, cost) to each of the 8 neighbouring cells
+_NEIGHBOURS = [(dr, dc, math.hypot(dr, dc)) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+
+class NavGrid:
+    """Walkable cells over a rectangle of the world, with crossings gated by signals"""
+
+    def __init__(self, bounds: Tuple[int, int, int, int], cell_size: int):
+        self.left, self.top, width, height = bounds
+        self.cell_size = cell_size
+        self.rows = -(-height // cell_size)
+        self.cols = -(-width // cell_size)
+        self.walkable = np.zeros((self.rows, self.cols), dtype=bool)
+        self.crossing = np.full((self.rows, self.cols), -1, dtype=np.int16)  # Signal index, or -1
+
+    def cells_in(self, rect: Tuple[int, int, int, int]) -> Tuple[slice, slice]:
+        """Row and column slices of the cells whose centres lie inside a world rect"""
+        x, y, width, height = rect
+        size = self.cell_size
+        # Cell i is centred on left + (i + 0.5) * size
+        first_col = max(0, math.ceil((x - self.left) / size - 0.5))
+        last_col = min(self.cols, math.ceil((x + width - self.left) / size - 0.5))
+        first_row = max(0, math.ceil((y - self.top) / size - 0.5))
+        last_row = min(self.rows, math.ceil((y + height - self.top) / size - 0.5))
+        return slice(first_row, max(first_row, last_row)), slice(first_col, max(first_col, last_col))
+
+    def set_walkable(self, rect: Tuple[int, int, int, int], walkable: bool = True):
+        self.walkable[self.cells_in(rect)] = walkable
+
+    def add_crossing(self, rect: Tuple[int, int, int, int], signal: int):
+        """Make a rect walkable, but only while the signal lets people cross"""
+        cells = self.cells_in(rect)
+        self.walkable[cells] = True
+        self.crossing[cells] = signal
+
+    def mask(self, rects: Sequence[Tuple[int, int, int, int]]) -> np.ndarray:
+        """Walkable cells inside any of the rects"""
+        mask = np.zeros_like(self.walkable)
+        for rect in rects:
+            mask[self.cells_in(rect)] = True
+        return mask & self.walkable
+
+    def cell_of(self, xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Row and column of each point, clamped to the grid"""
+        # Truncating a multiply is much cheaper than floor division; the clamp covers
+        # the only points where the two differ, left of or above the grid
+        scale = np.float32(1.0 / self.cell_size)
+        rows = ((ys - np.float32(self.top)) * scale).astype(np.int32)
+        cols = ((xs - np.float32(self.left)) * scale).astype(np.int32)
+        np.clip(rows, 0, self.rows - 1, out=rows)
+        np.clip(cols, 0, self.cols - 1, out=cols)
+        return rows, cols
+
+    def cell_centres(self, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """World x and y of the centre of every cell in a mask"""
+        rows, cols = np.nonzero(mask)
+        return (self.left + (cols + 0.5) * self.cell_size).astype(np.float32), \
+               (self.top + (rows + 0.5) * self.cell_size).astype(np.float32)
+
+
+def flow_field(grid: NavGrid, goals: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Path distance (in cells) to the nearest goal, and the unit step toward it, for every cell
+
+    Distances spread outward from the goals one cell per pass, all cells at
+    once, until nothing improves. Unreachable and blocked cells are inf and
+    goal cells step nowhere.
+    """
+    rows, cols = grid.rows, grid.cols
+    padded = np.full((rows + 2, cols + 2), np.inf, dtype=np.float32)  # The border is never walkable
+    distance = padded[1:-1, 1:-1]
+    distance[goals & grid.walkable] = 0
+    blocked = ~grid.walkable
+    shifted = [(padded[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc], np.float32(cost))
+               for dr, dc, cost in _NEIGHBOURS]
+    best = np.empty_like(distance)
+    candidate = np.empty_like(distance)
+    while True:
+        best[...] = distance
+        for neighbour, cost in shifted:
+            np.add(neighbour, cost, out=candidate)
+            np.minimum(best, candidate, out=best)
+        best[blocked] = np.inf
+        if np.array_equal(best, distance):
+            break
+        distance[...] = best
+
+    # Step toward whichever neighbour is closest to the goal
+    through = np.stack([neighbour + cost for neighbour, cost in shifted])
+    choice = np.argmin(through, axis=0)
+    steps = np.array([(dc / cost, dr / cost) for dr, dc, cost in _NEIGHBOURS], dtype=np.float32)
+    step_x, step_y = steps[choice, 0], steps[choice, 1]
+    still = (distance == 0) | ~np.isfinite(distance)
+    step_x[still] = 0
+    step_y[still] = 0
+    return distance.copy(), step_x, step_y
+
+
+@dataclass
+class Destination:
+    name: str
+    goals: np.ndarray  # Cells that count as arrived
+    dwell: Tuple[int, int]  # Min/max ticks spent there
+    weight: float = 1.0  # How often agents pick it as their next stop
+    hidden: bool = False  # Agents go inside and are not drawn while dwelling
+
+
+class Crowd:
+    """Array-backed pedestrians walking between destinations along shared flow fields"""
+
+    def __init__(self, grid: NavGrid, destinations: List[Destination], rng: np.random.Generator,
+                 capacity: int = 1024, cell_capacity: float = 8.0):
+        self.grid = grid
+        self.destinations = destinations
+        self.rng = rng
+        self.cell_capacity = cell_capacity  # Agents per cell before walking slows to half speed
+        fields = [flow_field(grid, destination.goals) for destination in destinations]
+        self.distance = np.stack([field[0] for field in fields])
+        self.step_x = np.stack([field[1] for field in fields])
+        self.step_y = np.stack([field[2] for field in fields])
+        self.dwell_min = np.array([d.dwell[0] for d in destinations], dtype=np.int32)
+        self.dwell_max = np.array([d.dwell[1] for d in destinations], dtype=np.int32)
+        self.hidden_at = np.array([d.hidden for d in destinations], dtype=bool)
+        weights = np.array([d.weight for d in destinations], dtype=np.float64)
+        self.weights = weights / weights.sum()
+        self.crowding = np.zeros((grid.rows, grid.cols), dtype=np.float32)  # Last tick's density
+
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.speed = np.zeros(capacity, dtype=np.float32)  # Pixels per tick when uncrowded
+        self.destination = np.zeros(capacity, dtype=np.int16)
+        self.state = np.zeros(capacity, dtype=np.uint8)
+        self.timer = np.zeros(capacity, dtype=np.int32)  # Ticks left dwelling
+        self.color_index = np.zeros(capacity, dtype=np.uint8)
+
+    def _fields(self) -> List[str]:
+        return ["x", "y", "speed", "destination", "state", "timer", "color_index"]
+
+    def _reserve(self, capacity: int):
+        if capacity <= len(self.x):
+            return
+        new_capacity = max(capacity, len(self.x) * 2)
+        for name in self._fields():
+            old = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=old.dtype)
+            grown[:self.count] = old[:self.count]
+            setattr(self, name, grown)
+
+    def spawn(self, x, y, speed, destination, color_index, state=WALKING, timer=0):
+        """Append one or many agents; array arguments spawn a whole batch at once"""
+        values = np.broadcast_arrays(*(np.atleast_1d(v) for v in
+                                       (x, y, speed, destination, color_index, state, timer)))
+        n = len(values[0])
+        self._reserve(self.count + n)
+        batch = slice(self.count, self.count + n)
+        for name, value in zip(("x", "y", "speed", "destination", "color_index", "state", "timer"), values):
+            getattr(self, name)[batch] = value
+        self.count += n
+
+    def populate(self, n: int, origin: int, speed: Tuple[float, float], colors: int):
+        """Start n agents dwelling at a destination (e.g. inside buildings), leaving over its dwell time"""
+        rng = self.rng
+        xs, ys = self.grid.cell_centres(self.destinations[origin].goals)
+        picks = rng.integers(0, len(xs), n)
+        self.spawn(xs[picks], ys[picks], rng.uniform(*speed, n), origin, rng.integers(0, colors, n),
+                   DWELLING, rng.integers(1, self.dwell_max[origin] + 1, n))
+
+    def visible(self) -> np.ndarray:
+        """Which agents are out in the open (not inside a hidden destination)"""
+        n = self.count
+        return ~((self.state[:n] == DWELLING) & self.hidden_at[self.destination[:n]])
+
+    def update(self, crossing_open: np.ndarray):
+        """Walk, arrive, dwell and pick the next destination, for every agent at once
+
+        crossing_open says, per signal, whether pedestrians may step onto its crossings.
+        """
+        n = self.count
+        if n == 0:
+            return
+        grid = self.grid
+        x, y, state, destination = self.x[:n], self.y[:n], self.state[:n], self.destination[:n]
+
+        # Dwelling agents count down, then head somewhere else
+        dwelling = np.flatnonzero(state == DWELLING)
+        self.timer[dwelling] -= 1
+        leaving = dwelling[self.timer[dwelling] <= 0]
+        if len(leaving):
+            choice = self.rng.choice(len(self.destinations), len(leaving), p=self.weights)
+            same = choice == destination[leaving]
+            choice[same] = (choice[same] + 1) % len(self.destinations)
+            destination[leaving] = choice
+            state[leaving] = WALKING
+
+        walking = np.flatnonzero(state == WALKING)
+        if len(walking) == 0:
+            self._measure_density()
+            return
+        wx, wy, goal = x[walking], y[walking], destination[walking].astype(np.int64)
+        rows, cols = grid.cell_of(wx, wy)
+        speed = self.speed[walking] / (1.0 + self.crowding[rows, cols] / self.cell_capacity)
+        nx = wx + self.step_x[goal, rows, cols] * speed
+        ny = wy + self.step_y[goal, rows, cols] * speed
+
+        # Never step onto blocked ground: try each axis alone, else stay put
+        next_rows, next_cols = grid.cell_of(nx, ny)
+        stuck = ~grid.walkable[next_rows, next_cols]
+        if stuck.any():
+            only_x = stuck & grid.walkable[rows, next_cols]
+            ny[only_x] = wy[only_x]
+            only_y = stuck & ~only_x & grid.walkable[next_rows, cols]
+            nx[only_y] = wx[only_y]
+            neither = stuck & ~only_x & ~only_y
+            nx[neither], ny[neither] = wx[neither], wy[neither]
+            next_rows, next_cols = grid.cell_of(nx, ny)
+
+        # Wait at the kerb until the crossing opens; anyone already on it keeps going
+        signal = grid.crossing[next_rows, next_cols]
+        waiting = (signal >= 0) & (grid.crossing[rows, cols] < 0)
+        if waiting.any():
+            waiting[waiting] = ~crossing_open[signal[waiting]]
+            nx[waiting], ny[waiting] = wx[waiting], wy[waiting]
+            next_rows[waiting], next_cols[waiting] = rows[waiting], cols[waiting]
+        x[walking], y[walking] = nx, ny
+
+        arrived = self.distance[goal, next_rows, next_cols] == 0
+        if arrived.any():
+            arrivals = walking[arrived]
+            goals = destination[arrivals]
+            state[arrivals] = DWELLING
+            self.timer[arrivals] = self.rng.integers(self.dwell_min[goals], self.dwell_max[goals] + 1)
+        self._measure_density()
+
+    def _measure_density(self):
+        self.crowding = self.density().astype(np.float32)
+
+    def density(self) -> np.ndarray:
+        """Visible agents per grid cell"""
+        grid = self.grid
+        visible = self.visible()
+        rows, cols = grid.cell_of(self.x[:self.count][visible], self.y[:self.count][visible])
+        counts = np.bincount(rows * grid.cols + cols, minlength=grid.rows * grid.cols)
+        return counts.reshape(grid.rows, grid.cols)
+
+    def pack(self) -> Dict[str, np.ndarray]:
+        """Copies of every live agent's fields, for snapshots"""
+        return {name: getattr(self, name)[:self.count].copy() for name in self._fields()}
+
+    def unpack(self, arrays: Dict[str, Any]):
+        """Replace all agents with ones from pack()"""
+        self.count = 0
+        if len(arrays["x"]):
+            self.spawn(*(arrays[name] for name in ("x", "y", "speed", "destination", "color_index",
+                                                   "state", "timer")))
+        self._measure_density()
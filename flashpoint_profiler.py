@@ -0,0 +1,206 @@
+"""
+Flashpoint Cities - Frame Profiler
+Times nested update and draw stages, keeping a rolling window of samples per
+stage (for percentiles and histograms) plus cumulative totals that export as
+folded stacks for flame graph tools. Per-frame counters such as draw calls
+and live entities are kept the same way. Each thread accumulates and closes
+its own frames, so a renderer drawing at its own rate neither races the
+simulation nor inflates its samples. When disabled, stages cost one
+attribute check.
+"""
+
+import threading
+import time
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class RollingSeries:
+    """The last `window` values of a per-frame measurement"""
+
+    def __init__(self, window: int):
+        self.values = np.zeros(window, dtype=np.float64)
+        self.index = 0
+        self.filled = 0
+
+    def add(self, value: float):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.filled = min(self.filled + 1, len(self.values))
+
+    def window(self) -> np.ndarray:
+        """Values oldest first"""
+        if self.filled < len(self.values):
+            return self.values[:self.filled]
+        return np.roll(self.values, -self.index)
+
+    def summary(self) -> Dict[str, float]:
+        values = self.window()
+        if len(values) == 0:
+            return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        p50, p95 = np.percentile(values, [50, 95])
+        return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "max": float(values.max())}
+
+
+class _Stage:
+    """Context manager timing one stage path; reused on every call"""
+
+    __slots__ = ("profiler", "path", "start")
+
+    def __init__(self, profiler: "FrameProfiler", path: str):
+        self.profiler = profiler
+        self.path = path
+        self.start = 0.0
+
+    def __enter__(self):
+        self.profiler.stack().append(self.path)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        profiler = self.profiler
+        profiler.stack().pop()
+        frame_times = profiler.frame()[0]
+        frame_times[self.path] = frame_times.get(self.path, 0.0) + elapsed
+        with profiler.lock:
+            profiler.totals[self.path] = profiler.totals.get(self.path, 0.0) + elapsed
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class FrameProfiler:
+    """Stage timings and counters per frame, over a rolling window"""
+
+    def __init__(self, window: int = 600, enabled: bool = False):
+        self.window = window
+        self.enabled = enabled
+        self.local = threading.local()  # Stages and frames are per thread, e.g. simulation and renderer
+        self.lock = threading.Lock()  # Guards the rolling series and totals, which every thread feeds
+        self.generation = 0  # Bumped by reset() to discard every thread's open frame
+        self.stages: Dict[Tuple[Optional[str], str], _Stage] = {}
+        self.times: Dict[str, RollingSeries] = {}
+        self.counters: Dict[str, RollingSeries] = {}
+        self.totals: Dict[str, float] = {}  # Seconds per stage path since reset()
+
+    def stack(self) -> List[str]:
+        """Paths of the stages currently running on this thread"""
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def frame(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Seconds per stage path and counters of this thread's open frame"""
+        local = self.local
+        if getattr(local, "generation", None) != self.generation:
+            local.frame_times, local.frame_counts, local.frames = {}, {}, 0
+            local.generation = self.generation
+        return local.frame_times, local.frame_counts
+
+    @property
+    def frames(self) -> int:
+        """Frames this thread has closed since reset()"""
+        self.frame()
+        return self.local.frames
+
+    def stage(self, name: str):
+        """Context manager timing a stage, nested under whichever stage is running on this thread"""
+        if not self.enabled:
+            return _NULL_STAGE
+        stack = self.stack()
+        parent = stack[-1] if stack else None
+        stage = self.stages.get((parent, name))
+        if stage is None:
+            stage = _Stage(self, name if parent is None else f"{parent};{name}")
+            self.stages[(parent, name)] = stage
+        return stage
+
+    def count(self, name: str, amount: float = 1):
+        """Add to a per-frame counter, e.g. draw calls"""
+        if self.enabled:
+            frame_counts = self.frame()[1]
+            frame_counts[name] = frame_counts.get(name, 0) + amount
+
+    def gauge(self, name: str, value: float):
+        """Set a per-frame counter, e.g. live entities"""
+        if self.enabled:
+            self.frame()[1][name] = value
+
+    def end_frame(self):
+        """Close this thread's frame, pushing its stage times and counters into the window"""
+        if not self.enabled:
+            return
+        frame_times, frame_counts = self.frame()
+        self.local.frame_times, self.local.frame_counts = {}, {}
+        self.local.frames += 1
+        with self.lock:
+            for path, elapsed in frame_times.items():
+                series = self.times.get(path)
+                if series is None:
+                    series = self.times[path] = RollingSeries(self.window)
+                series.add(elapsed)
+            for name, value in frame_counts.items():
+                series = self.counters.get(name)
+                if series is None:
+                    series = self.counters[name] = RollingSeries(self.window)
+                series.add(value)
+
+    def reset(self):
+        """Forget every sample and total"""
+        with self.lock:
+            self.generation += 1
+            self.times, self.counters, self.totals = {}, {}, {}
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Windowed statistics: stage times in milliseconds, keyed by path, and counters"""
+        with self.lock:
+            stages = {path: {key: value * 1000 for key, value in series.summary().items()}
+                      for path, series in self.times.items()}
+            counters = {name: series.summary() for name, series in self.counters.items()}
+        return {"stages": stages, "counters": counters}
+
+    def hot_stages(self, count: int = 5) -> List[Tuple[str, Dict[str, float]]]:
+        """Leaf stages with the highest mean time in the window"""
+        stages = self.summary()["stages"]
+        parents = {path.rsplit(";", 1)[0] for path in stages if ";" in path}
+        leaves = [(path, stats) for path, stats in stages.items() if path not in parents]
+        leaves.sort(key=lambda item: item[1]["mean"], reverse=True)
+        return leaves[:count]
+
+    def histogram(self, path: str, bins: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """Counts and millisecond bin edges of one stage's windowed times"""
+        with self.lock:
+            series = self.times.get(path)
+            values = series.window() * 1000 if series is not None else np.zeros(0)
+        return np.histogram(values, bins=bins)
+
+    def folded(self) -> Iterator[str]:
+        """Self time per stage path in folded-stack format (`a;b;c microseconds`)"""
+        with self.lock:
+            totals = dict(self.totals)
+        child_totals: Dict[str, float] = {}
+        for path, total in totals.items():
+            if ";" in path:
+                parent = path.rsplit(";", 1)[0]
+                child_totals[parent] = child_totals.get(parent, 0.0) + total
+        for path, total in sorted(totals.items()):
+            microseconds = round((total - child_totals.get(path, 0.0)) * 1e6)
+            if microseconds > 0:
+                yield f"{path} {microseconds}"
+
+    def export_folded(self, path: str):
+        """Write folded stacks for flamegraph.pl, speedscope or inferno"""
+        with open(path, "w") as f:
+            for line in self.folded():
+                f.write(line + "\n")
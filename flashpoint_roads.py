@@ -0,0 +1,230 @@
+"""
+Flashpoint Cities - Road Network
+Turns the flat list of road segments into a graph (intersections as nodes,
+segments as weighted edges) and routes vehicles across it with landmark A*,
+an optional all-pairs next-hop table and an LRU path cache.
+"""
+
+import heapq
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Point = Tuple[int, int]
+Route = Tuple[int, ...]  # Node ids from origin to destination
+
+SNAP_DISTANCE = 60  # Join dead-end roads to a node this close (e.g. bridge ramps)
+LANDMARK_COUNT = 4
+ALL_PAIRS_LIMIT = 2000  # Above this many nodes, skip the n^2 next-hop table
+
+
+def _segment_intersection(a: Point, b: Point, c: Point, d: Point) -> Optional[Point]:
+    """Point where segments ab and cd meet, or None"""
+    rx, ry = b[0] - a[0], b[1] - a[1]
+    sx, sy = d[0] - c[0], d[1] - c[1]
+    denominator = rx * sy - ry * sx
+    if denominator == 0:
+        return None  # Parallel or collinear
+    qx, qy = c[0] - a[0], c[1] - a[1]
+    t = (qx * sy - qy * sx) / denominator
+    u = (qx * ry - qy * rx) / denominator
+    if 0 <= t <= 1 and 0 <= u <= 1:
+        return (round(a[0] + t * rx), round(a[1] + t * ry))
+    return None
+
+
+class RoadNetwork:
+    """Road graph with cached shortest-path routing"""
+
+    def __init__(self, roads: Sequence, cache_size: int = 4096):
+        self.nodes: List[Point] = []
+        self.node_ids: Dict[Point, int] = {}
+        self.adjacency: List[List[Tuple[int, float]]] = []
+        self.edge_ids: Dict[Tuple[int, int], int] = {}  # Directed edge -> lane id
+        self.edge_road: Dict[Tuple[int, int], int] = {}  # Directed edge -> index into roads
+
+        self.cache_size = cache_size
+        self.path_cache: "OrderedDict[Tuple[int, int], Route]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self.landmarks: List[int] = []
+        self.landmark_distances: List[List[float]] = []
+        self.next_hop: Optional[List[List[int]]] = None
+
+        self._build(roads)
+        self._select_landmarks()
+
+    def _node(self, point: Point) -> int:
+        """Id of the node at a point, creating it if needed"""
+        node = self.node_ids.get(point)
+        if node is None:
+            node = len(self.nodes)
+            self.node_ids[point] = node
+            self.nodes.append(point)
+            self.adjacency.append([])
+        return node
+
+    def _add_edge(self, u: int, v: int, road_index: int):
+        """Connect two nodes in both directions"""
+        if u == v or (u, v) in self.edge_ids:
+            return
+        length = math.dist(self.nodes[u], self.nodes[v])
+        for a, b in ((u, v), (v, u)):
+            self.adjacency[a].append((b, length))
+            self.edge_ids[(a, b)] = len(self.edge_ids)
+            self.edge_road[(a, b)] = road_index
+
+    def _build(self, roads: Sequence):
+        """Split every road at its intersections and connect the pieces"""
+        for i, road in enumerate(roads):
+            start, end = tuple(road.start), tuple(road.end)
+            points = {start, end}
+            for j, other in enumerate(roads):
+                if i != j:
+                    crossing = _segment_intersection(start, end, tuple(other.start), tuple(other.end))
+                    if crossing is not None:
+                        points.add(crossing)
+            # Order the cut points along the road and chain them into edges
+            ordered = sorted(points, key=lambda p: math.dist(start, p))
+            ids = [self._node(p) for p in ordered]
+            for u, v in zip(ids, ids[1:]):
+                self._add_edge(u, v, i)
+
+        # Join dead ends to the nearest node they are not already connected to
+        for node, neighbors in enumerate(self.adjacency):
+            if len(neighbors) != 1:
+                continue
+            connected = {node, neighbors[0][0]}
+            candidates = [(math.dist(self.nodes[node], p), other)
+                          for other, p in enumerate(self.nodes) if other not in connected]
+            if candidates:
+                distance, other = min(candidates)
+                if distance <= SNAP_DISTANCE:
+                    self._add_edge(node, other, self.edge_road[(node, neighbors[0][0])])
+
+    def _dijkstra(self, source: int) -> Tuple[List[float], List[int]]:
+        """Distances and predecessors from one node to every other"""
+        distances = [math.inf] * len(self.nodes)
+        parents = [-1] * len(self.nodes)
+        distances[source] = 0.0
+        queue = [(0.0, source)]
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+            for neighbor, length in self.adjacency[node]:
+                candidate = distance + length
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    parents[neighbor] = node
+                    heapq.heappush(queue, (candidate, neighbor))
+        return distances, parents
+
+    def _select_landmarks(self):
+        """Pick spread-out landmarks and precompute distances from each (ALT)"""
+        if not self.nodes:
+            return
+        current = 0
+        best = [math.inf] * len(self.nodes)
+        for _ in range(min(LANDMARK_COUNT, len(self.nodes))):
+            distances, _ = self._dijkstra(current)
+            self.landmarks.append(current)
+            self.landmark_distances.append(distances)
+            # Next landmark: the reachable node farthest from all chosen ones
+            best = [min(b, d) for b, d in zip(best, distances)]
+            reachable = [(d, n) for n, d in enumerate(best) if d != math.inf]
+            current = max(reachable)[1]
+
+    def _heuristic(self, node: int, target: int) -> float:
+        """Admissible lower bound on the distance between two nodes"""
+        estimate = math.dist(self.nodes[node], self.nodes[target])
+        for distances in self.landmark_distances:
+            a, b = distances[node], distances[target]
+            if a != math.inf and b != math.inf:
+                estimate = max(estimate, abs(a - b))
+        return estimate
+
+    def _astar(self, origin: int, destination: int) -> Route:
+        """Shortest route between two nodes, or () if unreachable"""
+        g = {origin: 0.0}
+        parents = {origin: -1}
+        queue = [(self._heuristic(origin, destination), origin)]
+        closed = set()
+        while queue:
+            _, node = heapq.heappop(queue)
+            if node == destination:
+                route = []
+                while node != -1:
+                    route.append(node)
+                    node = parents[node]
+                return tuple(reversed(route))
+            if node in closed:
+                continue
+            closed.add(node)
+            for neighbor, length in self.adjacency[node]:
+                candidate = g[node] + length
+                if candidate < g.get(neighbor, math.inf):
+                    g[neighbor] = candidate
+                    parents[neighbor] = node
+                    heapq.heappush(queue, (candidate + self._heuristic(neighbor, destination), neighbor))
+        return ()
+
+    def precompute_all_pairs(self) -> bool:
+        """Build a next-hop table so every route becomes a table walk; False if too large"""
+        if len(self.nodes) > ALL_PAIRS_LIMIT:
+            return False
+        # Undirected graph: the tree rooted at a destination points every node toward it
+        self.next_hop = [self._dijkstra(destination)[1] for destination in range(len(self.nodes))]
+        return True
+
+    def route(self, origin: int, destination: int) -> Route:
+        """Shortest route between two nodes, served from the LRU cache when possible"""
+        key = (origin, destination)
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            self.path_cache.move_to_end(key)
+            return cached
+        self.cache_misses += 1
+
+        if self.next_hop is not None:
+            parents = self.next_hop[destination]
+            if origin != destination and parents[origin] == -1:
+                result: Route = ()
+            else:
+                route = [origin]
+                while route[-1] != destination:
+                    route.append(parents[route[-1]])
+                result = tuple(route)
+        else:
+            result = self._astar(origin, destination)
+
+        self.path_cache[key] = result
+        if len(self.path_cache) > self.cache_size:
+            self.path_cache.popitem(last=False)
+        return result
+
+    def nearest_node(self, x: float, y: float) -> int:
+        """Node closest to a point"""
+        return min(range(len(self.nodes)), key=lambda n: math.dist(self.nodes[n], (x, y)))
+
+    def edge_ahead(self, x: float, y: float, direction: float) -> Tuple[int, int]:
+        """Directed edge a vehicle at (x, y) heading in direction is travelling along"""
+        hx, hy = math.cos(direction), math.sin(direction)
+        best = None
+        for (u, v) in self.edge_ids:
+            (ux, uy), (vx, vy) = self.nodes[u], self.nodes[v]
+            length = math.dist((ux, uy), (vx, vy))
+            dx, dy = (vx - ux) / length, (vy - uy) / length
+            if dx * hx + dy * hy < 0.99:
+                continue  # Wrong way along this edge
+            along = (x - ux) * dx + (y - uy) * dy
+            across = abs((x - ux) * dy - (y - uy) * dx)
+            if -1 <= along <= length + 1:
+                if best is None or across < best[0]:
+                    best = (across, (u, v))
+        if best is None:
+            node = self.nearest_node(x, y)
+            return node, node
+        return best[1]
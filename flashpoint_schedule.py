@@ -0,0 +1,77 @@
+"""
+Flashpoint Cities - Scheduler
+Named one-shot timers on the simulation clock, kept in a priority queue so
+a tick only touches the timers that are due instead of counting every
+timer down. Handlers may schedule follow-up timers, which is how repeating
+cycles such as traffic signal phases are built.
+"""
+
+import heapq
+from typing import Callable, Dict, List, Optional, Tuple
+
+TimerHandler = Callable[[int], None]  # Called with the tick the timer was due at
+
+
+class Scheduler:
+    """Timers keyed by name, each firing once when the clock reaches it
+
+    Rescheduling or cancelling a timer leaves its old queue entry behind;
+    entries whose sequence number no longer matches the live timer are
+    skipped when they surface, and the queue is compacted once they pile up.
+    """
+
+    def __init__(self, now: int = 0):
+        self.now = now
+        self.queue: List[Tuple[int, int, str]] = []  # (due tick, sequence, key)
+        self.timers: Dict[str, Tuple[int, int]] = {}  # Live timers: key -> (due tick, sequence)
+        self.handlers: Dict[str, TimerHandler] = {}
+        self.sequence = 0
+
+    def on(self, key: str, handler: TimerHandler):
+        """Set what runs when the timer called key fires"""
+        self.handlers[key] = handler
+
+    def at(self, key: str, tick: int):
+        """Fire key at an absolute tick, replacing any pending timer of that name"""
+        self.sequence += 1
+        self.timers[key] = (tick, self.sequence)
+        heapq.heappush(self.queue, (tick, self.sequence, key))
+        if len(self.queue) > 2 * len(self.timers) + 64:
+            self._compact()
+
+    def after(self, key: str, ticks: int):
+        """Fire key a number of ticks from now"""
+        self.at(key, self.now + ticks)
+
+    def cancel(self, key: str):
+        self.timers.pop(key, None)
+
+    def due(self, key: str) -> Optional[int]:
+        """Tick a pending timer fires at, or None"""
+        timer = self.timers.get(key)
+        return timer[0] if timer is not None else None
+
+    def advance(self, now: int) -> int:
+        """Move the clock to now, firing every timer due by then in order; returns how many fired"""
+        queue, timers = self.queue, self.timers
+        fired = 0
+        while queue and queue[0][0] <= now:
+            tick, sequence, key = heapq.heappop(queue)
+            if timers.get(key) != (tick, sequence):
+                continue  # Rescheduled or cancelled since
+            del timers[key]
+            self.now = tick  # Follow-up timers are relative to when this one was due
+            self.handlers[key](tick)
+            fired += 1
+        self.now = now
+        return fired
+
+    def clear(self, now: int = 0):
+        """Drop every timer and set the clock; handlers stay registered"""
+        self.now = now
+        self.queue = []
+        self.timers = {}
+
+    def _compact(self):
+        self.queue = [(tick, sequence, key) for key, (tick, sequence) in self.timers.items()]
+        heapq.heapify(self.queue)
@@ -0,0 +1,70 @@
+"""
+Flashpoint Cities - Traffic Signals
+Fixed-time signal controller for any number of intersections. Each signal
+follows a phase plan shifted by an offset into its cycle, so its state at
+any tick is a pure function of the clock: only the next change is queued
+on the scheduler, restores just re-derive it, and green waves are a matter
+of choosing offsets along a corridor.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+from flashpoint_schedule import Scheduler
+
+
+@dataclass(frozen=True)
+class PhasePlan:
+    """A green phase followed by a red phase, in ticks"""
+    green: int
+    red: int
+
+    @property
+    def cycle(self) -> int:
+        return self.green + self.red
+
+
+class SignalController:
+    """Green/red state of every signal, flipped by scheduler timers when a phase ends"""
+
+    def __init__(self, scheduler: Scheduler, prefix: str = "signal:"):
+        self.scheduler = scheduler
+        self.prefix = prefix  # Timer names are prefix + signal key
+        self.plans: Dict[str, PhasePlan] = {}
+        self.offsets: Dict[str, int] = {}  # Ticks into the cycle at tick 0
+        self.green: Dict[str, bool] = {}  # Current state; True = green
+
+    def add(self, key: str, plan: PhasePlan, offset: int = 0):
+        """Add a signal, or replace the plan of an existing one"""
+        self.plans[key] = plan
+        self.offsets[key] = offset % plan.cycle
+        self.scheduler.on(self.prefix + key, lambda tick, key=key: self._schedule(key, tick))
+        self._schedule(key, self.scheduler.now)
+
+    def phase_at(self, key: str, tick: int) -> Tuple[bool, int]:
+        """Whether a signal is green at tick, and the tick its phase ends"""
+        plan = self.plans[key]
+        position = (tick + self.offsets[key]) % plan.cycle
+        if position < plan.green:
+            return True, tick + plan.green - position
+        return False, tick + plan.cycle - position
+
+    def green_wave(self, keys: Sequence[str], distances: Sequence[float], speed: float):
+        """Offset signals along a corridor so traffic at speed (pixels per tick) meets green
+
+        distances are measured from the first signal in travel order; every
+        signal keeps its plan, and the first keeps its offset.
+        """
+        base = self.offsets[keys[0]]
+        for key, distance in zip(keys, distances):
+            self.offsets[key] = (base - round(distance / speed)) % self.plans[key].cycle
+            self._schedule(key, self.scheduler.now)
+
+    def sync(self, tick: int):
+        """Re-derive every signal's state and next change from the clock, e.g. after a restore"""
+        for key in self.plans:
+            self._schedule(key, tick)
+
+    def _schedule(self, key: str, tick: int):
+        self.green[key], change = self.phase_at(key, tick)
+        self.scheduler.at(self.prefix + key, change)
@@ -0,0 +1,88 @@
+"""
+Flashpoint Cities - Snapshot Format
+Compact, versioned binary container for simulation state: a small JSON
+header for scalars plus named NumPy arrays (vehicles, window bitmaps, ...),
+zlib-compressed and checksummed.
+
+Layout:
+    magic "FPCS" | version u16 | flags u16 | payload length u32 | crc32 u32 | zlib(payload)
+    payload = meta length u32 | meta JSON | array count u16 | arrays...
+    array   = name length u8 | name | dtype length u8 | dtype | ndim u8 | shape u32 * ndim | data
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"FPCS"
+SNAPSHOT_VERSION = 4
+SNAPSHOT_MIN_VERSION = 4  # Version 4 requires pedestrians, rolling telemetry, the demand scale and the particle free stack
+_HEADER = struct.Struct("<4sHHII")
+
+
+class SnapshotError(ValueError):
+    """Raised when snapshot data is corrupt or from an unsupported version"""
+
+
+def pack_snapshot(meta: Dict[str, Any], arrays: Dict[str, np.ndarray],
+                  version: int = SNAPSHOT_VERSION) -> bytes:
+    """Serialize scalars and arrays into a snapshot blob"""
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    parts = [struct.pack("<I", len(meta_bytes)), meta_bytes, struct.pack("<H", len(arrays))]
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+        name_bytes = name.encode("utf-8")
+        dtype_bytes = array.dtype.str.encode("ascii")
+        parts.append(struct.pack("<B", len(name_bytes)) + name_bytes)
+        parts.append(struct.pack("<B", len(dtype_bytes)) + dtype_bytes)
+        parts.append(struct.pack("<B", array.ndim) + struct.pack(f"<{array.ndim}I", *array.shape))
+        parts.append(array.tobytes())
+    payload = b"".join(parts)
+    compressed = zlib.compress(payload, 6)
+    header = _HEADER.pack(SNAPSHOT_MAGIC, version, 0, len(payload), zlib.crc32(payload))
+    return header + compressed
+
+
+def unpack_snapshot(data: bytes) -> Tuple[int, Dict[str, Any], Dict[str, np.ndarray]]:
+    """Parse a snapshot blob into (version, meta, arrays)"""
+    if len(data) < _HEADER.size:
+        raise SnapshotError("snapshot is truncated")
+    magic, version, _flags, length, checksum = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("not a Flashpoint Cities snapshot")
+    if version > SNAPSHOT_VERSION:
+        raise SnapshotError(f"snapshot version {version} is newer than supported ({SNAPSHOT_VERSION})")
+    if version < SNAPSHOT_MIN_VERSION:
+        raise SnapshotError(f"snapshot version {version} is no longer supported")
+    try:
+        payload = zlib.decompress(data[_HEADER.size:])
+    except zlib.error as e:
+        raise SnapshotError(f"snapshot payload is corrupt: {e}") from e
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise SnapshotError("snapshot checksum mismatch")
+
+    view = memoryview(payload)
+    offset = 0
+
+    def take(size: int) -> memoryview:
+        nonlocal offset
+        chunk = view[offset:offset + size]
+        offset += size
+        return chunk
+
+    (meta_length,) = struct.unpack("<I", take(4))
+    meta = json.loads(bytes(take(meta_length)).decode("utf-8"))
+    (count,) = struct.unpack("<H", take(2))
+    arrays: Dict[str, np.ndarray] = {}
+    for _ in range(count):
+        name = bytes(take(take(1)[0])).decode("utf-8")
+        dtype = np.dtype(bytes(take(take(1)[0])).decode("ascii"))
+        ndim = take(1)[0]
+        shape = struct.unpack(f"<{ndim}I", take(4 * ndim))
+        size = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        arrays[name] = np.frombuffer(take(size), dtype=dtype).reshape(shape).copy()
+    return version, meta, arrays
@@ -0,0 +1,93 @@
+"""
+Flashpoint Cities - Spatial Index
+Uniform grid over vehicle positions for rectangle queries (red-light
+queueing) and radius queries, plus the sorted lane scan that finds each
+vehicle's leader.
+"""
+
+import numpy as np
+from typing import Tuple
+
+
+def leader_distances(lanes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Distance from each vehicle to the next one ahead in the same lane (inf if none)
+
+    positions is the distance travelled along each vehicle's heading, so
+    "ahead" means a larger position on the same lane.
+    """
+    n = len(positions)
+    distances = np.full(n, np.inf, dtype=np.float32)
+    if n < 2:
+        return distances
+    order = np.lexsort((positions, lanes))
+    sorted_positions = positions[order]
+    sorted_lanes = lanes[order]
+    same_lane = sorted_lanes[1:] == sorted_lanes[:-1]
+    gaps = np.where(same_lane, sorted_positions[1:] - sorted_positions[:-1], np.inf)
+    distances[order[:-1]] = gaps
+    return distances
+
+
+class SpatialGrid:
+    """Bucketed grid of vehicle positions, rebuilt in linear time every tick
+
+    Every vehicle moves every tick, so rather than moving the ones that
+    changed cell the whole grid is re-bucketed with one counting pass and a
+    stable sort on small integer cell keys.
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float], cell_size: float = 64.0):
+        self.left, self.top, width, height = bounds
+        self.cell_size = cell_size
+        self.columns = max(1, int(np.ceil(width / cell_size)))
+        self.rows = max(1, int(np.ceil(height / cell_size)))
+        cell_count = self.columns * self.rows
+        self.key_dtype = np.uint16 if cell_count < 2 ** 16 else np.uint32  # uint16 keys radix sort
+
+        self.x = np.zeros(0, dtype=np.float32)
+        self.y = np.zeros(0, dtype=np.float32)
+        self.order = np.zeros(0, dtype=np.intp)
+        self.cell_starts = np.zeros(cell_count + 1, dtype=np.intp)
+
+    def _cell_coords(self, x, y):
+        """Column and row of each point, clamped to the grid"""
+        column = np.clip(((x - self.left) // self.cell_size).astype(np.int64), 0, self.columns - 1)
+        row = np.clip(((y - self.top) // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return column, row
+
+    def rebuild(self, x: np.ndarray, y: np.ndarray):
+        """Re-bucket every vehicle from its current position"""
+        self.x = x
+        self.y = y
+        column, row = self._cell_coords(x, y)
+        keys = (row * self.columns + column).astype(self.key_dtype)
+        self.order = np.argsort(keys, kind="stable")
+        counts = np.bincount(keys, minlength=self.columns * self.rows)
+        self.cell_starts[0] = 0
+        np.cumsum(counts, out=self.cell_starts[1:])
+
+    def _candidates(self, left: float, top: float, right: float, bottom: float) -> np.ndarray:
+        """Indices of vehicles in every cell overlapping the rectangle"""
+        (c0, c1), (r0, r1) = self._cell_coords(np.array([left, right]), np.array([top, bottom]))
+        chunks = []
+        for row in range(int(r0), int(r1) + 1):
+            first = row * self.columns + int(c0)
+            last = row * self.columns + int(c1)
+            # Cells in one row are contiguous in the sorted order
+            chunks.append(self.order[self.cell_starts[first]:self.cell_starts[last + 1]])
+        return np.concatenate(chunks) if chunks else self.order[:0]
+
+    def query_rect(self, left: float, top: float, right: float, bottom: float) -> np.ndarray:
+        """Indices of vehicles whose position lies inside the rectangle"""
+        candidates = self._candidates(left, top, right, bottom)
+        x = self.x[candidates]
+        y = self.y[candidates]
+        inside = (x >= left) & (x <= right) & (y >= top) & (y <= bottom)
+        return candidates[inside]
+
+    def query_radius(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Indices of vehicles within radius of a point"""
+        candidates = self._candidates(x - radius, y - radius, x + radius, y + radius)
+        dx = self.x[candidates] - x
+        dy = self.y[candidates] - y
+        return candidates[dx * dx + dy * dy <= radius * radius]
@@ -0,0 +1,145 @@
+"""
+Flashpoint Cities - Sprite Atlas
+Vehicles and park props pre-rendered once into small surfaces: a car per
+palette colour and heading step, and one tree, bench and fountain. Drawing
+a crowd of them is then a single Surface.blits() call per layer instead of
+a draw call per rectangle and circle.
+"""
+
+import math
+import numpy as np
+import pygame
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Color = Tuple[int, int, int]
+Blit = Tuple[pygame.Surface, Tuple[float, float]]
+
+
+class Sprite:
+    """A pre-rendered surface and the pixel in it that sits on the entity's position"""
+
+    __slots__ = ("surface", "anchor")
+
+    def __init__(self, surface: pygame.Surface, anchor: Tuple[int, int]):
+        self.surface = surface
+        self.anchor = anchor
+
+    def at(self, x: float, y: float) -> Blit:
+        """Blit sequence entry placing the anchor on (x, y)"""
+        return self.surface, (x - self.anchor[0], y - self.anchor[1])
+
+
+def _canvas(width: int, height: int) -> pygame.Surface:
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    surface.fill((0, 0, 0, 0))
+    return surface
+
+
+def tree_sprite(trunk: Color, leaves: Color) -> Sprite:
+    """Trunk with a round canopy; the anchor is the top of the trunk"""
+    surface = _canvas(26, 34)
+    x, y = 13, 18
+    pygame.draw.rect(surface, trunk, (x - 3, y, 6, 15))
+    pygame.draw.circle(surface, leaves, (x, y - 5), 12)
+    return Sprite(surface, (x, y))
+
+
+def bench_sprite(color: Color) -> Sprite:
+    """Seat and two legs; the anchor is the middle of the seat's left end"""
+    surface = _canvas(20, 11)
+    pygame.draw.rect(surface, color, (0, 8, 20, 3))
+    pygame.draw.rect(surface, color, (0, 0, 3, 8))
+    pygame.draw.rect(surface, color, (17, 0, 3, 8))
+    return Sprite(surface, (10, 8))
+
+
+def fountain_sprite(rim: Color, water: Color) -> Sprite:
+    """Round basin; the anchor is its centre"""
+    surface = _canvas(32, 32)
+    pygame.draw.circle(surface, rim, (16, 16), 15)
+    pygame.draw.circle(surface, water, (16, 16), 10)
+    return Sprite(surface, (16, 16))
+
+
+class VehicleSprites:
+    """Car bodies for every palette colour, pre-rotated to a fixed number of headings
+
+    Each heading is rendered once, facing right, and rotated about the body's
+    centre, so batch() places sprites by the vehicle's centre. A nose dot
+    marks the front when nose_radius is given.
+    """
+
+    def __init__(self, palette: Sequence[Color], size: Tuple[float, float], angle_steps: int = 32,
+                 zoom: float = 1.0, nose_color: Color = (255, 255, 255), nose_radius: int = 0):
+        self.angle_steps = angle_steps
+        length, width = max(1, round(size[0] * zoom)), max(1, round(size[1] * zoom))
+        margin = nose_radius  # Room for the nose dot, centred on the front edge
+        canvas_size = (length + 2 * margin, max(width, 2 * margin))
+        centre = (canvas_size[0] // 2, canvas_size[1] // 2)
+        self.surfaces: List[List[pygame.Surface]] = []
+        half_sizes = np.zeros((len(palette), angle_steps, 2))
+        for color_index, color in enumerate(palette):
+            body = _canvas(*canvas_size)
+            pygame.draw.rect(body, color, (centre[0] - length // 2, centre[1] - width // 2, length, width))
+            if nose_radius:
+                pygame.draw.circle(body, nose_color, (centre[0] - length // 2 + length, centre[1]), nose_radius)
+            rotations = []
+            for step in range(angle_steps):
+                # Screen y points down, so a positive direction turns clockwise
+                rotated = pygame.transform.rotate(body, -360.0 * step / angle_steps)
+                rotations.append(rotated)
+                half_sizes[color_index, step] = rotated.get_width() / 2, rotated.get_height() / 2
+            self.surfaces.append(rotations)
+        self.half_sizes = half_sizes
+
+    def steps(self, directions: np.ndarray) -> np.ndarray:
+        """Nearest pre-rotated heading for each direction, in radians"""
+        return np.rint(directions * (self.angle_steps / (2 * math.pi))).astype(np.int64) % self.angle_steps
+
+    def batch(self, xs: np.ndarray, ys: np.ndarray, directions: np.ndarray, color_indices: np.ndarray,
+              out: Optional[List[Blit]] = None) -> List[Blit]:
+        """Blit sequence drawing each vehicle centred on (x, y), appended to out if given"""
+        steps = self.steps(directions)
+        color_indices = np.asarray(color_indices, dtype=np.int64)
+        half = self.half_sizes[color_indices, steps]
+        lefts = (xs - half[:, 0]).tolist()
+        tops = (ys - half[:, 1]).tolist()
+        surfaces = self.surfaces
+        batch = out if out is not None else []
+        batch.extend((surfaces[color][step], (left, top))
+                     for color, step, left, top in zip(color_indices.tolist(), steps.tolist(), lefts, tops))
+        return batch
+
+
+class PropSprites:
+    """Park trees, benches and fountains"""
+
+    def __init__(self, trunk: Color, leaves: Color, bench: Color,
+                 fountain_rim: Color = (200, 200, 200), fountain_water: Color = (100, 150, 255)):
+        self.tree = tree_sprite(trunk, leaves)
+        self.bench = bench_sprite(bench)
+        self.fountain = fountain_sprite(fountain_rim, fountain_water)
+
+    def batch(self, trees: Sequence[Tuple[float, float]], benches: Sequence[Tuple[float, float]],
+              fountains: Sequence[Tuple[float, float]], offset: Tuple[int, int] = (0, 0),
+              out: Optional[List[Blit]] = None) -> List[Blit]:
+        """Blit sequence drawing every prop, shifted by -offset, in tree, bench, fountain order"""
+        ox, oy = offset
+        batch = out if out is not None else []
+        for sprite, positions in ((self.tree, trees), (self.bench, benches), (self.fountain, fountains)):
+            batch.extend(sprite.at(x - ox, y - oy) for x, y in positions)
+        return batch
+
+
+_vehicle_sprite_cache: Dict[Tuple, VehicleSprites] = {}
+
+
+def vehicle_sprites(palette: Sequence[Color], size: Tuple[float, float], angle_steps: int = 32,
+                    zoom: float = 1.0, nose_radius: int = 0) -> VehicleSprites:
+    """Shared VehicleSprites for one palette, size and zoom, built on first use"""
+    key = (tuple(palette), tuple(size), angle_steps, zoom, nose_radius)
+    sprites = _vehicle_sprite_cache.get(key)
+    if sprites is None:
+        sprites = _vehicle_sprite_cache[key] = VehicleSprites(palette, size, angle_steps, zoom,
+                                                              nose_radius=nose_radius)
+    return sprites
@@ -0,0 +1,217 @@
+"""
+Flashpoint Cities - Traffic Telemetry
+Finished trips and per-section traffic statistics recorded into
+preallocated ring buffers, so recording costs a few array copies per tick
+however many vehicles there are. Rolling aggregates cover the last window
+of samples, and an exporter thread appends drained records to CSV files or
+columnar .npz chunks, keeping file I/O off the simulation thread.
+"""
+
+import csv
+import os
+import queue
+import threading
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+Columns = Dict[str, np.ndarray]
+
+TRIP_COLUMNS = [("start_tick", np.int64), ("end_tick", np.int64), ("origin", np.int16),
+                ("destination", np.int16), ("lane", np.int16), ("start_x", np.float32),
+                ("end_x", np.float32), ("crossed_bridge", np.bool_), ("arrived", np.bool_)]
+SECTION_COLUMNS = [("tick", np.int64), ("section", np.int16), ("vehicles", np.int32), ("flow", np.float32),
+                   ("speed", np.float32), ("occupancy", np.float32), ("queue", np.int32)]
+EXPORT_FORMATS = ("csv", "npz")
+
+
+class RingBuffer:
+    """Fixed-capacity columns; once full, each append overwrites the oldest rows"""
+
+    def __init__(self, columns: Sequence[Tuple[str, type]], capacity: int):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in columns}
+        self.written = 0  # Rows ever appended
+        self.drained = 0  # Rows ever handed out by drain() or lost before it
+        self.dropped = 0  # Rows overwritten before they were drained
+
+    def append(self, rows: Columns):
+        """Append equal-length columns, one for every column of the buffer"""
+        n = len(next(iter(rows.values())))
+        if n == 0:
+            return
+        skip = max(0, n - self.capacity)  # Only the newest capacity rows can be kept
+        start = (self.written + skip) % self.capacity
+        first = min(n - skip, self.capacity - start)
+        for name, column in self.columns.items():
+            values = rows[name]
+            column[start:start + first] = values[skip:skip + first]
+            column[:n - skip - first] = values[skip + first:]
+        self.written += n
+        overwritten = self.written - self.capacity - self.drained
+        if overwritten > 0:
+            self.dropped += overwritten
+            self.drained += overwritten
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def _rows(self, first: int) -> Columns:
+        """Copies of every row from absolute row number first to the newest, oldest first"""
+        start = first % self.capacity
+        end = start + self.written - first
+        if end <= self.capacity:
+            return {name: column[start:end].copy() for name, column in self.columns.items()}
+        return {name: np.concatenate((column[start:], column[:end - self.capacity]))
+                for name, column in self.columns.items()}
+
+    def latest(self, n: int) -> Columns:
+        """The newest n rows still held, oldest first"""
+        return self._rows(self.written - min(n, len(self)))
+
+    def drain(self) -> Columns:
+        """Rows appended since the last drain, oldest first"""
+        rows = self._rows(self.drained)
+        self.drained = self.written
+        return rows
+
+
+class SectionStats:
+    """Flow, space-mean speed, occupancy and queue length per lane over stretches of road
+
+    Sections are every (lane, stretch) pair, numbered lane by lane. Flow
+    follows Edie's definition, distance driven inside a section per tick
+    over its length, so a single sample measures it without following
+    vehicles from tick to tick. Rolling aggregates cover the last window
+    samples.
+    """
+
+    def __init__(self, lanes: Dict[int, str], edges: Sequence[float], stretches: Sequence[str],
+                 vehicle_length: float, queue_speed: float = 0.2, window: int = 60, capacity: int = 65536):
+        self.names = [f"{stretch}_{lane}" for lane in lanes.values() for stretch in stretches]
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.stretch_count = len(stretches)
+        self.lengths = np.tile(np.diff(self.edges), len(lanes))
+        # Lane number of road index i at i + 1, with -1 for road indices outside the table at both ends
+        self.lane_slots = np.full(max(lanes) + 3, -1, dtype=np.intp)
+        self.lane_slots[np.array(list(lanes)) + 1] = np.arange(len(lanes))
+        self.vehicle_length = vehicle_length
+        self.queue_speed = queue_speed  # Pixels per tick below which a vehicle counts as queued
+        self.samples = RingBuffer(SECTION_COLUMNS, capacity)
+        self.window = window
+        self.recent = np.zeros((window, 3, len(self.names)))  # Vehicles, distance driven, queued
+        self.sampled = 0
+
+    def sample(self, tick: int, x: np.ndarray, lane: np.ndarray, step: np.ndarray):
+        """Aggregate one tick from each vehicle's centre x, road index and distance moved"""
+        sections = len(self.names)
+        # With only a few edges, counting the ones passed beats a binary search per vehicle
+        stretch = np.full(len(x), -1, dtype=np.intp)
+        for edge in self.edges:
+            stretch += x >= edge
+        slot = self.lane_slots.take(lane + 1, mode="clip")
+        inside = (slot >= 0) & (stretch >= 0) & (stretch < self.stretch_count)
+        ids = np.where(inside, slot * self.stretch_count + stretch, sections)  # Everything else in a spare bin
+        vehicles = np.bincount(ids, minlength=sections + 1)[:sections]
+        distance = np.bincount(ids, weights=step, minlength=sections + 1)[:sections]
+        queued = np.bincount(ids[step < self.queue_speed], minlength=sections + 1)[:sections]
+
+        self.samples.append({
+            "tick": np.full(sections, tick),
+            "section": np.arange(sections),
+            "vehicles": vehicles,
+            "flow": distance / self.lengths,
+            "speed": np.divide(distance, vehicles, out=np.zeros(sections), where=vehicles > 0),
+            "occupancy": np.minimum(vehicles * self.vehicle_length / self.lengths, 1.0),
+            "queue": queued,
+        })
+        recent = self.recent[self.sampled % self.window]
+        recent[0], recent[1], recent[2] = vehicles, distance, queued
+        self.sampled += 1
+
+    def reset(self, recent: Optional[np.ndarray] = None, sampled: int = 0):
+        """Replace the rolling window, e.g. with a saved copy of recent and sampled"""
+        self.recent[...] = 0 if recent is None else recent
+        self.sampled = sampled
+
+    def rolling(self) -> Dict[str, np.ndarray]:
+        """Per-section averages over the window: vehicles, flow (vehicles per tick), speed, occupancy, queue"""
+        samples = max(1, min(self.sampled, self.window))
+        vehicles, distance, queued = self.recent[:samples].sum(axis=0)
+        return {
+            "vehicles": vehicles / samples,
+            "flow": distance / (samples * self.lengths),
+            "speed": np.divide(distance, vehicles, out=np.zeros_like(distance), where=vehicles > 0),
+            "occupancy": np.minimum(vehicles * self.vehicle_length / (samples * self.lengths), 1.0),
+            "queue": queued / samples,
+        }
+
+
+class TelemetryExporter:
+    """Appends drained records to per-table files in a directory from a background thread
+
+    csv appends rows to <table>.csv; npz writes each batch as a numbered
+    file of one array per column.
+    """
+
+    def __init__(self, directory: str, export_format: str = "csv"):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"unknown telemetry format: {export_format}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.format = export_format
+        self.chunks: Dict[str, int] = {}
+        self.queue: "queue.Queue[Optional[Tuple[str, Columns]]]" = queue.Queue()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def submit(self, table: str, rows: Columns):
+        """Queue rows for writing; returns at once"""
+        if len(next(iter(rows.values()))):
+            self.queue.put((table, rows))
+
+    def close(self):
+        """Write everything queued, then stop the thread"""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is None:
+                try:
+                    self._write(*item)
+                except BaseException as e:
+                    self.error = e
+
+    def _write(self, table: str, rows: Columns):
+        if self.format == "csv":
+            path = os.path.join(self.directory, f"{table}.csv")
+            new = not os.path.exists(path)
+            with open(path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new:
+                    writer.writerow(list(rows))
+                writer.writerows(zip(*(column.tolist() for column in rows.values())))
+        else:
+            if table not in self.chunks:
+                # Carry on after chunks left by an earlier run
+                self.chunks[table] = sum(1 for name in os.listdir(self.directory)
+                                         if name.startswith(f"{table}-") and name.endswith(".npz"))
+            np.savez(os.path.join(self.directory, f"{table}-{self.chunks[table]:05d}.npz"), **rows)
+            self.chunks[table] += 1
+
+
+def trip_summary(trips: Columns) -> Dict[str, float]:
+    """Count, bridge crossings and mean travel time (ticks) of a batch of trip records"""
+    count = len(trips["start_tick"])
+    travel = trips["end_tick"] - trips["start_tick"]
+    return {
+        "trips": count,
+        "bridge_crossings": int(np.count_nonzero(trips["crossed_bridge"])),
+        "mean_travel_ticks": float(travel.mean()) if count else 0.0,
+    }
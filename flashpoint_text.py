@@ -0,0 +1,57 @@
+"""
+Flashpoint Cities - Text Rendering
+Loads each font once and keeps an LRU cache of rendered text surfaces so
+unchanged UI strings are never re-rendered.
+"""
+
+import pygame
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+TextKey = Tuple[str, int, Tuple[int, int, int], bool]
+
+
+class TextRenderer:
+    """Font loader plus LRU cache of rendered strings"""
+
+    def __init__(self, font_path: Optional[str] = None, cache_size: int = 256):
+        self.font_path = font_path
+        self.cache_size = cache_size
+        self.fonts: Dict[int, pygame.font.Font] = {}
+        self.cache: "OrderedDict[TextKey, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size: int) -> pygame.font.Font:
+        """Font of the given size, loaded on first use"""
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(self.font_path, size)
+            self.fonts[size] = font
+        return font
+
+    def render(self, text: str, size: int, color: Tuple[int, int, int],
+               antialias: bool = True) -> pygame.Surface:
+        """Rendered surface for a string, re-rendered only when it is not cached"""
+        key = (text, size, color, antialias)
+        surface = self.cache.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return surface
+        self.misses += 1
+
+        surface = self.font(size).render(text, antialias, color)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        self.cache[key] = surface
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return surface
+
+    def blit(self, target: pygame.Surface, text: str, size: int, color: Tuple[int, int, int],
+             position: Tuple[int, int], antialias: bool = True) -> pygame.Rect:
+        """Draw a string onto the target; returns the rect it covered"""
+        return target.blit(self.render(text, size, color, antialias), position)
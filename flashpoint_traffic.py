@@ -0,0 +1,397 @@
+"""
+Flashpoint Cities - Traffic Stepping
+Car-following and red-light queueing for a vehicle store, plus a sharded
+engine that splits the road into x-ranges, each stepped by its own worker
+process. Vehicles crossing a boundary are handed to the neighbouring shard
+in one batch per tick, vehicles near a boundary are shown to the shard on
+the other side as leaders to follow (a halo, so sharded stepping matches
+single-process stepping), and each shard publishes its vehicles to a
+double-buffered shared-memory block that the renderer reads without
+waiting for the workers.
+"""
+
+import math
+import multiprocessing
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from flashpoint_spatial import SpatialGrid, leader_distances
+from flashpoint_vehicles import VehicleStore, VehicleView
+
+Batch = Dict[str, np.ndarray]  # Vehicles in the VehicleStore.pack() layout
+
+GHOST_FIELDS = ("x", "y", "heading_x", "heading_y", "road_index")  # What a shard needs of a neighbour's vehicle
+PUBLISHED_FIELDS = [("x", np.float32), ("y", np.float32), ("speed", np.float32),
+                    ("direction", np.float32), ("last_step", np.float32), ("road_index", np.int32),
+                    ("color_index", np.uint8)]
+
+
+def advance_traffic(vehicles: VehicleStore, spatial: SpatialGrid, red_lights: Sequence[Tuple[float, float]],
+                    road_top: float, road_height: float, min_gap: float, brake_distance: float,
+                    ghosts: Sequence[Batch] = ()):
+    """Move every vehicle without closing on the one ahead or running a red light
+
+    red_lights holds (x, width) of each light currently showing red.
+    ghosts are batches of vehicles stepped elsewhere (another shard's),
+    followed like any other leader but not moved.
+    """
+    n = vehicles.count
+    length, width = vehicles.size
+
+    # Follow the vehicle ahead in the same lane without closing the gap
+    positions = vehicles.lane_positions(length / 2, width / 2)
+    lanes = vehicles.road_index[:n]
+    ghosts = [ghost for ghost in ghosts if len(ghost["x"])]
+    if ghosts:
+        lanes = np.concatenate([lanes] + [ghost["road_index"] for ghost in ghosts])
+        leaders = np.concatenate([positions] + [(ghost["x"] + length / 2) * ghost["heading_x"]
+                                                + (ghost["y"] + width / 2) * ghost["heading_y"] for ghost in ghosts])
+        gaps = leader_distances(lanes, leaders)[:n] - length - min_gap
+    else:
+        gaps = leader_distances(lanes, positions) - length - min_gap
+    step = np.minimum(vehicles.speed[:n], gaps)
+
+    # Queue at red lights
+    spatial.rebuild(vehicles.x[:n] + length / 2, vehicles.y[:n] + width / 2)
+    for light_x, light_width in red_lights:
+        nearby = spatial.query_rect(light_x - brake_distance - length, road_top,
+                                    light_x + light_width + brake_distance + length, road_top + road_height)
+        if len(nearby) == 0:
+            continue
+        # Eastbound traffic stops at the left edge of the light, westbound at the right
+        heading = vehicles.heading_x[nearby]
+        stop_line = np.where(heading > 0, light_x, -(light_x + light_width))
+        distance = stop_line - (positions[nearby] + length / 2)
+        approaching = distance >= 0
+        nearby = nearby[approaching]
+        step[nearby] = np.minimum(step[nearby], distance[approaching])
+
+    vehicles.advance(np.maximum(step, 0))
+
+
+@dataclass
+class TrafficConfig:
+    """Settings shared by every shard"""
+    palette: List[Tuple[int, int, int]]
+    size: Tuple[int, int]
+    world: Tuple[float, float, float, float]  # Spatial grid bounds (x, y, width, height)
+    despawn: Tuple[float, float]  # Vehicles leaving this x-range are removed
+    road_top: float
+    road_height: float
+    min_gap: float
+    brake_distance: float
+
+
+@dataclass
+class TrafficRegion:
+    """The x-range one shard owns, with the lights its vehicles must obey"""
+    left: float
+    right: float
+    lights: Dict[str, Tuple[float, float]] = field(default_factory=dict)  # key -> (x, width)
+
+
+def split_regions(left: float, right: float, shards: int, lights: Dict[str, Tuple[float, float]],
+                  reach: float = 0.0) -> List[TrafficRegion]:
+    """Cut [left, right) into equal x-ranges; the outer shards extend to infinity
+
+    A light goes to every region within reach of it (brake distance plus
+    vehicle length), so cars braking for it see it whichever side of a cut
+    they are on.
+    """
+    cuts = [left + (right - left) * i / shards for i in range(1, shards)]
+    edges = [-math.inf] + cuts + [math.inf]
+    regions = []
+    for lo, hi in zip(edges, edges[1:]):
+        regions.append(TrafficRegion(
+            lo, hi,
+            {key: (x, width) for key, (x, width) in lights.items() if x - reach < hi and x + width + reach >= lo},
+        ))
+    return regions
+
+
+class TrafficShard:
+    """The vehicles of one region, stepped independently of the others"""
+
+    def __init__(self, config: TrafficConfig, region: TrafficRegion):
+        self.config = config
+        self.region = region
+        self.vehicles = VehicleStore(config.palette, size=config.size)
+        self.spatial = SpatialGrid(config.world)
+        # Further than any vehicle can close on its leader or brake for a light in one tick
+        self.reach = config.brake_distance + config.size[0] + config.min_gap
+
+    def halo(self) -> Tuple[Batch, Batch]:
+        """Vehicles within reach of the left and right boundaries, as ghosts for the neighbouring shards"""
+        x = self.vehicles.x[:self.vehicles.count]
+        near = []
+        for mask in (x < self.region.left + self.reach, x >= self.region.right - self.reach):
+            near.append({name: getattr(self.vehicles, name)[:self.vehicles.count][mask] for name in GHOST_FIELDS})
+        return near[0], near[1]
+
+    def step(self, red: Set[str], ghosts: Sequence[Batch] = ()) -> Tuple[Batch, Batch,
+                                                                          Optional[Tuple[Batch, np.ndarray]]]:
+        """Advance one tick; returns the vehicles that left over the (left, right) boundaries,
+        and those that finished their trip or drove off the road, if any, with a mask of which arrived"""
+        config = self.config
+        red_lights = [light for key, light in self.region.lights.items() if key in red]
+        advance_traffic(self.vehicles, self.spatial, red_lights, config.road_top, config.road_height,
+                        config.min_gap, config.brake_distance, ghosts)
+        arrived = self.vehicles.arrived()
+        done = arrived | self.vehicles.outside(config.despawn[0], -math.inf, config.despawn[1], math.inf)
+        finished = (self.vehicles.take(done), arrived[done]) if done.any() else None
+
+        x = self.vehicles.x[:self.vehicles.count]
+        left = self.vehicles.take(x < self.region.left)
+        x = self.vehicles.x[:self.vehicles.count]
+        right = self.vehicles.take(x >= self.region.right)
+        return left, right, finished
+
+
+class PublishedVehicles:
+    """Double-buffered vehicle positions in shared memory: one writer, any number of readers
+
+    The writer fills the back buffer and then flips the header to point at
+    it, so a reader always sees the last complete tick. Vehicles beyond the
+    capacity are left out, but counted.
+    """
+
+    HEADER = 7  # Front buffer index, then tick, published count and vehicle count for each buffer
+
+    def __init__(self, capacity: int, context=multiprocessing):
+        self.capacity = capacity
+        self.row_bytes = sum(np.dtype(dtype).itemsize for _, dtype in PUBLISHED_FIELDS)
+        self.header = context.RawArray("q", self.HEADER)
+        self.data = context.RawArray("b", 2 * capacity * self.row_bytes)
+        self._views()
+
+    def _views(self):
+        header = np.frombuffer(self.header, dtype=np.int64)
+        self.front = header[:1]
+        self.ticks = header[1:3]
+        self.counts = header[3:5]
+        self.totals = header[5:7]
+        data = np.frombuffer(self.data, dtype=np.uint8)
+        self.buffers: List[Dict[str, np.ndarray]] = []
+        offset = 0
+        for _ in range(2):
+            buffer = {}
+            for name, dtype in PUBLISHED_FIELDS:
+                size = self.capacity * np.dtype(dtype).itemsize
+                buffer[name] = data[offset:offset + size].view(dtype)
+                offset += size
+            self.buffers.append(buffer)
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "row_bytes": self.row_bytes,
+                "header": self.header, "data": self.data}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    def publish(self, vehicles: VehicleStore, tick: int):
+        """Copy the store into the back buffer and make it the front one"""
+        back = 1 - int(self.front[0])
+        count = min(vehicles.count, self.capacity)
+        for name, _ in PUBLISHED_FIELDS:
+            self.buffers[back][name][:count] = getattr(vehicles, name)[:count]
+        self.counts[back] = count
+        self.totals[back] = vehicles.count
+        self.ticks[back] = tick
+        self.front[0] = back
+
+    def read(self) -> Tuple[int, Dict[str, np.ndarray]]:
+        """Tick and fields of the front buffer (views, valid until the writer flips twice)"""
+        front = int(self.front[0])
+        count = int(self.counts[front])
+        return int(self.ticks[front]), {name: values[:count] for name, values in self.buffers[front].items()}
+
+    def unpublished(self) -> int:
+        """Vehicles the front buffer had no room for"""
+        front = int(self.front[0])
+        return int(self.totals[front] - self.counts[front])
+
+
+class _ShardHost:
+    """Executes coordinator commands against one shard and publishes its vehicles"""
+
+    def __init__(self, config: TrafficConfig, region: TrafficRegion, published: PublishedVehicles):
+        self.shard = TrafficShard(config, region)
+        self.published = published
+        self.tick = 0
+
+    def handle(self, command: str, payload: Any) -> Any:
+        shard = self.shard
+        if command == "step":
+            red, incoming, ghosts = payload
+            for batch in incoming:
+                shard.vehicles.extend(batch)
+            handoff = shard.step(red, ghosts)
+            self.tick += 1
+            self.published.publish(shard.vehicles, self.tick)
+            return handoff + (shard.halo(),)
+        if command == "pack":
+            return shard.vehicles.pack()
+        if command == "unpack":
+            shard.vehicles.unpack(payload)
+            self.published.publish(shard.vehicles, self.tick)
+            return shard.halo()
+        raise ValueError(f"unknown shard command: {command}")
+
+
+def _run_shard(connection, config: TrafficConfig, region: TrafficRegion, published: PublishedVehicles):
+    """Worker process: step one shard on command until told to stop"""
+    host = _ShardHost(config, region, published)
+    while True:
+        command, payload = connection.recv()
+        if command == "stop":
+            connection.close()
+            return
+        connection.send(host.handle(command, payload))
+
+
+class _InlineConnection:
+    """Stands in for a worker pipe, running the shard in the calling process"""
+
+    def __init__(self, host: _ShardHost):
+        self.host = host
+        self.reply: Any = None
+
+    def send(self, message: Tuple[str, Any]):
+        command, payload = message
+        if command != "stop":
+            self.reply = self.host.handle(command, payload)
+
+    def recv(self) -> Any:
+        return self.reply
+
+
+class ShardedTraffic:
+    """Traffic split across shards, each in its own process unless processes=False
+
+    Shards step in lockstep: step_async() starts a tick everywhere and
+    returns at once, so the caller can draw the previous tick from shared
+    memory while the workers compute; wait() collects the boundary
+    handoffs, which are delivered with the next tick.
+    """
+
+    def __init__(self, config: TrafficConfig, regions: Sequence[TrafficRegion],
+                 publish_capacity: int = 65536, processes: bool = True):
+        self.config = config
+        self.regions = list(regions)
+        self.palette = list(config.palette)
+        self.size = config.size
+        self.inboxes: List[List[Batch]] = [[] for _ in self.regions]
+        self.halos: List[Tuple[Batch, ...]] = [() for _ in self.regions]  # Each shard's (left, right) halo
+        self.finished: List[Tuple[Batch, np.ndarray]] = []  # Vehicles that left the road, until take_finished()
+        self.pending = False
+        self.processes = []
+        self.connections = []
+        self.published = [PublishedVehicles(publish_capacity) for _ in self.regions]
+        for region, published in zip(self.regions, self.published):
+            if processes:
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_run_shard, daemon=True,
+                                                  args=(child, config, region, published))
+                process.start()
+                child.close()
+                self.processes.append(process)
+                self.connections.append(parent)
+            else:
+                self.connections.append(_InlineConnection(_ShardHost(config, region, published)))
+
+    def step_async(self, red: Set[str]):
+        """Start one tick on every shard, delivering last tick's handoffs and its neighbours' halos"""
+        self.wait()
+        last = len(self.regions) - 1
+        for i, (connection, inbox) in enumerate(zip(self.connections, self.inboxes)):
+            # Vehicles about to join a neighbour count as well as the ones already there
+            ghosts = []
+            if i > 0:
+                ghosts += list(self.halos[i - 1][1:]) + self.inboxes[i - 1]
+            if i < last:
+                ghosts += list(self.halos[i + 1][:1]) + self.inboxes[i + 1]
+            connection.send(("step", (set(red), inbox, ghosts)))
+        self.inboxes = [[] for _ in self.regions]
+        self.pending = True
+
+    def wait(self):
+        """Finish the tick in progress, route vehicles that crossed a boundary and keep finished ones"""
+        if not self.pending:
+            return
+        for i, connection in enumerate(self.connections):
+            left, right, finished, self.halos[i] = connection.recv()
+            if finished is not None:
+                self.finished.append(finished)
+            if len(left["x"]) and i > 0:
+                self.inboxes[i - 1].append(left)
+            if len(right["x"]) and i + 1 < len(self.regions):
+                self.inboxes[i + 1].append(right)
+        self.pending = False
+
+    def extend(self, arrays: Batch):
+        """Add vehicles in the pack() layout, each joining the shard that owns its position next tick"""
+        for inbox, region in zip(self.inboxes, self.regions):
+            owned = (arrays["x"] >= region.left) & (arrays["x"] < region.right)
+            if owned.any():
+                inbox.append({name: values[owned] for name, values in arrays.items()})
+
+    def take_finished(self) -> List[Tuple[Batch, np.ndarray]]:
+        """Vehicles that finished their trip or left the road in the ticks collected so far,
+        each batch with a mask of the ones that arrived"""
+        finished, self.finished = self.finished, []
+        return finished
+
+    def step(self, red: Set[str]):
+        """Advance one tick and wait for it"""
+        self.step_async(red)
+        self.wait()
+
+    def views(self) -> List[Dict[str, np.ndarray]]:
+        """Last published fields of every shard"""
+        return [published.read()[1] for published in self.published]
+
+    def unpublished(self) -> int:
+        """Vehicles left out of the last published views because a shard's buffer was full"""
+        return sum(published.unpublished() for published in self.published)
+
+    def __len__(self) -> int:
+        return sum(len(view["x"]) for view in self.views())
+
+    def __iter__(self) -> Iterator[VehicleView]:
+        palette = self.palette
+        size = self.size
+        for view in self.views():
+            for x, y, speed, direction, color, road in zip(
+                    view["x"].tolist(), view["y"].tolist(), view["speed"].tolist(),
+                    view["direction"].tolist(), view["color_index"].tolist(),
+                    view["road_index"].tolist()):
+                yield VehicleView(x, y, speed, direction, palette[color], size, road)
+
+    def pack(self) -> Batch:
+        """Every vehicle, including ones in transit between shards"""
+        self.wait()
+        batches = []
+        for connection, inbox in zip(self.connections, self.inboxes):
+            connection.send(("pack", None))
+            batches.extend([connection.recv()] + inbox)
+        return {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+    def unpack(self, arrays: Batch):
+        """Replace every vehicle, handing each to the shard that owns its position"""
+        self.wait()
+        self.inboxes = [[] for _ in self.regions]
+        for i, (connection, region) in enumerate(zip(self.connections, self.regions)):
+            owned = (arrays["x"] >= region.left) & (arrays["x"] < region.right)
+            connection.send(("unpack", {name: values[owned] for name, values in arrays.items()}))
+            self.halos[i] = connection.recv()
+
+    def close(self):
+        """Stop the worker processes"""
+        self.wait()
+        for connection in self.connections:
+            connection.send(("stop", None))
+        for process in self.processes:
+            process.join(timeout=5)
+        self.processes = []
@@ -0,0 +1,195 @@
+"""
+Flashpoint Cities - Vehicle Store
+Struct-of-arrays storage for vehicles so movement, arrival checks and removal
+run as batched NumPy operations instead of per-object Python loops.
+"""
+
+import math
+import numpy as np
+from typing import Dict, Iterator, List, NamedTuple, Sequence, Tuple
+
+
+class VehicleView(NamedTuple):
+    """Read-only snapshot of one vehicle, handed to the draw code"""
+    x: float
+    y: float
+    speed: float
+    direction: float
+    color: Tuple[int, int, int]
+    size: Tuple[int, int]
+    road_index: int
+
+
+class VehicleStore:
+    """Contiguous per-field arrays for every live vehicle"""
+
+    def __init__(self, palette: Sequence[Tuple[int, int, int]],
+                 size: Tuple[int, int] = (20, 10), capacity: int = 1024):
+        self.palette: List[Tuple[int, int, int]] = list(palette)
+        self.size = size
+        self.count = 0
+
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.speed = np.zeros(capacity, dtype=np.float32)
+        self.direction = np.zeros(capacity, dtype=np.float32)  # radians
+        self.heading_x = np.zeros(capacity, dtype=np.float32)  # cos(direction)
+        self.heading_y = np.zeros(capacity, dtype=np.float32)  # sin(direction)
+        self.color_index = np.zeros(capacity, dtype=np.uint8)
+        self.road_index = np.zeros(capacity, dtype=np.int32)
+        self.last_step = np.zeros(capacity, dtype=np.float32)  # Distance moved last tick, for interpolation
+
+        # Routing state for vehicles following a route through the road network
+        self.route_id = np.full(capacity, -1, dtype=np.int32)
+        self.waypoint = np.zeros(capacity, dtype=np.int32)
+        self.target_x = np.zeros(capacity, dtype=np.float32)
+        self.target_y = np.zeros(capacity, dtype=np.float32)
+
+        # Where and when each vehicle's trip began, for trip records
+        self.origin = np.full(capacity, -1, dtype=np.int16)
+        self.spawn_tick = np.zeros(capacity, dtype=np.int64)
+        self.spawn_x = np.zeros(capacity, dtype=np.float32)
+
+    def _fields(self) -> List[str]:
+        return ["x", "y", "speed", "direction", "heading_x", "heading_y",
+                "color_index", "road_index", "route_id", "waypoint", "target_x", "target_y", "last_step",
+                "origin", "spawn_tick", "spawn_x"]
+
+    def _reserve(self, capacity: int):
+        """Grow every array to hold at least capacity vehicles"""
+        if capacity <= len(self.x):
+            return
+        new_capacity = max(capacity, len(self.x) * 2)
+        for name in self._fields():
+            old = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=old.dtype)
+            grown[:self.count] = old[:self.count]
+            setattr(self, name, grown)
+
+    def spawn(self, x, y, speed, direction, color_index, road_index=-1) -> int:
+        """Append one or many vehicles; array arguments spawn a whole batch at once"""
+        x, y, speed, direction, color_index, road_index = np.broadcast_arrays(
+            *(np.atleast_1d(v) for v in (x, y, speed, direction, color_index, road_index)))
+        n = len(x)
+        self._reserve(self.count + n)
+        batch = slice(self.count, self.count + n)
+
+        self.x[batch] = x
+        self.y[batch] = y
+        self.speed[batch] = speed
+        self.direction[batch] = direction
+        heading_x = np.cos(direction)
+        heading_y = np.sin(direction)
+        # Keep axis-aligned cars exactly on their lane
+        heading_x[np.abs(heading_x) < 1e-9] = 0.0
+        heading_y[np.abs(heading_y) < 1e-9] = 0.0
+        self.heading_x[batch] = heading_x
+        self.heading_y[batch] = heading_y
+        self.color_index[batch] = color_index
+        self.road_index[batch] = road_index
+        self.last_step[batch] = 0
+        self.route_id[batch] = -1
+        self.waypoint[batch] = 0
+        self.origin[batch] = -1
+        self.spawn_tick[batch] = 0
+        self.spawn_x[batch] = x
+        self.count += n
+        return n
+
+    def steer(self, index: int, target_x: float, target_y: float):
+        """Point one vehicle at a new target position"""
+        dx = target_x - float(self.x[index])
+        dy = target_y - float(self.y[index])
+        direction = math.atan2(dy, dx)
+        self.direction[index] = direction
+        length = math.hypot(dx, dy)
+        if length > 0:
+            self.heading_x[index] = dx / length
+            self.heading_y[index] = dy / length
+        self.target_x[index] = target_x
+        self.target_y[index] = target_y
+
+    def distance_to_target(self) -> np.ndarray:
+        """Remaining distance along each vehicle's heading to its target"""
+        n = self.count
+        return ((self.target_x[:n] - self.x[:n]) * self.heading_x[:n]
+                + (self.target_y[:n] - self.y[:n]) * self.heading_y[:n])
+
+    def advance(self, step: np.ndarray):
+        """Advance every vehicle along its heading by a per-vehicle distance"""
+        n = self.count
+        self.x[:n] += self.heading_x[:n] * step
+        self.y[:n] += self.heading_y[:n] * step
+        self.last_step[:n] = step
+
+    def lane_positions(self, offset_x: float = 0.0, offset_y: float = 0.0) -> np.ndarray:
+        """Distance of each vehicle (plus an offset) along its own heading"""
+        n = self.count
+        return ((self.x[:n] + offset_x) * self.heading_x[:n]
+                + (self.y[:n] + offset_y) * self.heading_y[:n])
+
+    def outside(self, left: float, top: float, right: float, bottom: float) -> np.ndarray:
+        """Mask of the vehicles outside the given bounds"""
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        return (x < left) | (x > right) | (y < top) | (y > bottom)
+
+    def arrived(self) -> np.ndarray:
+        """Mask of the vehicles on a route that have reached or passed its target"""
+        return (self.route_id[:self.count] >= 0) & (self.distance_to_target() <= 0)
+
+    def compact(self, keep: np.ndarray) -> int:
+        """Keep only the vehicles where the mask is True, preserving their order"""
+        kept = int(np.count_nonzero(keep))
+        removed = self.count - kept
+        if removed:
+            for name in self._fields():
+                array = getattr(self, name)
+                array[:kept] = array[:self.count][keep]
+            self.count = kept
+        return removed
+
+    def clear(self):
+        """Remove every vehicle"""
+        self.count = 0
+
+    def pack(self) -> Dict[str, np.ndarray]:
+        """Copies of every live vehicle's fields, for snapshots"""
+        return {name: getattr(self, name)[:self.count].copy() for name in self._fields()}
+
+    def unpack(self, arrays: Dict[str, np.ndarray]):
+        """Replace every vehicle with the fields from pack()"""
+        self.count = 0
+        self.extend(arrays)
+
+    def extend(self, arrays: Dict[str, np.ndarray]):
+        """Append vehicles in the pack() layout, e.g. ones handed over from another store"""
+        missing = [name for name in self._fields() if name not in arrays]
+        if missing:
+            raise ValueError(f"vehicle batch is missing fields: {', '.join(missing)}")
+        n = len(arrays["x"])
+        self._reserve(self.count + n)
+        batch = slice(self.count, self.count + n)
+        for name in self._fields():
+            getattr(self, name)[batch] = arrays[name]
+        self.count += n
+
+    def take(self, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        """Remove the vehicles where the mask is True and return them in the pack() layout"""
+        taken = {name: getattr(self, name)[:self.count][mask] for name in self._fields()}
+        self.compact(~mask)
+        return taken
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[VehicleView]:
+        n = self.count
+        palette = self.palette
+        size = self.size
+        for x, y, speed, direction, color, road in zip(
+                self.x[:n].tolist(), self.y[:n].tolist(), self.speed[:n].tolist(),
+                self.direction[:n].tolist(), self.color_index[:n].tolist(),
+                self.road_index[:n].tolist()):
+            yield VehicleView(x, y, speed, direction, palette[color], size, road)
@@ -0,0 +1,147 @@
+"""
+Flashpoint Cities - Window Lighting
+Window state for a whole city held in two packed bitsets (which grid slots
+have a window, and which of those are lit). Window geometry is derived from
+each building's rect and a shared layout instead of being stored per window,
+and lights follow a time-of-day schedule updated in bulk.
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence, Tuple
+
+# Share of windows lit at each hour of the day, interpolated between points
+LIT_SCHEDULE_HOURS = [0, 5, 7, 9, 12, 17, 19, 22, 24]
+LIT_SCHEDULE_FRACTION = [0.2, 0.1, 0.5, 0.3, 0.25, 0.5, 0.85, 0.6, 0.2]
+
+
+def lit_fraction(hour: float) -> float:
+    """Target share of lit windows at an hour of the day (0-24)"""
+    return float(np.interp(hour % 24, LIT_SCHEDULE_HOURS, LIT_SCHEDULE_FRACTION))
+
+
+@dataclass
+class WindowLayout:
+    """Window grid inside a building, relative to its top-left corner"""
+    column_start: int
+    column_margin: int  # Columns stop this far from the right edge
+    column_spacing: int
+    row_start: int
+    row_margin: int  # Rows stop this far from the bottom edge
+    row_spacing: int
+    width: int
+    height: int
+
+    def columns(self, building_width: int) -> int:
+        return len(range(self.column_start, building_width - self.column_margin, self.column_spacing))
+
+    def rows(self, building_height: int) -> int:
+        return len(range(self.row_start, building_height - self.row_margin, self.row_spacing))
+
+
+def _get_bits(bits: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    return (bits[slots >> 3] & (128 >> (slots & 7))) != 0
+
+
+class CityWindows:
+    """Packed window presence and lighting for every building in one city"""
+
+    def __init__(self, rects: Sequence[Tuple[int, int, int, int]], layout: WindowLayout,
+                 lit: Optional[np.ndarray] = None, present: Optional[np.ndarray] = None):
+        self.rects = np.array(rects, dtype=np.int32).reshape(-1, 4)
+        self.layout = layout
+        self.columns = np.array([layout.columns(w) for w in self.rects[:, 2]], dtype=np.int64)
+        self.rows = np.array([layout.rows(h) for h in self.rects[:, 3]], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.columns * self.rows)])
+        self.count = int(self.offsets[-1])  # Grid slots, with or without a window
+
+        if present is None:
+            present = np.ones(self.count, dtype=bool)
+        if lit is None:
+            lit = np.zeros(self.count, dtype=bool)
+        self.present_bits = np.packbits(np.asarray(present, dtype=bool))
+        self.lit_bits = np.packbits(np.asarray(lit, dtype=bool) & np.asarray(present, dtype=bool))
+
+    @classmethod
+    def generate(cls, rects: Sequence[Tuple[int, int, int, int]], layout: WindowLayout,
+                 rng: np.random.Generator, presence: float = 1.0,
+                 lit_probability: float = 0.5) -> "CityWindows":
+        """Windows for a set of buildings, with random presence and lighting"""
+        count = cls(rects, layout).count
+        present = rng.random(count) < presence
+        lit = rng.random(count) < lit_probability
+        return cls(rects, layout, lit, present)
+
+    def present(self) -> np.ndarray:
+        """Unpacked window presence for every slot"""
+        return np.unpackbits(self.present_bits, count=self.count).astype(bool)
+
+    def lit(self) -> np.ndarray:
+        """Unpacked lighting for every slot"""
+        return np.unpackbits(self.lit_bits, count=self.count).astype(bool)
+
+    def window_count(self) -> int:
+        """Number of slots that actually have a window"""
+        return int(np.unpackbits(self.present_bits, count=self.count).sum())
+
+    def building_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Windows and lit windows per building"""
+        building = np.repeat(np.arange(len(self.rects)), np.diff(self.offsets))
+        buildings = len(self.rects)
+        present = np.bincount(building, weights=self.present(), minlength=buildings)
+        lit = np.bincount(building, weights=self.lit(), minlength=buildings)
+        return present.astype(np.int64), lit.astype(np.int64)
+
+    def is_lit(self, slot: int) -> bool:
+        return bool(_get_bits(self.lit_bits, np.array([slot]))[0])
+
+    def building_of(self, slot: int) -> int:
+        """Index of the building a slot belongs to"""
+        return int(np.searchsorted(self.offsets, slot, side="right")) - 1
+
+    def window_rect(self, slot: int) -> Tuple[int, int, int, int]:
+        """Screen rect of one window slot"""
+        building = self.building_of(slot)
+        x, y, _, _ = self.rects[building].tolist()
+        local = slot - int(self.offsets[building])
+        row, column = divmod(local, int(self.columns[building]))
+        layout = self.layout
+        return (x + layout.column_start + column * layout.column_spacing,
+                y + layout.row_start + row * layout.row_spacing,
+                layout.width, layout.height)
+
+    def windows(self, building: int) -> Iterator[Tuple[Tuple[int, int, int, int], bool]]:
+        """(rect, lit) for every window of one building"""
+        start, end = int(self.offsets[building]), int(self.offsets[building + 1])
+        if start == end:
+            return
+        slots = np.arange(start, end)
+        present = _get_bits(self.present_bits, slots)
+        lit = _get_bits(self.lit_bits, slots)
+        x, y, _, _ = self.rects[building].tolist()
+        columns = int(self.columns[building])
+        layout = self.layout
+        for local in np.flatnonzero(present).tolist():
+            row, column = divmod(local, columns)
+            rect = (x + layout.column_start + column * layout.column_spacing,
+                    y + layout.row_start + row * layout.row_spacing,
+                    layout.width, layout.height)
+            yield rect, bool(lit[local])
+
+    def update(self, hour: float, rng: np.random.Generator, refresh_rate: float) -> np.ndarray:
+        """Re-roll a random share of windows against the schedule; returns the slots that toggled
+
+        Each tick about refresh_rate of all windows are re-rolled to lit with
+        probability lit_fraction(hour), so the city drifts toward the schedule.
+        """
+        if self.count == 0:
+            return np.zeros(0, dtype=np.int64)
+        picks = rng.binomial(self.count, refresh_rate)
+        if picks == 0:
+            return np.zeros(0, dtype=np.int64)
+        slots = np.unique(rng.integers(0, self.count, picks))
+        slots = slots[_get_bits(self.present_bits, slots)]
+        lit = rng.random(len(slots)) < lit_fraction(hour)
+        changed = slots[lit != _get_bits(self.lit_bits, slots)]
+        np.bitwise_xor.at(self.lit_bits, changed >> 3, (128 >> (changed & 7)).astype(np.uint8))
+        return changed
@@ -0,0 +1,198 @@
+"""
+Flashpoint Cities - Chunked World
+The metro region is split into square chunks in world coordinates. Chunks
+are generated on demand from the world seed and their coordinates, so any
+chunk can be dropped and later rebuilt identically; only chunks near the
+viewport are kept in memory and only those overlapping it are drawn.
+"""
+
+import math
+import numpy as np
+import pygame
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+ChunkKey = Tuple[int, int]
+
+
+@dataclass
+class Chunk:
+    key: ChunkKey
+    rect: pygame.Rect  # World-space area
+    content: Any = None  # Whatever the generator produced, in world coordinates
+    surface: Optional[pygame.Surface] = None  # Rendered on first draw at a zoom level
+    zoom: float = 0.0  # Zoom level the surface was rendered at
+
+
+ChunkGenerator = Callable[[Chunk, np.random.Generator], Any]
+ChunkRenderer = Callable[[Chunk, pygame.Surface, float], None]  # Draws a chunk scaled by zoom
+
+
+@dataclass
+class Camera:
+    """Pan and zoom from world space onto the screen"""
+    x: float  # World position of the top-left corner of the screen
+    y: float
+    screen_size: Tuple[int, int]
+    zoom: float = 1.0  # Screen pixels per world pixel
+
+    def viewport(self) -> pygame.Rect:
+        """World area on screen"""
+        width, height = self.screen_size
+        left, top = math.floor(self.x), math.floor(self.y)
+        return pygame.Rect(left, top, math.ceil(width / self.zoom) + 1, math.ceil(height / self.zoom) + 1)
+
+    def to_screen(self, x: float, y: float) -> Tuple[int, int]:
+        """Screen position of a world point
+
+        Both terms are rounded separately so that neighbouring chunks, whose
+        scaled edges fall on whole pixels, always line up without seams.
+        """
+        return (round(x * self.zoom) - round(self.x * self.zoom),
+                round(y * self.zoom) - round(self.y * self.zoom))
+
+    def to_world(self, x: float, y: float) -> Tuple[float, float]:
+        """World position under a screen point"""
+        return self.x + x / self.zoom, self.y + y / self.zoom
+
+    def rect_to_screen(self, rect: Tuple[int, int, int, int]) -> pygame.Rect:
+        """Screen rect covering a world rect, at least one pixel in each direction"""
+        x, y, width, height = rect
+        left, top = self.to_screen(x, y)
+        right, bottom = self.to_screen(x + width, y + height)
+        return pygame.Rect(left, top, max(1, right - left), max(1, bottom - top))
+
+    def pan(self, dx: float, dy: float):
+        """Move by a distance in screen pixels"""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+
+    def zoom_at(self, zoom: float, anchor: Tuple[float, float]):
+        """Change zoom, keeping the world point under a screen anchor in place"""
+        world_x, world_y = self.to_world(*anchor)
+        self.zoom = zoom
+        self.x = world_x - anchor[0] / zoom
+        self.y = world_y - anchor[1] / zoom
+
+    def clamp(self, bounds: pygame.Rect):
+        """Keep the view inside bounds, centering on any axis where the view is larger"""
+        width, height = self.screen_size[0] / self.zoom, self.screen_size[1] / self.zoom
+        if width >= bounds.width:
+            self.x = bounds.centerx - width / 2
+        else:
+            self.x = max(bounds.left, min(self.x, bounds.right - width))
+        if height >= bounds.height:
+            self.y = bounds.centery - height / 2
+        else:
+            self.y = max(bounds.top, min(self.y, bounds.bottom - height))
+
+
+def scale_rect(rect: Tuple[int, int, int, int], origin: Tuple[int, int], zoom: float) -> pygame.Rect:
+    """A world rect relative to origin, scaled by zoom, at least one pixel in each direction"""
+    x, y, width, height = rect
+    left, top = round((x - origin[0]) * zoom), round((y - origin[1]) * zoom)
+    right, bottom = round((x + width - origin[0]) * zoom), round((y + height - origin[1]) * zoom)
+    return pygame.Rect(left, top, max(1, right - left), max(1, bottom - top))
+
+
+def chunk_rng(seed: int, key: ChunkKey) -> np.random.Generator:
+    """Random stream for one chunk, independent of generation order"""
+    cx, cy = key
+    return np.random.default_rng([seed, cx & 0xFFFFFFFF, cy & 0xFFFFFFFF])
+
+
+class ChunkWorld:
+    """Lazily generated, evictable chunks around a moving viewport"""
+
+    def __init__(self, seed: int, chunk_size: int, generate: ChunkGenerator, render: ChunkRenderer,
+                 bounds: Optional[Tuple[int, int, int, int]] = None,
+                 load_margin: int = 1, keep_margin: int = 3, max_chunks: int = 256):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.generate = generate
+        self.render = render
+        self.bounds = pygame.Rect(bounds) if bounds is not None else None
+        self.load_margin = load_margin  # Chunks generated ahead of the viewport
+        self.keep_margin = keep_margin  # Chunks further out than this are evicted
+        self.max_chunks = max_chunks
+        self.chunks: "OrderedDict[ChunkKey, Chunk]" = OrderedDict()  # Least recently visible first
+        self.generated = 0
+        self.evicted = 0
+
+    def key_at(self, x: float, y: float) -> ChunkKey:
+        """Key of the chunk containing a world point"""
+        return int(x // self.chunk_size), int(y // self.chunk_size)
+
+    def key_range(self, rect: pygame.Rect, margin: int = 0) -> Tuple[int, int, int, int]:
+        """Inclusive chunk key bounds (left, top, right, bottom) covering a world rect"""
+        left, top = self.key_at(rect.left, rect.top)
+        right, bottom = self.key_at(rect.right - 1, rect.bottom - 1)
+        return left - margin, top - margin, right + margin, bottom + margin
+
+    def keys_in_rect(self, rect: pygame.Rect, margin: int = 0) -> Iterator[ChunkKey]:
+        """Keys of every in-bounds chunk overlapping a world rect"""
+        left, top, right, bottom = self.key_range(rect, margin)
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                if self.bounds is None or self.bounds.colliderect(self.chunk_rect((cx, cy))):
+                    yield cx, cy
+
+    def chunk_rect(self, key: ChunkKey) -> pygame.Rect:
+        """World-space area of a chunk"""
+        return pygame.Rect(key[0] * self.chunk_size, key[1] * self.chunk_size,
+                           self.chunk_size, self.chunk_size)
+
+    def get(self, key: ChunkKey) -> Chunk:
+        """A chunk, generated from the seed if it is not loaded"""
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = Chunk(key, self.chunk_rect(key))
+            chunk.content = self.generate(chunk, chunk_rng(self.seed, key))
+            self.chunks[key] = chunk
+            self.generated += 1
+        return chunk
+
+    def update(self, viewport: pygame.Rect, budget: Optional[int] = None):
+        """Load chunks around the viewport and evict those far away from it
+
+        At most budget chunks are generated per call, nearest to the viewport
+        centre first, so a big jump or zoom-out streams in over a few frames.
+        """
+        missing = [key for key in self.keys_in_rect(viewport, self.load_margin) if key not in self.chunks]
+        if budget is not None and len(missing) > budget:
+            cx, cy = self.key_at(*viewport.center)
+            missing.sort(key=lambda k: (k[0] - cx) ** 2 + (k[1] - cy) ** 2)
+            missing = missing[:budget]
+        for key in missing:
+            self.get(key)
+        for key in self.keys_in_rect(viewport):
+            if key in self.chunks:
+                self.chunks.move_to_end(key)
+
+        left, top, right, bottom = self.key_range(viewport, self.keep_margin)
+        for key in [k for k in self.chunks if not (left <= k[0] <= right and top <= k[1] <= bottom)]:
+            del self.chunks[key]
+            self.evicted += 1
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evicted += 1
+
+    def visible(self, viewport: pygame.Rect) -> List[Chunk]:
+        """Loaded chunks overlapping the viewport"""
+        return [self.chunks[key] for key in self.keys_in_rect(viewport) if key in self.chunks]
+
+    def draw(self, target: pygame.Surface, camera: Camera) -> int:
+        """Blit every visible chunk, rendering it at the camera zoom if needed; returns how many were drawn"""
+        drawn = 0
+        for chunk in self.visible(camera.viewport()):
+            if chunk.surface is None or chunk.zoom != camera.zoom:
+                size = round(self.chunk_size * camera.zoom)
+                chunk.surface = pygame.Surface((size, size))
+                if pygame.display.get_surface() is not None:
+                    chunk.surface = chunk.surface.convert()
+                chunk.zoom = camera.zoom
+                self.render(chunk, chunk.surface, camera.zoom)
+            target.blit(chunk.surface, camera.to_screen(chunk.rect.x, chunk.rect.y))
+            drawn += 1
+        return drawn
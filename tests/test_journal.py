@@ -0,0 +1,65 @@
+import hashlib
+
+import pytest
+
+from flashpoint_cities import FlashpointCities
+from flashpoint_journal import InputJournal, JournalError, JournalPlayer
+
+
+def state_hash(game: FlashpointCities) -> str:
+    return hashlib.sha256(game.snapshot()).hexdigest()
+
+
+def test_replay_reaches_the_recorded_state(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    game = FlashpointCities(headless=True, seed=7)
+    game.record_journal(path, {"seed": game.seed})
+    for tick in range(200):
+        if tick == 50:
+            game.perform("speed_force")
+        if tick == 120:
+            game.perform("change_weather")
+        game.update()
+    game.journal.finish(game.tick)
+    game.journal = None
+    expected = state_hash(game)
+    game.close()
+
+    journal = InputJournal.load(path)
+    assert journal.end_tick == 200
+    assert [entry.action for entry in journal.entries] == ["speed_force", "change_weather"]
+    replayed = FlashpointCities(headless=True, seed=journal.settings["seed"])
+    replayed.replay(journal)
+    assert replayed.tick == 200
+    assert state_hash(replayed) == expected
+    replayed.close()
+
+
+def test_unfinished_journal_replays_up_to_its_last_entry(tmp_path):
+    path = str(tmp_path / "crashed.jsonl")
+    journal = InputJournal({"seed": 3})
+    journal.open(path)
+    journal.record(10, "speed_force")
+    journal.record(25, "change_weather")
+    journal.file.close()  # No end line, as after a crash
+
+    loaded = InputJournal.load(path)
+    assert loaded.end_tick is None
+    assert loaded.last_tick() == 26
+
+
+def test_player_hands_out_entries_at_their_tick():
+    journal = InputJournal()
+    journal.record(2, "a")
+    journal.record(2, "b")
+    journal.record(5, "c")
+    player = JournalPlayer(journal)
+    due = [[entry.action for entry in player.due(tick)] for tick in range(7)]
+    assert due == [[], [], ["a", "b"], [], [], ["c"], []]
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    path.write_text('{"hello": "world"}\n')
+    with pytest.raises(JournalError):
+        InputJournal.load(str(path))
@@ -0,0 +1,80 @@
+import heapq
+import math
+from typing import NamedTuple, Tuple
+
+from flashpoint_roads import RoadNetwork
+
+
+class Road(NamedTuple):
+    start: Tuple[int, int]
+    end: Tuple[int, int]
+
+
+# A 3x3 street grid with a diagonal avenue, plus a road nothing connects to
+ROADS = ([Road((0, y), (300, y)) for y in (0, 100, 200)]
+         + [Road((x, 0), (x, 200)) for x in (0, 150, 300)]
+         + [Road((0, 0), (300, 200)), Road((1000, 1000), (1100, 1000))])
+
+
+def dijkstra(network: RoadNetwork, source: int):
+    distances = [math.inf] * len(network.nodes)
+    distances[source] = 0.0
+    queue = [(0.0, source)]
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if distance > distances[node]:
+            continue
+        for neighbor, length in network.adjacency[node]:
+            if distance + length < distances[neighbor]:
+                distances[neighbor] = distance + length
+                heapq.heappush(queue, (distance + length, neighbor))
+    return distances
+
+
+def route_cost(network: RoadNetwork, route) -> float:
+    for u, v in zip(route, route[1:]):
+        assert (u, v) in network.edge_ids
+    return sum(math.dist(network.nodes[u], network.nodes[v]) for u, v in zip(route, route[1:]))
+
+
+def test_astar_routes_are_shortest():
+    network = RoadNetwork(ROADS)
+    assert len(network.nodes) > 9  # The diagonal cuts the grid into extra nodes
+    for origin in range(len(network.nodes)):
+        expected = dijkstra(network, origin)
+        for destination in range(len(network.nodes)):
+            route = network.route(origin, destination)
+            if expected[destination] == math.inf:
+                assert route == ()
+                continue
+            assert (route[0], route[-1]) == (origin, destination)
+            assert math.isclose(route_cost(network, route), expected[destination], abs_tol=1e-6)
+
+
+def test_next_hops_follow_the_full_route():
+    network = RoadNetwork(ROADS)
+    assert network.precompute_all_pairs()
+    for origin in range(len(network.nodes)):
+        expected = dijkstra(network, origin)
+        for destination in range(len(network.nodes)):
+            route = network.route(origin, destination)
+            if expected[destination] == math.inf:
+                assert route == ()
+                continue
+            assert math.isclose(route_cost(network, route), expected[destination], abs_tol=1e-6)
+            for node, following in zip(route, route[1:]):
+                assert network.next_hop[destination][node] == following
+
+
+def test_cache_evicts_without_changing_routes():
+    network = RoadNetwork(ROADS, cache_size=3)
+    pairs = [(origin, destination) for origin in range(len(network.nodes)) for destination in (0, 5, 9)]
+    first = [network.route(*pair) for pair in pairs]
+    assert len(network.path_cache) == 3
+    assert list(network.path_cache) == pairs[-3:]
+
+    misses = network.cache_misses
+    assert network.route(*pairs[-1]) is first[-1]
+    assert (network.cache_hits, network.cache_misses) == (1, misses)
+    assert [network.route(*pair) for pair in pairs] == first
+    assert network.cache_misses == misses + len(pairs)
@@ -0,0 +1,68 @@
+from flashpoint_schedule import Scheduler
+
+
+def recording(scheduler: Scheduler, fired: list, *keys: str):
+    for key in keys:
+        scheduler.on(key, lambda tick, key=key: fired.append((tick, key)))
+
+
+def test_timers_fire_in_due_order_then_scheduling_order():
+    scheduler = Scheduler()
+    fired = []
+    recording(scheduler, fired, "a", "b", "c", "d")
+    scheduler.at("c", 5)
+    scheduler.at("a", 3)
+    scheduler.at("d", 5)
+    scheduler.after("b", 1)
+    assert scheduler.advance(4) == 2
+    assert fired == [(1, "b"), (3, "a")]
+    assert scheduler.advance(10) == 2
+    assert fired[2:] == [(5, "c"), (5, "d")]
+    assert scheduler.now == 10
+
+
+def test_rescheduled_and_cancelled_timers_fire_once_or_never():
+    scheduler = Scheduler()
+    fired = []
+    recording(scheduler, fired, "a", "b")
+    scheduler.at("a", 2)
+    scheduler.at("b", 3)
+    scheduler.at("a", 6)
+    scheduler.cancel("b")
+    assert scheduler.due("a") == 6
+    assert scheduler.due("b") is None
+    scheduler.advance(10)
+    assert fired == [(6, "a")]
+
+
+def test_follow_up_timers_are_relative_to_the_due_tick():
+    scheduler = Scheduler()
+    fired = []
+    scheduler.on("phase", lambda tick: (fired.append(tick), scheduler.after("phase", 4)))
+    scheduler.at("phase", 2)
+    scheduler.advance(15)  # One call has to fire the whole chain that fell due
+    assert fired == [2, 6, 10, 14]
+    assert scheduler.due("phase") == 18
+
+
+def test_compaction_keeps_only_live_timers():
+    scheduler = Scheduler()
+    fired = []
+    recording(scheduler, fired, "a")
+    for tick in range(1000):
+        scheduler.at("a", tick + 10)
+    assert len(scheduler.queue) < 100
+    scheduler.advance(2000)
+    assert fired == [(1009, "a")]
+
+
+def test_clear_keeps_handlers():
+    scheduler = Scheduler()
+    fired = []
+    recording(scheduler, fired, "a")
+    scheduler.at("a", 5)
+    scheduler.clear(now=100)
+    assert scheduler.advance(200) == 0
+    scheduler.after("a", 1)
+    scheduler.advance(300)
+    assert fired == [(201, "a")]
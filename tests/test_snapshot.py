@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from flashpoint_cities import FlashpointCities, WeatherType
+from flashpoint_snapshot import SNAPSHOT_MIN_VERSION, SNAPSHOT_VERSION, SnapshotError, pack_snapshot, unpack_snapshot
+
+
+def test_arrays_and_meta_round_trip():
+    meta = {"tick": 42, "weather": "rainy", "nested": {"streams": [1, 2, 3]}}
+    arrays = {
+        "x": np.linspace(0, 1, 7, dtype=np.float32),
+        "bits": np.packbits(np.arange(20) % 3 == 0),
+        "grid": np.arange(12, dtype=np.int64).reshape(3, 4),
+        "empty": np.zeros(0, dtype=np.int16),
+    }
+    version, unpacked_meta, unpacked = unpack_snapshot(pack_snapshot(meta, arrays))
+    assert version == SNAPSHOT_VERSION
+    assert unpacked_meta == meta
+    assert list(unpacked) == list(arrays)
+    for name, array in arrays.items():
+        assert unpacked[name].dtype == array.dtype
+        np.testing.assert_array_equal(unpacked[name], array)
+
+
+def test_corrupt_data_is_rejected():
+    data = pack_snapshot({"tick": 1}, {"x": np.arange(100)})
+    with pytest.raises(SnapshotError, match="not a Flashpoint Cities snapshot"):
+        unpack_snapshot(b"XXXX" + data[4:])
+    with pytest.raises(SnapshotError, match="truncated"):
+        unpack_snapshot(data[:8])
+    with pytest.raises(SnapshotError, match="corrupt"):
+        unpack_snapshot(data[:-6])
+    tampered = bytearray(data)
+    tampered[12] ^= 0xFF  # crc32 field of the header
+    with pytest.raises(SnapshotError, match="checksum"):
+        unpack_snapshot(bytes(tampered))
+
+
+def test_unsupported_versions_are_rejected():
+    with pytest.raises(SnapshotError, match="newer"):
+        unpack_snapshot(pack_snapshot({}, {}, version=SNAPSHOT_VERSION + 1))
+    with pytest.raises(SnapshotError, match="no longer supported"):
+        unpack_snapshot(pack_snapshot({}, {}, version=SNAPSHOT_MIN_VERSION - 1))
+
+
+def test_game_restore_resumes_identically():
+    game = FlashpointCities(headless=True, seed=11)
+    for _ in range(120):
+        game.update()
+    data = game.snapshot()
+    for _ in range(120):
+        game.update()
+    expected = game.snapshot()
+    game.close()
+
+    restored = FlashpointCities(headless=True, seed=99)
+    restored.restore(data)
+    assert restored.snapshot() == data
+    for _ in range(120):
+        restored.update()
+    assert restored.snapshot() == expected
+    restored.close()
+
+
+def test_fork_is_independent_of_its_parent(tmp_path):
+    game = FlashpointCities(headless=True, seed=5, shards=2, world_cache=str(tmp_path), pedestrians_per_city=20)
+    for _ in range(60):
+        game.update()
+    data = game.snapshot()
+    clone = game.fork()
+    try:
+        assert (clone.seed, clone.shards, clone.world_cache, clone.pedestrians_per_city) == (5, 2, str(tmp_path), 20)
+        assert clone.snapshot() == data
+        clone.weather = next(weather for weather in WeatherType if weather != game.weather)
+        for _ in range(30):
+            clone.update()
+        assert clone.snapshot() != data
+        assert game.snapshot() == data
+    finally:
+        clone.close()
+        game.close()
+
+
+def test_missing_vehicle_fields_are_rejected():
+    game = FlashpointCities(headless=True, seed=3)
+    for _ in range(30):
+        game.update()
+    version, meta, arrays = unpack_snapshot(game.snapshot())
+    del arrays["vehicle_origin"]
+    with pytest.raises(ValueError, match="origin"):
+        game.restore(pack_snapshot(meta, arrays, version=version))
+    game.close()
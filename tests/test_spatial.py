@@ -0,0 +1,46 @@
+import numpy as np
+
+from flashpoint_spatial import SpatialGrid, leader_distances
+
+BOUNDS = (-100.0, 0.0, 1000.0, 500.0)
+
+
+def scattered(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    # Some points fall outside the bounds and are clamped into the edge cells
+    x = rng.uniform(-200, 1000, count).astype(np.float32)
+    y = rng.uniform(-50, 550, count).astype(np.float32)
+    return x, y
+
+
+def test_rect_queries_match_a_full_scan():
+    x, y = scattered(2000, 1)
+    grid = SpatialGrid(BOUNDS, cell_size=64.0)
+    grid.rebuild(x, y)
+    for left, top, right, bottom in [(0, 0, 100, 100), (-180, -40, -120, 20), (300, 200, 310, 500), (-500, -500, 2000, 2000)]:
+        expected = np.flatnonzero((x >= left) & (x <= right) & (y >= top) & (y <= bottom))
+        np.testing.assert_array_equal(np.sort(grid.query_rect(left, top, right, bottom)), expected)
+
+
+def test_radius_queries_match_a_full_scan():
+    x, y = scattered(2000, 2)
+    grid = SpatialGrid(BOUNDS, cell_size=50.0)
+    grid.rebuild(x, y)
+    for cx, cy, radius in [(400, 250, 80), (-100, 0, 30), (950, 520, 120), (200, 200, 0)]:
+        expected = np.flatnonzero((x - cx) ** 2 + (y - cy) ** 2 <= radius ** 2)
+        np.testing.assert_array_equal(np.sort(grid.query_radius(cx, cy, radius)), expected)
+
+
+def test_rebuild_forgets_old_positions():
+    grid = SpatialGrid(BOUNDS)
+    grid.rebuild(np.array([10.0, 500.0], dtype=np.float32), np.array([10.0, 10.0], dtype=np.float32))
+    assert grid.query_radius(10, 10, 5).tolist() == [0]
+    grid.rebuild(np.array([500.0], dtype=np.float32), np.array([10.0], dtype=np.float32))
+    assert grid.query_radius(10, 10, 5).tolist() == []
+    assert grid.query_radius(500, 10, 5).tolist() == [0]
+
+
+def test_leaders_are_the_next_vehicle_ahead_in_the_lane():
+    lanes = np.array([0, 0, 1, 0, 1, 2])
+    positions = np.array([5.0, 20.0, 3.0, 12.0, 9.0, 1.0])
+    assert leader_distances(lanes, positions).tolist() == [7.0, np.inf, 6.0, 8.0, np.inf, np.inf]
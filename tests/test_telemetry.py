@@ -0,0 +1,56 @@
+import numpy as np
+
+from flashpoint_telemetry import RingBuffer
+
+
+def rows(start: int, stop: int):
+    values = np.arange(start, stop)
+    return {"tick": values, "value": values * 0.5}
+
+
+def make_buffer(capacity: int = 8) -> RingBuffer:
+    return RingBuffer([("tick", np.int64), ("value", np.float32)], capacity)
+
+
+def test_drain_returns_rows_since_last_drain_in_order():
+    buffer = make_buffer()
+    buffer.append(rows(0, 3))
+    buffer.append(rows(3, 5))
+    drained = buffer.drain()
+    assert drained["tick"].tolist() == [0, 1, 2, 3, 4]
+    assert drained["value"].tolist() == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert buffer.drain()["tick"].tolist() == []
+    buffer.append(rows(5, 7))
+    assert buffer.drain()["tick"].tolist() == [5, 6]
+    assert buffer.dropped == 0
+
+
+def test_wrapping_overwrites_the_oldest_undrained_rows():
+    buffer = make_buffer()
+    buffer.append(rows(0, 6))
+    buffer.drain()
+    buffer.append(rows(6, 17))  # Wraps, and 3 undrained rows fall off
+    assert len(buffer) == 8
+    assert buffer.dropped == 3
+    assert buffer.drain()["tick"].tolist() == list(range(9, 17))
+    assert buffer.latest(3)["tick"].tolist() == [14, 15, 16]
+    assert buffer.latest(100)["tick"].tolist() == list(range(9, 17))
+
+
+def test_batch_larger_than_capacity_keeps_the_newest_rows():
+    buffer = make_buffer()
+    buffer.append(rows(0, 2))
+    buffer.append(rows(2, 22))
+    assert buffer.written == 22
+    assert buffer.dropped == 14
+    assert buffer.drain()["tick"].tolist() == list(range(14, 22))
+
+
+def test_drained_copies_do_not_change_as_rows_are_overwritten():
+    buffer = make_buffer()
+    buffer.append(rows(0, 4))
+    latest = buffer.latest(4)
+    buffer.append(rows(4, 20))
+    assert latest["tick"].tolist() == [0, 1, 2, 3]
+    buffer.append(rows(0, 0))
+    assert buffer.written == 20
@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+
+from flashpoint_cities import FlashpointCities
+from flashpoint_traffic import split_regions
+
+LIGHTS = {"west": (95.0, 10.0), "middle": (290.0, 20.0), "east": (350.0, 10.0)}
+
+
+def test_regions_cover_the_line():
+    regions = split_regions(0, 400, 2, LIGHTS)
+    assert [(region.left, region.right) for region in regions] == [(-math.inf, 200.0), (200.0, math.inf)]
+    assert [sorted(region.lights) for region in regions] == [["west"], ["east", "middle"]]
+
+
+def test_lights_go_to_every_region_they_overlap():
+    regions = split_regions(0, 400, 4, LIGHTS)
+    assert [sorted(region.lights) for region in regions] == [["west"], ["west"], ["middle"], ["east", "middle"]]
+
+
+def test_lights_within_reach_reach_the_neighbouring_region():
+    regions = split_regions(0, 400, 4, LIGHTS, reach=60.0)
+    assert [sorted(region.lights) for region in regions] == [["west"], ["west"], ["east", "middle"],
+                                                             ["east", "middle"]]
+    regions = split_regions(0, 400, 4, LIGHTS, reach=100.0)
+    assert [sorted(region.lights) for region in regions] == [["west"], ["middle", "west"],
+                                                             ["east", "middle", "west"], ["east", "middle"]]
+    assert regions[2].lights["west"] == LIGHTS["west"]
+
+
+def vehicle_state(game: FlashpointCities):
+    if game.traffic is None:
+        arrays = game.vehicles.pack()
+    else:
+        game.traffic.wait()
+        arrays = game.traffic.pack()
+    order = np.lexsort((arrays["spawn_tick"], arrays["x"], arrays["road_index"]))
+    return {name: arrays[name][order] for name in ("x", "y", "road_index", "route_id", "spawn_tick")}
+
+
+def test_sharded_traffic_matches_local_traffic():
+    local = FlashpointCities(headless=True, seed=11)
+    sharded = FlashpointCities(headless=True, seed=11, shards=3)
+    try:
+        for game in (local, sharded):
+            game.demand_scale = 40  # Dense enough that queues form across the shard boundaries
+            game.time_of_day = 0.33
+        for tick in range(300):
+            local.update()
+            sharded.update()
+            if tick % 25 == 0:
+                expected, actual = vehicle_state(local), vehicle_state(sharded)
+                assert len(actual["x"]) == len(expected["x"]), tick
+                for name in expected:
+                    np.testing.assert_allclose(actual[name], expected[name], err_msg=f"{name} at tick {tick}")
+    finally:
+        local.close()
+        sharded.close()
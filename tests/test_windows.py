@@ -0,0 +1,64 @@
+import numpy as np
+
+from flashpoint_windows import CityWindows, WindowLayout, lit_fraction
+
+LAYOUT = WindowLayout(column_start=5, column_margin=10, column_spacing=15,
+                      row_start=10, row_margin=20, row_spacing=20, width=8, height=12)
+RECTS = [(0, 100, 50, 90), (100, 50, 80, 130), (300, 0, 10, 10)]  # The last is too small for windows
+
+
+def test_slots_follow_the_layout():
+    windows = CityWindows(RECTS, LAYOUT)
+    assert windows.columns.tolist() == [3, 5, 0]
+    assert windows.rows.tolist() == [3, 5, 0]
+    assert windows.offsets.tolist() == [0, 9, 34, 34]
+    assert windows.count == 34
+    assert windows.building_of(0) == 0
+    assert windows.building_of(8) == 0
+    assert windows.building_of(9) == 1
+    assert windows.window_rect(0) == (5, 110, 8, 12)
+    assert windows.window_rect(9 + 5 + 2) == (100 + 5 + 2 * 15, 50 + 10 + 20, 8, 12)
+    assert list(windows.windows(2)) == []
+
+
+def test_bits_round_trip_and_lit_implies_present():
+    rng = np.random.default_rng(1)
+    count = CityWindows(RECTS, LAYOUT).count
+    present = rng.random(count) < 0.7
+    lit = rng.random(count) < 0.5
+    windows = CityWindows(RECTS, LAYOUT, lit, present)
+    assert len(windows.present_bits) == (count + 7) // 8
+    np.testing.assert_array_equal(windows.present(), present)
+    np.testing.assert_array_equal(windows.lit(), lit & present)
+    assert windows.window_count() == int(present.sum())
+    assert [windows.is_lit(slot) for slot in range(count)] == (lit & present).tolist()
+
+    present_counts, lit_counts = windows.building_counts()
+    assert present_counts.tolist() == [int(present[:9].sum()), int(present[9:].sum()), 0]
+    assert lit_counts.tolist() == [int((lit & present)[:9].sum()), int((lit & present)[9:].sum()), 0]
+
+    listed = list(windows.windows(1))
+    assert len(listed) == present_counts[1]
+    assert [is_lit for _, is_lit in listed] == (lit & present)[9:][present[9:]].tolist()
+
+
+def test_update_toggles_exactly_the_returned_slots():
+    rng = np.random.default_rng(2)
+    windows = CityWindows.generate(RECTS, LAYOUT, rng, presence=0.8)
+    present = windows.present()
+    for hour in (3.0, 19.0, 12.5):
+        before = windows.lit()
+        changed = windows.update(hour, rng, refresh_rate=0.5)
+        after = windows.lit()
+        np.testing.assert_array_equal(np.flatnonzero(before != after), np.sort(changed))
+        assert not (after & ~present).any()
+
+
+def test_lit_share_drifts_to_the_schedule():
+    rng = np.random.default_rng(3)
+    windows = CityWindows.generate([(0, 0, 2000, 2000)], LAYOUT, rng, lit_probability=0.0)
+    for _ in range(50):
+        windows.update(19.0, rng, refresh_rate=0.2)
+    share = windows.lit().sum() / windows.window_count()
+    assert abs(share - lit_fraction(19.0)) < 0.02
+    assert lit_fraction(19.0) == lit_fraction(43.0)